@@ -0,0 +1,118 @@
+"""
+Benchmark of request-body encodings for vector and bulk curriculum writes.
+
+Compares what requests sends by default (json= with the float list the
+embeddings API returned) against the client layer's compact encoding (pgvector text literal at
+VECTOR_PRECISION, compact separators, gzip above a threshold). Reports bytes
+on the wire, serialization CPU time and the worst round-trip error of the
+reduced precision. No network calls are made.
+
+Usage:
+    python benchmark_wire_encoding.py [--rows 500] [--repeat 20] [--source generate_database_content.py]
+"""
+import argparse
+import gzip
+import json
+import time
+
+import numpy as np
+
+from curriculum_store import load_source, to_table
+from generate_embeddings import VECTOR_PRECISION, format_vector, parse_vector
+from sync_local_replica import ARRAY_COLUMNS
+
+# --------------------------------------------------
+# Config
+# --------------------------------------------------
+DIM = 1536
+ROWS = 500
+REPEAT = 20
+GZIP_THRESHOLD = 64 * 1024  # benchmark value; the client default comes from SUPABASE_GZIP_THRESHOLD
+
+# --------------------------------------------------
+# Helpers
+# --------------------------------------------------
+def cpu_ms(fn, repeat):
+    """Mean CPU milliseconds per call, plus the last result."""
+    start = time.process_time()
+    for _ in range(repeat):
+        result = fn()
+    return (time.process_time() - start) * 1000 / repeat, result
+
+def api_floats(vectors):
+    """
+    The vectors as json.loads hands them over from the embeddings API.
+
+    The API sends float32 values in their shortest decimal form (~10 digits),
+    and Python parses those into float64 whose repr is just as short. Upcasting
+    the float32 array with tolist() would give 17-digit reprs instead and
+    overstate the baseline.
+    """
+    return vectors.astype(str).astype(np.float64)
+
+def sample_rows(source, n, rng):
+    """n importer-shaped rows (cycled from the source) with unit-norm float32 embeddings."""
+    base = to_table(load_source(source)[0]).to_pylist()
+    vectors = rng.standard_normal((n, DIM)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    rows = []
+    for i in range(n):
+        row = dict(base[i % len(base)])
+        for c in ARRAY_COLUMNS:
+            row[c] = "{" + ",".join(f'"{v}"' for v in row[c]) + "}"
+        rows.append(row)
+    return rows, vectors
+
+def baseline_body(rows, values):
+    # What requests.post(json=...) does with the API's floats: json.dumps with default separators
+    return json.dumps([{**r, "embedding": v.tolist()} for r, v in zip(rows, values)]).encode()
+
+def compact_body(rows, vectors, precision):
+    body = json.dumps(
+        [{**r, "embedding": format_vector(v, precision)} for r, v in zip(rows, vectors)],
+        separators=(",", ":"),
+        ensure_ascii=False,
+    ).encode()
+    if len(body) >= GZIP_THRESHOLD:
+        body = gzip.compress(body, compresslevel=5)
+    return body
+
+# --------------------------------------------------
+# Main
+# --------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark wire encodings for vector and bulk payloads")
+    parser.add_argument("--rows", type=int, default=ROWS)
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--source", default="generate_database_content.py")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    rows, vectors = sample_rows(args.source, args.rows, rng)
+    values = api_floats(vectors)
+    vector = vectors[0]
+
+    print("=" * 70)
+    print("📦 WIRE ENCODING BENCHMARK")
+    print("=" * 70)
+
+    print(f"\n🔢 Single vector ({DIM} dims, update_embedding)")
+    ms, body = cpu_ms(lambda: json.dumps({"embedding": values[0].tolist()}).encode(), args.repeat * 10)
+    print(f"   {'json float list':<22} {len(body):>9,} B  {ms:7.3f} ms")
+    for precision in sorted({4, 5, VECTOR_PRECISION, 8}):
+        ms, body = cpu_ms(lambda: json.dumps({"embedding": format_vector(vector, precision)}).encode(), args.repeat * 10)
+        error = np.abs(parse_vector(format_vector(vector, precision)) - vector).max()
+        marker = "  ← default" if precision == VECTOR_PRECISION else ""
+        print(f"   {f'pgvector %.{precision}g':<22} {len(body):>9,} B  {ms:7.3f} ms  max err {error:.1e}{marker}")
+
+    print(f"\n📤 Bulk upsert ({args.rows} rows with example_code/example_output)")
+    ms_base, body = cpu_ms(lambda: baseline_body(rows, values), args.repeat)
+    base_bytes = len(body)
+    print(f"   {'json= (requests)':<22} {base_bytes:>11,} B  {ms_base:8.1f} ms")
+    ms_new, body = cpu_ms(lambda: compact_body(rows, vectors, VECTOR_PRECISION), args.repeat)
+    print(f"   {'pgvector + gzip':<22} {len(body):>11,} B  {ms_new:8.1f} ms")
+    print(f"\n✅ {base_bytes / len(body):.1f}x fewer bytes on the wire; "
+          f"serialization CPU {ms_base:.0f} → {ms_new:.0f} ms per request (gzip included)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Precompute "related subtopics" for every learning_content row.
+
+Computes the top-k cosine neighbours of every embedded row with blocked
+float32 matrix multiplies, so memory stays bounded by BLOCK_SIZE² scores no
+matter how large the table grows. Results go to a local JSON artifact and,
+optionally, to the learning_content_neighbours table, turning related-content
+lookups into single reads. Nothing is recomputed while the embeddings are
+unchanged.
+
+Usage:
+    python build_neighbours.py [--top-k 10] [--block-size 1024] [--table] [--force]
+"""
+import argparse
+import json
+import os
+from datetime import datetime
+
+import requests
+
+from generate_embeddings import SUPABASE_URL, SUPABASE_HEADERS
+from retrieval import BLOCK_SIZE, blocked_top_k, load_content_matrix, content_fingerprint
+
+# --------------------------------------------------
+# Config
+# --------------------------------------------------
+TOP_K = 10
+UPSERT_CHUNK = 500
+OUTPUT_PATH = os.path.join("artifacts", "neighbours.json")
+NEIGHBOURS_TABLE = "learning_content_neighbours"
+NEIGHBOURS_ENDPOINT = f"{SUPABASE_URL}/rest/v1/{NEIGHBOURS_TABLE}"
+
+# --------------------------------------------------
+# Neighbours
+# --------------------------------------------------
+def compute_neighbours(matrix, top_k=TOP_K, block_size=BLOCK_SIZE):
+    """
+    Top-k most similar rows for every row of a normalised matrix.
+
+    Returns (indices, scores), both shaped (n, k) and sorted by descending
+    score; a row is never its own neighbour.
+    """
+    k = min(top_k, max(matrix.shape[0] - 1, 0))
+    return blocked_top_k(matrix, matrix, k, block_size, exclude_self=True)
+
+def to_neighbour_map(rows, indices, scores):
+    """{row id: [{"id": neighbour id, "score": similarity}, ...]}"""
+    ids = [row["id"] for row in rows]
+    return {
+        str(ids[i]): [
+            {"id": ids[j], "score": round(float(s), 6)}
+            for j, s in zip(indices[i], scores[i])
+        ]
+        for i in range(len(ids))
+    }
+
+# --------------------------------------------------
+# Storage
+# --------------------------------------------------
+def load_neighbours(path=OUTPUT_PATH):
+    """Load a neighbour artifact, or None if it has not been built yet."""
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def write_neighbours_file(neighbours, fingerprint, top_k, path=OUTPUT_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    artifact = {
+        "fingerprint": fingerprint,
+        "top_k": top_k,
+        "generated_at": datetime.now().isoformat(),
+        "neighbours": neighbours,
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(artifact, f)
+    os.replace(tmp_path, path)
+
+def write_neighbours_table(neighbours, fingerprint):
+    """Bulk upsert one row per content id, then drop rows from older builds."""
+    headers = {
+        **SUPABASE_HEADERS,
+        "Prefer": "resolution=merge-duplicates,return=minimal",
+    }
+    payload = [
+        {"content_id": content_id, "neighbours": items, "fingerprint": fingerprint}
+        for content_id, items in neighbours.items()
+    ]
+    for i in range(0, len(payload), UPSERT_CHUNK):
+        resp = requests.post(
+            f"{NEIGHBOURS_ENDPOINT}?on_conflict=content_id",
+            headers=headers,
+            json=payload[i:i + UPSERT_CHUNK]
+        )
+        resp.raise_for_status()
+
+    resp = requests.delete(
+        f"{NEIGHBOURS_ENDPOINT}?fingerprint=neq.{fingerprint}",
+        headers=SUPABASE_HEADERS
+    )
+    resp.raise_for_status()
+
+# --------------------------------------------------
+# Main
+# --------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Precompute related-subtopic neighbours")
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    parser.add_argument("--block-size", type=int, default=BLOCK_SIZE)
+    parser.add_argument("--output", default=OUTPUT_PATH)
+    parser.add_argument("--table", action="store_true", help=f"also upsert into {NEIGHBOURS_TABLE}")
+    parser.add_argument("--force", action="store_true", help="recompute even if embeddings are unchanged")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("🧭 RELATED SUBTOPIC NEIGHBOURS")
+    print("=" * 70)
+
+    start = datetime.now()
+    rows, matrix = load_content_matrix()
+    print(f"📥 Loaded {len(rows)} embedded rows")
+
+    fingerprint = content_fingerprint(rows, matrix)
+    existing = load_neighbours(args.output)
+    if (
+        not args.force
+        and existing
+        and existing.get("fingerprint") == fingerprint
+        and existing.get("top_k") == args.top_k
+    ):
+        print("✅ Embeddings unchanged since last build, nothing to do")
+        return
+
+    indices, scores = compute_neighbours(matrix, args.top_k, args.block_size)
+    neighbours = to_neighbour_map(rows, indices, scores)
+
+    write_neighbours_file(neighbours, fingerprint, args.top_k, args.output)
+    print(f"💾 Wrote {len(neighbours)} neighbour lists → {args.output}")
+
+    if args.table:
+        write_neighbours_table(neighbours, fingerprint)
+        print(f"💾 Upserted {len(neighbours)} rows → {NEIGHBOURS_TABLE}")
+
+    secs = (datetime.now() - start).total_seconds()
+    print(f"\n⏱ Total time: {secs:.1f} seconds")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+"""
+Binary snapshot export/restore of learning_content plus embeddings.
+
+Rebuilding an environment otherwise means re-running the
+generate_database_content.py batches and re-embedding every row through the
+API. `export` writes one checksummed, zstd-compressed .tar.zst snapshot
+instead:
+
+    manifest.json     row count, vector shape, active embedding model and
+                      dimensions, sha256 of every member
+    rows.parquet      text, array and numeric columns (zstd-compressed Arrow)
+    embeddings.f32    raw little-endian float32 matrix, one row per parquet row
+
+`restore` verifies the checksums and bulk-loads the rows with their vectors
+into a target project in large parallel chunks, so a staging database is
+ready without a single embedding call. It refuses targets whose active
+embedding model differs from the one the vectors were made with.
+
+Requires pyarrow.
+
+Usage:
+    python curriculum_snapshot.py export snapshot.tar.zst [--from-replica artifacts/curriculum.sqlite]
+    python curriculum_snapshot.py restore snapshot.tar.zst [--target-url URL --target-key KEY]
+"""
+import argparse
+import hashlib
+import io
+import json
+import os
+import tarfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from generate_embeddings import (
+    SUPABASE_URL,
+    SUPABASE_KEY,
+    TABLE,
+    active_embedding_model,
+    fetch_all_rows,
+    format_vector,
+    parse_array,
+    parse_vector,
+    send_json,
+)
+from sync_local_replica import ARRAY_COLUMNS, TEXT_COLUMNS, connect_replica
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# --------------------------------------------------
+# Config
+# --------------------------------------------------
+SNAPSHOT_VERSION = 2
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+RESTORE_CHUNK = 500
+RESTORE_WORKERS = 4
+
+# --------------------------------------------------
+# Helpers
+# --------------------------------------------------
+def require_pyarrow():
+    if pa is None:
+        raise RuntimeError("❌ pyarrow is required for snapshots (pip install pyarrow)")
+
+def snapshot_schema():
+    return pa.schema(
+        [("id", pa.string())]
+        + [(c, pa.string()) for c in TEXT_COLUMNS]
+        + [(c, pa.list_(pa.string())) for c in ARRAY_COLUMNS]
+        + [("estimated_hours", pa.float64()), ("has_embedding", pa.bool_())]
+    )
+
+def sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+def remote_rows():
+    yield from fetch_all_rows(select="*")
+
+def replica_rows(path):
+    conn = connect_replica(path)
+    for r in conn.execute(f"SELECT * FROM {TABLE} ORDER BY id"):
+        row = dict(r)
+        blob = row.pop("embedding")
+        row["embedding"] = np.frombuffer(blob, dtype=np.float32) if blob else None
+        for c in ARRAY_COLUMNS:
+            row[c] = json.loads(row[c]) if row[c] else []
+        yield row
+    conn.close()
+
+# --------------------------------------------------
+# Export
+# --------------------------------------------------
+def build_snapshot(rows, model, dimensions):
+    """Columnar table + float32 matrix + manifest (checksums are added on write)."""
+    columns = {name: [] for name in snapshot_schema().names}
+    vectors = []
+    dim = 0
+    for row in rows:
+        vector = parse_vector(row.get("embedding"))
+        columns["id"].append(str(row["id"]))
+        for c in TEXT_COLUMNS:
+            columns[c].append(row.get(c))
+        for c in ARRAY_COLUMNS:
+            columns[c].append(parse_array(row.get(c)))
+        columns["estimated_hours"].append(
+            float(row["estimated_hours"]) if row.get("estimated_hours") is not None else None
+        )
+        columns["has_embedding"].append(vector is not None)
+        vectors.append(vector)
+        if vector is not None:
+            dim = len(vector)
+
+    matrix = np.zeros((len(vectors), dim), dtype="<f4")
+    for i, vector in enumerate(vectors):
+        if vector is not None:
+            matrix[i] = vector
+
+    if dimensions and dim and dim != dimensions:
+        raise RuntimeError(f"❌ Exported vectors have {dim} dims but the active model {model} uses {dimensions}")
+
+    table = pa.Table.from_pydict(columns, schema=snapshot_schema())
+    manifest = {
+        "snapshot_version": SNAPSHOT_VERSION,
+        "table": TABLE,
+        "embedding_model": model,
+        "embedding_dimensions": dimensions,
+        "rows": table.num_rows,
+        "vector_shape": list(matrix.shape),
+        "vector_dtype": "<f4",
+        "created_at": datetime.now().isoformat(),
+    }
+    return table, matrix, manifest
+
+def write_snapshot(path, table, matrix, manifest):
+    buffer = io.BytesIO()
+    pq.write_table(table, buffer, compression="zstd")
+    members = {
+        "rows.parquet": buffer.getvalue(),
+        "embeddings.f32": matrix.tobytes(),
+    }
+    manifest = {**manifest, "checksums": {name: sha256(data) for name, data in members.items()}}
+    members = {"manifest.json": json.dumps(manifest, indent=2).encode(), **members}
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    # Compress the whole archive; the float32 matrix is most of its bytes
+    with pa.CompressedOutputStream(tmp_path, "zstd") as out, tarfile.open(fileobj=out, mode="w|") as tar:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = int(datetime.now().timestamp())
+            tar.addfile(info, io.BytesIO(data))
+    os.replace(tmp_path, path)
+    return manifest
+
+# --------------------------------------------------
+# Restore
+# --------------------------------------------------
+def read_snapshot(path):
+    """Verify checksums and return (table, matrix, manifest)."""
+    with open(path, "rb") as f:
+        compressed = f.read(4) == ZSTD_MAGIC
+    if compressed:
+        with pa.CompressedInputStream(path, "zstd") as source, tarfile.open(fileobj=source, mode="r|") as tar:
+            members = {m.name: tar.extractfile(m).read() for m in tar}
+    else:
+        # Version 1 snapshots were plain .tar
+        with tarfile.open(path, "r") as tar:
+            members = {m.name: tar.extractfile(m).read() for m in tar.getmembers()}
+    manifest = json.loads(members["manifest.json"])
+    for name, expected in manifest["checksums"].items():
+        if sha256(members[name]) != expected:
+            raise RuntimeError(f"❌ Checksum mismatch for {name} in {path}")
+
+    table = pq.read_table(io.BytesIO(members["rows.parquet"]))
+    matrix = np.frombuffer(members["embeddings.f32"], dtype=manifest["vector_dtype"])
+    matrix = matrix.reshape(manifest["vector_shape"])
+    return table, matrix, manifest
+
+def restore_payloads(table, matrix, chunk_size=RESTORE_CHUNK):
+    """Yield lists of insertable row dicts with embeddings attached."""
+    for start in range(0, table.num_rows, chunk_size):
+        batch = table.slice(start, chunk_size).to_pylist()
+        for offset, row in enumerate(batch):
+            has_embedding = row.pop("has_embedding")
+            row["embedding"] = format_vector(matrix[start + offset]) if has_embedding else None
+        yield batch
+
+def check_target_model(manifest, target_url, headers):
+    """Refuse to load vectors into a project that searches with another model."""
+    model, dimensions = active_embedding_model(target_url, headers)
+    expected = manifest["embedding_model"]
+    expected_dimensions = manifest.get("embedding_dimensions")
+    if model != expected or (dimensions and expected_dimensions and dimensions != expected_dimensions):
+        raise RuntimeError(
+            f"❌ Snapshot vectors are {expected} ({expected_dimensions or 'native'} dims) "
+            f"but the target's active model is {model} ({dimensions or 'native'} dims)"
+        )
+
+def restore_snapshot(path, target_url, target_key, workers=RESTORE_WORKERS):
+    table, matrix, manifest = read_snapshot(path)
+    endpoint = f"{target_url}/rest/v1/{manifest['table']}?on_conflict=id"
+    headers = {
+        "apikey": target_key,
+        "Authorization": f"Bearer {target_key}",
+        "Content-Type": "application/json",
+        "Prefer": "resolution=merge-duplicates,return=minimal",
+    }
+    check_target_model(manifest, target_url, headers)
+
+    def post(batch):
+        resp = send_json("POST", endpoint, batch, headers, timeout=120)
+        resp.raise_for_status()
+        return len(batch)
+
+    # Keep at most 2 chunks per worker in flight so memory stays bounded
+    restored = 0
+    in_flight = deque()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for batch in restore_payloads(table, matrix):
+            in_flight.append(pool.submit(post, batch))
+            if len(in_flight) >= workers * 2:
+                restored += in_flight.popleft().result()
+                print(f"✅ Restored {restored}/{manifest['rows']} rows")
+        while in_flight:
+            restored += in_flight.popleft().result()
+            print(f"✅ Restored {restored}/{manifest['rows']} rows")
+    return restored
+
+# --------------------------------------------------
+# Main
+# --------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Export/restore learning_content snapshots")
+    sub = parser.add_subparsers(dest="command", required=True)
+    export = sub.add_parser("export")
+    export.add_argument("path")
+    export.add_argument("--from-replica", help="read from a sync_local_replica.py file instead of Supabase")
+    restore = sub.add_parser("restore")
+    restore.add_argument("path")
+    restore.add_argument("--target-url", default=os.getenv("RESTORE_SUPABASE_URL", SUPABASE_URL))
+    restore.add_argument("--target-key", default=os.getenv("RESTORE_SUPABASE_SERVICE_ROLE_KEY", SUPABASE_KEY))
+    restore.add_argument("--workers", type=int, default=RESTORE_WORKERS)
+    args = parser.parse_args()
+
+    require_pyarrow()
+    start = datetime.now()
+
+    if args.command == "export":
+        print("📦 Exporting snapshot...")
+        model, dimensions = active_embedding_model()
+        rows = replica_rows(args.from_replica) if args.from_replica else remote_rows()
+        table, matrix, manifest = build_snapshot(rows, model, dimensions)
+        manifest = write_snapshot(args.path, table, matrix, manifest)
+        size_mb = os.path.getsize(args.path) / 1e6
+        print(f"💾 {manifest['rows']} rows, vectors {manifest['vector_shape']} → {args.path} ({size_mb:.1f} MB)")
+    else:
+        print(f"♻️  Restoring snapshot into {args.target_url}...")
+        restore_snapshot(args.path, args.target_url, args.target_key, args.workers)
+
+    secs = (datetime.now() - start).total_seconds()
+    print(f"⏱ Total time: {secs:.1f} seconds")
+
+if __name__ == "__main__":
+    main()
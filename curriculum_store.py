@@ -0,0 +1,409 @@
+"""
+Columnar curriculum store: the canonical copy of curriculum content.
+
+Content currently lives as dict literals in generate_database_content.py
+batches and as hand-written CSV/TXT dumps under `test databases/`, so loading
+one module means executing or re-parsing everything. This store keeps every
+row in one Arrow schema, with tags / prerequisites / youtube_links as native
+list<string> columns instead of `{...}` strings, hive-partitioned on disk:
+
+    artifacts/curriculum/skill_name=<skill>/module_name=<module>/part-0.arrow
+
+Partitions are uncompressed Arrow IPC files, so readers memory-map them
+without copying and a single module loads without touching the rest.
+Importing a source rewrites only the partitions it contains.
+
+Converters:
+    *.py          a `records = [...]` batch (evaluated from the AST, never executed)
+    *.csv, *.txt  well-formed CSV, or the unquoted `test databases/` dumps
+
+Requires pyarrow.
+
+Usage:
+    python curriculum_store.py import generate_database_content.py "test databases/datareduction_optimization.csv"
+    python curriculum_store.py validate [--skill SKILL] [--module MODULE]
+    python curriculum_store.py list
+"""
+import argparse
+import ast
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+from collections import Counter
+from datetime import datetime
+
+from generate_embeddings import build_embedding_text, parse_array
+from parallel_csv import parse_file
+from sync_local_replica import ARRAY_COLUMNS, TEXT_COLUMNS
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.fs as pafs
+except ImportError:
+    pa = pc = ds = pafs = None
+
+# --------------------------------------------------
+# Config
+# --------------------------------------------------
+STORE_PATH = os.path.join("artifacts", "curriculum")
+PARTITION_COLUMNS = ("skill_name", "module_name")
+NATURAL_KEY = ("skill_name", "module_name", "topic_name", "subtopic_name")
+REQUIRED_COLUMNS = NATURAL_KEY + ("description",)
+PARALLEL_MIN_BYTES = 32 * 1024 * 1024  # well-formed CSVs above this are parsed in a process pool
+
+# --------------------------------------------------
+# Schema
+# --------------------------------------------------
+def require_pyarrow():
+    if pa is None:
+        raise RuntimeError("❌ pyarrow is required for the curriculum store (pip install pyarrow)")
+
+def curriculum_schema():
+    return pa.schema(
+        [(c, pa.string()) for c in TEXT_COLUMNS]
+        + [(c, pa.list_(pa.string())) for c in ARRAY_COLUMNS]
+        + [("estimated_hours", pa.float64())]
+    )
+
+def normalize_record(record):
+    """Any source dict → store row (stripped strings, list columns, float hours)."""
+    row = {}
+    for c in TEXT_COLUMNS:
+        value = record.get(c)
+        if value in (None, ""):
+            row[c] = None
+        else:
+            # Leading spaces are significant in code and printed output
+            row[c] = str(value).strip("\r\n") if c in ("example_code", "example_output") else str(value).strip()
+    for c in ARRAY_COLUMNS:
+        row[c] = parse_array(record.get(c))
+    hours = record.get("estimated_hours")
+    row["estimated_hours"] = float(hours) if hours not in (None, "") else None
+    return row
+
+def natural_key(row):
+    return tuple(row.get(c) for c in NATURAL_KEY)
+
+def content_hash(row):
+    """SHA-256 of a normalised row's content columns (stable across sources)."""
+    payload = [row.get(c) for c in TEXT_COLUMNS + ARRAY_COLUMNS + ("estimated_hours",)]
+    return hashlib.sha256(json.dumps(payload, ensure_ascii=False).encode()).hexdigest()
+
+def to_table(records):
+    """Normalise and de-duplicate on the natural key (last record wins)."""
+    rows = {}
+    for record in records:
+        row = normalize_record(record)
+        rows[natural_key(row)] = row
+    return pa.Table.from_pylist(list(rows.values()), schema=curriculum_schema())
+
+def rows_to_table(header, rows):
+    """CSV rows → store table without de-duplication (runs inside parallel_csv workers)."""
+    records = [normalize_record(dict(zip(header, row))) for row in rows]
+    return pa.Table.from_pylist(records, schema=curriculum_schema())
+
+def dedupe_table(table):
+    """Keep the last row for every natural key, in first-seen key order."""
+    indexed = table.append_column("__row", pa.array(range(table.num_rows), pa.int64()))
+    groups = indexed.group_by(list(NATURAL_KEY), use_threads=False).aggregate(
+        [("__row", "min"), ("__row", "max")]
+    )
+    order = pc.sort_indices(groups["__row_min"])
+    return table.take(pc.take(groups["__row_max"], order))
+
+# --------------------------------------------------
+# Converters
+# --------------------------------------------------
+def _pg_array_to_list(value):
+    # Stand-in for convert_to_pg_array: comma strings and lists both become lists
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(",") if item.strip()]
+    return list(value) if value else []
+
+def records_from_module(path):
+    """
+    Read the `records = [...]` literal of a generate_database_content.py batch.
+
+    Only that assignment is evaluated, with convert_to_pg_array swapped for
+    a list builder, so the batch's import side effects never run.
+    """
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=path)
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(getattr(t, "id", None) == "records" for t in node.targets):
+            code = compile(ast.Expression(node.value), path, "eval")
+            return eval(code, {"__builtins__": {}, "convert_to_pg_array": _pg_array_to_list})
+    raise ValueError(f"No `records = [...]` assignment in {path}")
+
+def _compiles(code):
+    try:
+        compile(code, "<example_code>", "exec")
+        return True
+    except (SyntaxError, ValueError):
+        return False
+
+# A field separator in the dumps is a comma followed by a non-space character;
+# commas inside tags and prose are followed by a space.
+_FIELD_BREAK = re.compile(r",(?=\S)")
+
+def _parse_dump_record(text, prefix):
+    """Split one unquoted dump record; the code/output boundary is found by compiling the code."""
+    body = text[len(prefix):]
+    topic, subtopic, body = body.split(",", 2)
+
+    # Trailing fields, right to left: hours, prerequisites, tags, then the links
+    last_nl = body.rfind("\n")
+    tail = _FIELD_BREAK.split(body[last_nl + 1:])
+    hours = tail.pop() if tail and re.fullmatch(r"\d+(\.\d+)?", tail[-1].strip()) else None
+    prerequisites = tail.pop() if len(tail) > 1 else ""
+    tags = tail.pop() if len(tail) > 1 else ""
+    links = []
+    while len(tail) > 1 and tail[-1].startswith("http"):
+        links.insert(0, tail.pop())
+    head = body[:last_nl + 1] + ",".join(tail)
+    record = {
+        "topic_name": topic,
+        "subtopic_name": subtopic,
+        "youtube_links": links,
+        "tags": [t.strip() for t in tags.split(", ") if t.strip()],
+        "prerequisites": [p.strip() for p in prerequisites.split(", ") if p.strip()],
+        "estimated_hours": hours,
+    }
+
+    # The description ends at a field break on the first line. The code ends
+    # on the last line where cutting at a comma still compiles; on that line
+    # the earliest such comma wins (a trailing comment can swallow the output),
+    # preferring a field break over ", " (output may start with whitespace).
+    first_line = head.split("\n", 1)[0]
+    desc_breaks = [m.start() for m in _FIELD_BREAK.finditer(first_line)]
+    commas = [i for i, ch in enumerate(head) if ch == ","]
+    for d in reversed(desc_breaks):
+        compiling = [c for c in reversed(commas) if c > d and _compiles(head[d + 1:c])][:1]
+        if not compiling:
+            continue
+        line_start = head.rfind("\n", 0, compiling[0]) + 1
+        same_line = [c for c in commas if line_start <= c <= compiling[0] and c > d and _compiles(head[d + 1:c])]
+        preferred = [c for c in same_line if _FIELD_BREAK.match(head, c)]
+        c = (preferred or same_line)[0]
+        return {**record, "description": head[:d], "example_code": head[d + 1:c],
+                "example_output": head[c + 1:]}, True
+
+    # Nothing compiled: keep the prose, leave code and output together for review
+    d = desc_breaks[-1] if desc_breaks else len(head)
+    return {**record, "description": head[:d], "example_code": head[d + 1:],
+            "example_output": None}, False
+
+def records_from_dump(text):
+    """
+    Parse the unquoted `test databases/` dumps.
+
+    Every record of a file starts with the same "skill,module," prefix, which
+    is how multi-line code and output are told apart from new records.
+    Returns (records, unresolved) where unresolved counts records whose
+    code/output boundary could not be found.
+    """
+    lines = text.splitlines()[1:]
+    if not lines:
+        return [], 0
+    skill, module = lines[0].split(",", 2)[:2]
+    prefix = f"{skill},{module},"
+
+    chunks = []
+    for line in lines:
+        if line.startswith(prefix) or not chunks:
+            chunks.append([line])
+        else:
+            chunks[-1].append(line)
+
+    records, unresolved = [], 0
+    for chunk in chunks:
+        record, resolved = _parse_dump_record("\n".join(chunk).rstrip(), prefix)
+        records.append({"skill_name": skill, "module_name": module, **record})
+        unresolved += not resolved
+    return records, unresolved
+
+def records_from_text(path):
+    """Well-formed CSV goes through the csv module; anything else is treated as a dump."""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    rows = list(csv.DictReader(io.StringIO(text)))
+    if rows and all(None not in row and None not in row.values() for row in rows):
+        hours_ok = all(
+            not row.get("estimated_hours") or re.fullmatch(r"\d+(\.\d+)?", row["estimated_hours"].strip())
+            for row in rows
+        )
+        if hours_ok:
+            return rows, 0
+    return records_from_dump(text)
+
+def load_source(path):
+    """Records from any supported source file. Returns (records, unresolved)."""
+    if path.endswith(".py"):
+        return records_from_module(path), 0
+    return records_from_text(path)
+
+def table_from_csv(path, workers=None):
+    """Store table of a well-formed CSV, parsed and converted across a process pool."""
+    return pa.concat_tables(parse_file(path, workers, convert=rows_to_table))
+
+def load_table(path, workers=None):
+    """
+    Store table for any source file. Returns (table, unresolved).
+
+    Large CSVs go through the parallel parser; if they turn out not to be
+    well-formed (e.g. an unquoted dump) the sequential converters take over.
+    """
+    if path.endswith(".csv") and os.path.getsize(path) >= PARALLEL_MIN_BYTES:
+        try:
+            return table_from_csv(path, workers), 0
+        except ValueError:
+            pass
+    records, unresolved = load_source(path)
+    return pa.Table.from_pylist([normalize_record(r) for r in records], schema=curriculum_schema()), unresolved
+
+# --------------------------------------------------
+# Writer
+# --------------------------------------------------
+def write_store(table, path=STORE_PATH):
+    """Write the partitions present in `table`, replacing only those partitions."""
+    partitioning = ds.partitioning(
+        pa.schema([(c, pa.string()) for c in PARTITION_COLUMNS]), flavor="hive"
+    )
+    ds.write_dataset(
+        table,
+        path,
+        format="ipc",
+        partitioning=partitioning,
+        basename_template="part-{i}.arrow",
+        existing_data_behavior="delete_matching",
+    )
+
+# --------------------------------------------------
+# Readers
+# --------------------------------------------------
+def open_store(path=STORE_PATH):
+    require_pyarrow()
+    # use_mmap: IPC record batches are views over the mapped file, not copies
+    return ds.dataset(
+        path,
+        format="ipc",
+        partitioning="hive",
+        schema=curriculum_schema(),
+        filesystem=pafs.LocalFileSystem(use_mmap=True),
+    )
+
+def read_store(path=STORE_PATH, columns=None, skill_name=None, module_name=None):
+    """
+    Memory-mapped read of the store, optionally for one skill or module.
+
+    Partition filters prune whole directories, so reading one module only
+    opens that module's file.
+    """
+    expression = None
+    for column, value in (("skill_name", skill_name), ("module_name", module_name)):
+        if value is not None:
+            term = pc.field(column) == value
+            expression = term if expression is None else expression & term
+    return open_store(path).to_table(columns=columns, filter=expression)
+
+def read_module(skill_name, module_name, path=STORE_PATH, columns=None):
+    return read_store(path, columns, skill_name, module_name)
+
+def list_partitions(path=STORE_PATH):
+    """[(skill_name, module_name, rows)] for every partition in the store."""
+    table = read_store(path, columns=list(PARTITION_COLUMNS))
+    counts = Counter(zip(table["skill_name"].to_pylist(), table["module_name"].to_pylist()))
+    return [(skill, module, n) for (skill, module), n in sorted(counts.items())]
+
+def to_pg_array(items):
+    # Same output as convert_to_pg_array in generate_database_content.py
+    if not items:
+        return None
+    return "{" + ",".join('"' + item.replace('"', '\\"') + '"' for item in items) + "}"
+
+def import_records(table):
+    """Rows shaped for the PostgREST importer (list columns as Postgres array literals)."""
+    records = table.to_pylist()
+    for record in records:
+        for c in ARRAY_COLUMNS:
+            record[c] = to_pg_array(record[c])
+    return records
+
+def embedding_texts(table):
+    """build_embedding_text for every row, in table order."""
+    return [build_embedding_text(row) for row in table.to_pylist()]
+
+def validate_table(table):
+    """List of (natural_key, problem) for rows the importer would reject or duplicate."""
+    problems = []
+    seen = set()
+    for row in table.to_pylist():
+        key = natural_key(row)
+        for c in REQUIRED_COLUMNS:
+            if not row.get(c):
+                problems.append((key, f"missing {c}"))
+        if row.get("estimated_hours") is None or row["estimated_hours"] <= 0:
+            problems.append((key, "estimated_hours must be > 0"))
+        if row.get("example_code") and not row.get("example_output"):
+            problems.append((key, "example_code without example_output"))
+        if key in seen:
+            problems.append((key, "duplicate natural key"))
+        seen.add(key)
+    return problems
+
+# --------------------------------------------------
+# Main
+# --------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Canonical columnar curriculum store")
+    parser.add_argument("--path", default=STORE_PATH)
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="convert source files into store partitions")
+    imp.add_argument("sources", nargs="+")
+    imp.add_argument("--workers", type=int, help="processes for large CSVs (default: all cores)")
+    val = sub.add_parser("validate")
+    val.add_argument("--skill")
+    val.add_argument("--module")
+    sub.add_parser("list")
+    args = parser.parse_args()
+
+    require_pyarrow()
+    start = datetime.now()
+
+    if args.command == "import":
+        print("=" * 70)
+        print("🗂️  CURRICULUM STORE IMPORT")
+        print("=" * 70)
+        tables = []
+        for source in args.sources:
+            loaded, unresolved = load_table(source, args.workers)
+            tables.append(loaded)
+            note = f" ({unresolved} with unresolved code/output)" if unresolved else ""
+            print(f"📥 {source}: {loaded.num_rows} records{note}")
+        loaded_rows = sum(t.num_rows for t in tables)
+        table = dedupe_table(pa.concat_tables(tables))
+        if loaded_rows > table.num_rows:
+            print(f"🧹 {loaded_rows - table.num_rows} duplicate natural keys collapsed")
+        write_store(table, args.path)
+        partitions = {tuple(p) for p in zip(*(table[c].to_pylist() for c in PARTITION_COLUMNS))}
+        print(f"💾 {table.num_rows} rows in {len(partitions)} partitions → {args.path}")
+    elif args.command == "validate":
+        table = read_store(args.path, skill_name=args.skill, module_name=args.module)
+        problems = validate_table(table)
+        for key, problem in problems:
+            print(f"⚠️  {' / '.join(str(k) for k in key)}: {problem}")
+        print(f"{'✅' if not problems else '❌'} {table.num_rows} rows checked, {len(problems)} problems")
+    else:
+        for skill, module, n in list_partitions(args.path):
+            print(f"   {skill} / {module}: {n} rows")
+
+    secs = (datetime.now() - start).total_seconds()
+    print(f"⏱ Total time: {secs:.1f} seconds")
+
+if __name__ == "__main__":
+    main()
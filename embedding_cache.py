@@ -0,0 +1,262 @@
+"""
+Query-embedding cache for the Python retrieval layer.
+
+Retrieval queries mostly come from a small closed vocabulary (role names and
+skills from roles_skills.csv), so repeated queries should never pay an OpenAI
+round trip. Lookups go through an in-memory LRU first, then a persistent
+SQLite store; only misses are embedded, in one batched request. Entries
+expire after a TTL and both tiers are size-limited. Entries are keyed by
+model_tag(model, dimensions), so vectors of another model, or of the same
+model at another size, are never served.
+
+Usage (warm the store from roles_skills.csv):
+    python embedding_cache.py [--path artifacts/query_embeddings.sqlite]
+"""
+import argparse
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+import generate_embeddings
+from generate_embeddings import get_embeddings, load_roles_skills, use_active_embedding_model
+
+# --------------------------------------------------
+# Config
+# --------------------------------------------------
+CACHE_PATH = os.path.join("artifacts", "query_embeddings.sqlite")
+MEMORY_ENTRIES = 4096
+STORE_ENTRIES = 100_000
+TTL_SECONDS = 30 * 24 * 3600
+
+# --------------------------------------------------
+# Helpers
+# --------------------------------------------------
+def normalize_query(text):
+    """Cache key for a query: case- and whitespace-insensitive."""
+    return " ".join(str(text).lower().split())
+
+def model_tag(model, dimensions=None):
+    """Cache key of an embedding model: 'model', or 'model@dimensions' when reduced."""
+    return f"{model}@{dimensions}" if dimensions else model
+
+def role_skill_vocabulary(roles=None):
+    """Every distinct role name and skill string from roles_skills.csv."""
+    roles = roles if roles is not None else load_roles_skills()
+    vocab = {}
+    for role in roles:
+        for text in [role["role_name"], *role["skills"]]:
+            vocab.setdefault(normalize_query(text), text)
+    return list(vocab.values())
+
+# --------------------------------------------------
+# Cache
+# --------------------------------------------------
+class QueryEmbeddingCache:
+    """
+    Two-tier (LRU + SQLite) cache of query embeddings with hit/miss counters.
+
+    Without a model the cache follows generate_embeddings.EMBEDDING_MODEL /
+    EMBEDDING_DIMENSIONS at call time, so a later use_active_embedding_model()
+    is honoured. embed_fn, when given, must embed with that same model.
+    """
+
+    def __init__(
+        self,
+        path=CACHE_PATH,
+        memory_entries=MEMORY_ENTRIES,
+        store_entries=STORE_ENTRIES,
+        ttl_seconds=TTL_SECONDS,
+        model=None,
+        dimensions=None,
+        embed_fn=None,
+    ):
+        self.memory_entries = memory_entries
+        self.store_entries = store_entries
+        self.ttl_seconds = ttl_seconds
+        self.fixed_model = model
+        self.dimensions = dimensions
+        self.embed_fn = embed_fn
+        self.memory = OrderedDict()  # key -> (vector, created_at), all of memory_model
+        self.memory_model = None
+        # Guards both tiers; never held across the embedding call itself
+        self.lock = threading.Lock()
+        self.memory_hits = 0
+        self.store_hits = 0
+        self.misses = 0
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS query_embeddings (
+                model TEXT NOT NULL,
+                query_key TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (model, query_key)
+            )
+        """)
+        self.db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_query_embeddings_created_at "
+            "ON query_embeddings(created_at)"
+        )
+        self.db.commit()
+
+    def resolved_model(self):
+        """(model, dimensions) queries are embedded with right now."""
+        if self.fixed_model is not None:
+            return self.fixed_model, self.dimensions
+        return generate_embeddings.EMBEDDING_MODEL, generate_embeddings.EMBEDDING_DIMENSIONS
+
+    @property
+    def model(self):
+        return model_tag(*self.resolved_model())
+
+    def _expired(self, created_at, now):
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def _remember(self, key, vector, created_at):
+        self.memory[key] = (vector, created_at)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_entries:
+            self.memory.popitem(last=False)
+
+    def _lookup(self, keys, now):
+        """Resolve keys from memory, then the store. Returns {key: vector}."""
+        found = {}
+        pending = []
+        for key in keys:
+            entry = self.memory.get(key)
+            if entry and not self._expired(entry[1], now):
+                self.memory.move_to_end(key)
+                found[key] = entry[0]
+                self.memory_hits += 1
+            else:
+                self.memory.pop(key, None)
+                pending.append(key)
+
+        for i in range(0, len(pending), 500):
+            chunk = pending[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            cursor = self.db.execute(
+                f"SELECT query_key, vector, created_at FROM query_embeddings "
+                f"WHERE model = ? AND query_key IN ({placeholders})",
+                [self.model, *chunk]
+            )
+            for key, blob, created_at in cursor:
+                if self._expired(created_at, now):
+                    continue
+                vector = np.frombuffer(blob, dtype=np.float32)
+                found[key] = vector
+                self._remember(key, vector, created_at)
+                self.store_hits += 1
+        return found
+
+    def _store(self, entries, now):
+        self.db.executemany(
+            "INSERT OR REPLACE INTO query_embeddings (model, query_key, vector, created_at) "
+            "VALUES (?, ?, ?, ?)",
+            [(self.model, key, vector.tobytes(), now) for key, vector in entries]
+        )
+        self.db.execute(
+            "DELETE FROM query_embeddings WHERE created_at < ?",
+            (now - self.ttl_seconds if self.ttl_seconds is not None else float("-inf"),)
+        )
+        # Size limit: drop the oldest entries beyond store_entries
+        self.db.execute(
+            "DELETE FROM query_embeddings WHERE rowid IN ("
+            "  SELECT rowid FROM query_embeddings ORDER BY created_at DESC LIMIT -1 OFFSET ?"
+            ")",
+            (self.store_entries,)
+        )
+        self.db.commit()
+
+    def embed_many(self, texts):
+        """
+        Embeddings for `texts` as a float32 matrix, in input order.
+
+        Cached vectors are reused; the distinct misses are embedded in one
+        batched call and written to both tiers.
+        """
+        now = time.time()
+        keys = [normalize_query(t) for t in texts]
+        with self.lock:
+            if self.model != self.memory_model:
+                self.memory.clear()
+                self.memory_model = self.model
+            found = self._lookup(dict.fromkeys(keys), now)
+
+            missing = {}
+            for key, text in zip(keys, texts):
+                if key not in found and key not in missing:
+                    missing[key] = text
+            self.misses += len(missing)
+
+        if missing:
+            if self.embed_fn is not None:
+                vectors = self.embed_fn(list(missing.values()))
+            else:
+                model, dimensions = self.resolved_model()
+                vectors = get_embeddings(list(missing.values()), model=model, dimensions=dimensions)
+            new_entries = []
+            with self.lock:
+                for key, vector in zip(missing, vectors):
+                    vector = np.asarray(vector, dtype=np.float32)
+                    found[key] = vector
+                    self._remember(key, vector, now)
+                    new_entries.append((key, vector))
+                self._store(new_entries, now)
+
+        if not keys:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack([found[key] for key in keys])
+
+    def embed(self, text):
+        return self.embed_many([text])[0]
+
+    def warm(self, texts=None):
+        """Make sure every role and skill string is cached; returns how many were requested."""
+        texts = texts if texts is not None else role_skill_vocabulary()
+        self.embed_many(texts)
+        return len(texts)
+
+    def stats(self):
+        hits = self.memory_hits + self.store_hits
+        lookups = hits + self.misses
+        with self.lock:
+            store_size = self.db.execute(
+                "SELECT COUNT(*) FROM query_embeddings WHERE model = ?", (self.model,)
+            ).fetchone()[0]
+        return {
+            "memory_hits": self.memory_hits,
+            "store_hits": self.store_hits,
+            "misses": self.misses,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_size": len(self.memory),
+            "store_size": store_size,
+        }
+
+    def close(self):
+        self.db.close()
+
+# --------------------------------------------------
+# Main
+# --------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Warm the query-embedding cache from roles_skills.csv")
+    parser.add_argument("--path", default=CACHE_PATH)
+    args = parser.parse_args()
+
+    model, dimensions = use_active_embedding_model()
+    cache = QueryEmbeddingCache(args.path, model=model, dimensions=dimensions)
+    count = cache.warm()
+    print(f"🔥 Warmed {count} role/skill queries → {args.path}")
+    print(f"📊 {cache.stats()}")
+    cache.close()
+
+if __name__ == "__main__":
+    main()
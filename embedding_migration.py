@@ -0,0 +1,322 @@
+"""
+Zero-downtime embedding model migration.
+
+Switching EMBEDDING_MODEL used to mean nulling every vector and waiting for
+generate_embeddings.py to catch up, with search down in between. Instead
+(tables and functions in supabase/migrations/create_embedding_versions.sql):
+
+    1. register   add the candidate model to embedding_models as 'shadow'
+    2. backfill   re-embed every row with the candidate into
+                  learning_content_embeddings, paced to --quota-share of the
+                  account's request/token limits so production traffic keeps
+                  the rest; edited rows (text hash changed) are redone
+    3. shadow     retrieval.py --shadow-model ranks every query with both
+                  models and logs overlap@k to artifacts/shadow_reads.jsonl
+    4. status     coverage, stale rows and shadow agreement vs thresholds
+    5. cutover    once coverage and agreement pass, one transaction swaps the
+                  candidate vectors into learning_content.embedding; the old
+                  vectors are kept, so a cutover back is the rollback
+
+Search keeps serving the active model's vectors the whole time, with one
+exception. A candidate with different dimensions makes the cutover retype
+learning_content.embedding under an ACCESS EXCLUSIVE lock, so search stalls
+until the table rewrite and the index rebuilds commit. Such a cutover needs
+--allow-retype and belongs in a maintenance window.
+
+Writers read the active model from embedding_models themselves
+(generate_embeddings.use_active_embedding_model, and embedding_worker.py
+every MODEL_CHECK_INTERVAL). complete_embedding_jobs refuses vectors from
+any other model, so nothing needs restarting after a cutover.
+
+Usage:
+    python embedding_migration.py register --model text-embedding-3-large --dimensions 1536
+    python embedding_migration.py backfill --model text-embedding-3-large --quota-share 0.2 [--follow]
+    python retrieval.py queries.txt --shadow-model text-embedding-3-large --shadow-dimensions 1536 --output /tmp/r.json
+    python embedding_migration.py status --model text-embedding-3-large
+    python embedding_migration.py cutover --model text-embedding-3-large [--min-coverage 1.0] [--min-agreement 0.6] [--allow-retype]
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+import requests
+
+from generate_embeddings import (
+    MODEL_CHECK_INTERVAL,
+    MODELS_TABLE,
+    SUPABASE_HEADERS,
+    SUPABASE_URL,
+    build_embedding_text,
+    fetch_all_rows,
+    format_vector,
+    get_embeddings,
+    send_json,
+)
+from retrieval import SHADOW_LOG, VERSIONS_TABLE
+
+# --------------------------------------------------
+# Config
+# --------------------------------------------------
+TEXT_COLUMNS = "id,skill_name,module_name,topic_name,subtopic_name,description,tags,prerequisites,estimated_hours"
+QUOTA_SHARE = 0.2            # fraction of the OpenAI limits the backfill may use
+RPM_LIMIT = 3000             # account requests per minute for the embeddings endpoint
+TPM_LIMIT = 1_000_000        # account tokens per minute
+CHARS_PER_TOKEN = 4          # rough English estimate; only used for pacing
+BACKFILL_BATCH = 64
+UPSERT_CHUNK = 200
+FOLLOW_INTERVAL = 60         # seconds between passes with --follow
+MIN_COVERAGE = 1.0
+MIN_AGREEMENT = 0.6          # mean overlap@k of shadow reads
+MIN_SHADOW_QUERIES = 50
+
+# --------------------------------------------------
+# Registry
+# --------------------------------------------------
+def get_model(model):
+    rows = list(fetch_all_rows("model,dimensions,status", filters={"model": f"eq.{model}"},
+                               table=MODELS_TABLE, order="model"))
+    if not rows:
+        raise RuntimeError(f"❌ {model} is not registered (run: embedding_migration.py register --model {model})")
+    return rows[0]
+
+def register_model(model, dimensions=None):
+    """Add model as a shadow candidate; probes one embedding when dimensions is not given."""
+    if not dimensions:
+        dimensions = len(get_embeddings(["dimension probe"], model=model)[0])
+    resp = send_json(
+        "POST",
+        f"{SUPABASE_URL}/rest/v1/{MODELS_TABLE}?on_conflict=model",
+        [{"model": model, "dimensions": dimensions}],
+        {**SUPABASE_HEADERS, "Prefer": "resolution=ignore-duplicates,return=minimal"},
+    )
+    resp.raise_for_status()
+    return dimensions
+
+def rpc(name, payload):
+    resp = send_json("POST", f"{SUPABASE_URL}/rest/v1/rpc/{name}", payload, SUPABASE_HEADERS)
+    if resp.status_code >= 400:
+        raise RuntimeError(f"❌ {name} failed: {resp.status_code} {resp.text}")
+    return resp.json() if resp.content else None
+
+def coverage(model):
+    rows = rpc("embedding_model_coverage", {"target_model": model})
+    return rows[0] if rows else {"total": 0, "covered": 0}
+
+# --------------------------------------------------
+# Throttled backfill
+# --------------------------------------------------
+class QuotaPacer:
+    """
+    Spaces requests so the backfill stays at `share` of the request and token
+    limits. Each request reserves its slot on both schedules; a 429 pushes
+    both back with exponential backoff.
+    """
+
+    def __init__(self, share=QUOTA_SHARE, rpm=RPM_LIMIT, tpm=TPM_LIMIT):
+        self.request_gap = 60.0 / (share * rpm)
+        self.token_gap = 60.0 / (share * tpm)
+        self.next_request = self.next_token = time.monotonic()
+        self.backoff = 0.0
+        self.waited = 0.0
+
+    def wait(self, tokens):
+        now = time.monotonic()
+        start = max(now, self.next_request, self.next_token)
+        if start > now:
+            time.sleep(start - now)
+            self.waited += start - now
+        self.next_request = start + self.request_gap
+        self.next_token = start + tokens * self.token_gap
+
+    def throttled(self):
+        self.backoff = min(60.0, max(1.0, self.backoff * 2))
+        self.next_request = self.next_token = time.monotonic() + self.backoff
+
+    def succeeded(self):
+        self.backoff = 0.0
+
+def text_hash(text):
+    return hashlib.sha256(text.encode()).hexdigest()
+
+def pending_rows(model):
+    """Rows with no candidate vector, or whose text changed since it was made."""
+    stored = {
+        row["content_id"]: row["text_hash"]
+        for row in fetch_all_rows("content_id,text_hash", filters={"model": f"eq.{model}"},
+                                  table=VERSIONS_TABLE, order="content_id")
+    }
+    pending = []
+    for row in fetch_all_rows(TEXT_COLUMNS):
+        text = build_embedding_text(row)
+        digest = text_hash(text)
+        known = stored.get(str(row["id"]), "")
+        # NULL hash: vectors kept from a previous cutover, text unknown → trusted
+        if known == "" or (known is not None and known != digest):
+            pending.append((str(row["id"]), text, digest))
+    return pending
+
+def upsert_versions(records):
+    for i in range(0, len(records), UPSERT_CHUNK):
+        resp = send_json(
+            "POST",
+            f"{SUPABASE_URL}/rest/v1/{VERSIONS_TABLE}?on_conflict=model,content_id",
+            records[i:i + UPSERT_CHUNK],
+            {**SUPABASE_HEADERS, "Prefer": "resolution=merge-duplicates,return=minimal"},
+        )
+        resp.raise_for_status()
+
+def backfill(model, dimensions, pacer, batch_size=BACKFILL_BATCH):
+    """One pass over learning_content. Returns (embedded, pending at start)."""
+    pending = pending_rows(model)
+    done = 0
+    i = 0
+    while i < len(pending):
+        batch = pending[i:i + batch_size]
+        pacer.wait(sum(len(text) for _, text, _ in batch) // CHARS_PER_TOKEN + 1)
+        try:
+            vectors = get_embeddings([text for _, text, _ in batch], batch_size, model=model, dimensions=dimensions)
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 429:
+                pacer.throttled()
+                print(f"⏳ Rate limited, backing off {pacer.backoff:.0f}s")
+                continue
+            raise
+        pacer.succeeded()
+        for vector in vectors:
+            if len(vector) != dimensions:
+                raise RuntimeError(f"❌ {model} returned {len(vector)} dims, registry says {dimensions}")
+        now = datetime.now(timezone.utc).isoformat()
+        upsert_versions([
+            {"content_id": cid, "model": model, "embedding": format_vector(v), "text_hash": digest, "embedded_at": now}
+            for (cid, _, digest), v in zip(batch, vectors)
+        ])
+        done += len(batch)
+        i += batch_size
+        print(f"✅ [{done}/{len(pending)}] re-embedded with {model}")
+    return done, len(pending)
+
+# --------------------------------------------------
+# Status
+# --------------------------------------------------
+def shadow_agreement(model, log_path=SHADOW_LOG):
+    """(queries, mean overlap@k) over the shadow-read log for model."""
+    overlaps = []
+    if os.path.exists(log_path):
+        with open(log_path, encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                if entry["model"] == model:
+                    overlaps.append(entry["overlap"])
+    return len(overlaps), (sum(overlaps) / len(overlaps) if overlaps else None)
+
+def check_thresholds(model, min_coverage, min_agreement, min_queries):
+    """Gate results as {name: (ok, detail)}."""
+    cov = coverage(model)
+    ratio = cov["covered"] / cov["total"] if cov["total"] else 1.0
+    n, mean = shadow_agreement(model)
+    return {
+        "coverage": (ratio >= min_coverage, f"{cov['covered']}/{cov['total']} = {ratio:.1%} (need {min_coverage:.0%})"),
+        "shadow_queries": (n >= min_queries, f"{n} logged (need {min_queries})"),
+        "agreement": (
+            mean is not None and mean >= min_agreement,
+            f"mean overlap@k {mean:.2f} (need {min_agreement:.2f})" if mean is not None else "no shadow reads yet",
+        ),
+    }
+
+def print_checks(checks):
+    for name, (ok, detail) in checks.items():
+        print(f"   {'✅' if ok else '❌'} {name:<15} {detail}")
+    return all(ok for ok, _ in checks.values())
+
+# --------------------------------------------------
+# Main
+# --------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Zero-downtime embedding model migration")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    reg = sub.add_parser("register", help="add a candidate model")
+    reg.add_argument("--model", required=True)
+    reg.add_argument("--dimensions", type=int, help="default: probe the model")
+
+    back = sub.add_parser("backfill", help="re-embed rows with the candidate, throttled")
+    back.add_argument("--model", required=True)
+    back.add_argument("--quota-share", type=float, default=QUOTA_SHARE)
+    back.add_argument("--rpm", type=int, default=RPM_LIMIT, help="account requests/minute")
+    back.add_argument("--tpm", type=int, default=TPM_LIMIT, help="account tokens/minute")
+    back.add_argument("--batch-size", type=int, default=BACKFILL_BATCH)
+    back.add_argument("--follow", action="store_true", help=f"keep catching up every {FOLLOW_INTERVAL}s")
+
+    for name, help_text in (("status", "coverage and shadow agreement"), ("cutover", "swap the candidate in atomically")):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("--model", required=True)
+        p.add_argument("--min-coverage", type=float, default=MIN_COVERAGE)
+        p.add_argument("--min-agreement", type=float, default=MIN_AGREEMENT)
+        p.add_argument("--min-shadow-queries", type=int, default=MIN_SHADOW_QUERIES)
+    sub.choices["cutover"].add_argument("--force", action="store_true", help="skip the shadow-agreement gate")
+    sub.choices["cutover"].add_argument(
+        "--allow-retype", action="store_true",
+        help="allow a dimension change (retypes the column; search stalls until it commits)"
+    )
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print(f"🔁 EMBEDDING MODEL MIGRATION · {args.command}")
+    print("=" * 70)
+    start = datetime.now()
+
+    if args.command == "register":
+        dims = register_model(args.model, args.dimensions)
+        print(f"✅ {args.model} registered ({dims} dims) as shadow")
+
+    elif args.command == "backfill":
+        model = get_model(args.model)
+        pacer = QuotaPacer(args.quota_share, args.rpm, args.tpm)
+        print(f"🐢 Pacing at {args.quota_share:.0%} of {args.rpm} RPM / {args.tpm:,} TPM")
+        while True:
+            done, pending = backfill(model["model"], model["dimensions"], pacer, args.batch_size)
+            print(f"📦 Pass done: {done}/{pending} rows re-embedded, {pacer.waited:.0f}s spent pacing")
+            if not args.follow:
+                break
+            time.sleep(FOLLOW_INTERVAL)
+
+    elif args.command == "status":
+        model = get_model(args.model)
+        print(f"📋 {model['model']} ({model['dimensions']} dims, {model['status']})")
+        print(f"🕓 {len(pending_rows(model['model']))} rows missing or stale")
+        ready = print_checks(check_thresholds(args.model, args.min_coverage, args.min_agreement, args.min_shadow_queries))
+        print("🚦 Ready for cutover" if ready else "🚦 Not ready")
+
+    elif args.command == "cutover":
+        model = get_model(args.model)
+        active = next(iter(fetch_all_rows("model,dimensions", filters={"status": "eq.active"},
+                                          table=MODELS_TABLE, order="model")), None)
+        if active and active["dimensions"] != model["dimensions"] and not args.allow_retype:
+            print(f"❌ {active['model']} has {active['dimensions']} dims, {args.model} has {model['dimensions']}: "
+                  f"the cutover would retype learning_content.embedding and block search until it commits. "
+                  f"Re-run with --allow-retype in a maintenance window, or register the candidate "
+                  f"with --dimensions {active['dimensions']}")
+            sys.exit(1)
+        # Catch up rows edited since the last pass so the swap is as fresh as possible
+        done, _ = backfill(model["model"], model["dimensions"], QuotaPacer())
+        print(f"🔄 Catch-up pass re-embedded {done} rows")
+        checks = check_thresholds(args.model, args.min_coverage, args.min_agreement, args.min_shadow_queries)
+        if args.force:
+            checks = {k: v for k, v in checks.items() if k == "coverage"}
+        if not print_checks(checks):
+            print("❌ Thresholds not met; nothing changed")
+            sys.exit(1)
+        result = rpc("cutover_embedding_model", {"target_model": args.model, "min_coverage": args.min_coverage})
+        print(f"✅ Cutover complete: {result}")
+        print(f"🔀 Writers switch to {args.model} on their next model check "
+              f"(embedding_worker.py within {MODEL_CHECK_INTERVAL}s)")
+
+    secs = (datetime.now() - start).total_seconds()
+    print(f"⏱ Total time: {secs:.1f} seconds")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,441 @@
+"""
+Long-running embedding worker.
+
+generate_embeddings.py is one-shot, so content imported after it exits stays
+unsearchable until the next manual run. This worker drains the
+embedding_queue table (filled by a trigger on learning_content, see
+supabase/migrations/create_embedding_queue.sql) instead of scanning
+learning_content:
+
+    1. claim up to MAX_BATCH ready jobs (leased), in weighted-fair order
+       across skills: new rows, rows without a vector and skills with active
+       learners ahead of refreshes of edited rows (see
+       supabase/migrations/add_embedding_queue_priorities.sql)
+    2. if the batch is not full, wait BATCH_WINDOW seconds and top it up
+    3. embed the batch in one request and write the vectors back in one RPC
+
+The model is the active row of embedding_models, re-read every
+MODEL_CHECK_INTERVAL seconds. Every result is tagged with the model that
+produced it, and complete_embedding_jobs (create_embedding_versions.sql)
+refuses vectors from any other model. A worker that is still on the old model
+right after a cutover therefore gets its jobs released for retry, instead of
+mixing models in learning_content.embedding.
+
+With DATABASE_URL (a direct Postgres connection, e.g. a local Postgres) and
+psycopg installed, the worker LISTENs on the embedding_queue channel and
+wakes as soon as a row is queued. Otherwise it calls the same functions over
+PostgREST RPC, polling only the small queue table every POLL_INTERVAL.
+Several workers can run side by side; leases keep them from double-claiming.
+
+Health and lag are served over HTTP:
+    GET /health    200 while the loop is alive and not failing, else 503
+    GET /metrics   processed/failed counts, queue depth, lag percentiles,
+                   all of them also per priority class
+
+Usage:
+    python embedding_worker.py [--port 8766] [--max-batch 64] [--window 0.5] [--weights new=8,missing=4,refresh=1]
+    DATABASE_URL=postgresql://localhost/pathwise python embedding_worker.py
+"""
+import argparse
+import json
+import os
+import signal
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from generate_embeddings import (
+    MODEL_CHECK_INTERVAL,
+    SUPABASE_HEADERS,
+    SUPABASE_URL,
+    active_embedding_model,
+    build_embedding_text,
+    format_vector,
+    get_embeddings,
+    send_json,
+)
+
+try:
+    import psycopg
+except ImportError:
+    psycopg = None
+
+# --------------------------------------------------
+# Config
+# --------------------------------------------------
+MAX_BATCH = 64
+BATCH_WINDOW = 0.5       # seconds to let a partial batch fill up
+POLL_INTERVAL = 2.0      # seconds between empty polls (PostgREST mode)
+LEASE_SECONDS = 120
+MAX_ATTEMPTS = 5
+CHANNEL = "embedding_queue"
+PORT = 8766
+LAG_SAMPLES = 1000
+UNHEALTHY_FAILURES = 3   # consecutive failed batches before /health reports 503
+PRIORITY_CLASSES = ("new", "missing", "refresh")
+CLASS_WEIGHTS = {"new": 8.0, "missing": 4.0, "refresh": 1.0}
+ACTIVE_SKILL_BOOST = 2.0  # weight multiplier for skills with learners active in the last ACTIVE_DAYS
+ACTIVE_DAYS = 14
+
+# --------------------------------------------------
+# Queue backends
+# --------------------------------------------------
+def schedule_params(weights=None, active_skill_boost=ACTIVE_SKILL_BOOST, active_days=ACTIVE_DAYS):
+    """Scheduling arguments for claim_embedding_jobs."""
+    weights = {**CLASS_WEIGHTS, **(weights or {})}
+    return {
+        "weight_new": weights["new"],
+        "weight_missing": weights["missing"],
+        "weight_refresh": weights["refresh"],
+        "active_skill_boost": active_skill_boost,
+        "active_days": active_days,
+    }
+
+class RestQueue:
+    """Queue functions called over PostgREST RPC; waiting is a plain sleep."""
+
+    def __init__(self, poll_interval=POLL_INTERVAL, schedule=None):
+        self.poll_interval = poll_interval
+        self.schedule = schedule or schedule_params()
+
+    def _rpc(self, name, payload):
+        resp = send_json("POST", f"{SUPABASE_URL}/rest/v1/rpc/{name}", payload, SUPABASE_HEADERS)
+        resp.raise_for_status()
+        return resp.json() if resp.content else None
+
+    def claim(self, batch_size):
+        return self._rpc("claim_embedding_jobs", {
+            "batch_size": batch_size,
+            "lease_seconds": LEASE_SECONDS,
+            "max_attempts": MAX_ATTEMPTS,
+            **self.schedule,
+        })
+
+    def complete(self, results):
+        return self._rpc("complete_embedding_jobs", {"results": results})
+
+    def fail(self, content_ids, error):
+        self._rpc("fail_embedding_jobs", {"content_ids": content_ids, "error_message": error})
+
+    def stats(self):
+        rows = self._rpc("embedding_queue_stats", {"max_attempts": MAX_ATTEMPTS})
+        return rows[0] if rows else {}
+
+    def class_stats(self):
+        return self._rpc("embedding_queue_class_stats", {"max_attempts": MAX_ATTEMPTS}) or []
+
+    def wait(self, timeout):
+        time.sleep(min(timeout, self.poll_interval))
+
+    def close(self):
+        pass
+
+class PostgresQueue:
+    """Same functions over a direct connection, woken by LISTEN/NOTIFY."""
+
+    def __init__(self, dsn, schedule=None):
+        if psycopg is None:
+            raise RuntimeError("❌ psycopg is required for DATABASE_URL mode (pip install psycopg)")
+        self.conn = psycopg.connect(dsn, autocommit=True)
+        # A second connection only listens, so notifications never interleave with queries
+        self.listener = psycopg.connect(dsn, autocommit=True)
+        self.listener.execute(f"LISTEN {CHANNEL}")
+        self.schedule = schedule or schedule_params()
+
+    def _query(self, sql, params):
+        cursor = self.conn.execute(sql, params)
+        columns = [c.name for c in cursor.description] if cursor.description else []
+        return [dict(zip(columns, row)) for row in cursor.fetchall()] if columns else []
+
+    def claim(self, batch_size):
+        s = self.schedule
+        return self._query(
+            "SELECT * FROM claim_embedding_jobs(%s, %s, %s, %s, %s, %s, %s, %s)",
+            (batch_size, LEASE_SECONDS, MAX_ATTEMPTS, s["weight_new"], s["weight_missing"],
+             s["weight_refresh"], s["active_skill_boost"], s["active_days"])
+        )
+
+    def complete(self, results):
+        return self._query("SELECT complete_embedding_jobs(%s::jsonb) AS written", (json.dumps(results),))[0]["written"]
+
+    def fail(self, content_ids, error):
+        self._query("SELECT fail_embedding_jobs(%s, %s)", (content_ids, error))
+
+    def stats(self):
+        rows = self._query("SELECT * FROM embedding_queue_stats(%s)", (MAX_ATTEMPTS,))
+        return rows[0] if rows else {}
+
+    def class_stats(self):
+        return self._query("SELECT * FROM embedding_queue_class_stats(%s)", (MAX_ATTEMPTS,))
+
+    def wait(self, timeout):
+        """Block until a NOTIFY arrives or timeout passes."""
+        for _ in self.listener.notifies(timeout=timeout, stop_after=1):
+            pass
+
+    def close(self):
+        self.conn.close()
+        self.listener.close()
+
+# --------------------------------------------------
+# Worker
+# --------------------------------------------------
+def parse_timestamp(value):
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+class EmbeddingWorker:
+    """Claim → micro-batch → embed → write back, with counters for /metrics."""
+
+    def __init__(self, queue, max_batch=MAX_BATCH, window=BATCH_WINDOW, embed_fn=get_embeddings,
+                 model_fn=active_embedding_model):
+        self.queue = queue
+        self.max_batch = max_batch
+        self.window = window
+        self.embed_fn = embed_fn
+        self.model_fn = model_fn
+        self.model = None       # (model, dimensions)
+        self.model_checked_at = 0.0
+        self.not_written = 0      # results complete_embedding_jobs did not write
+        # The queue connection is shared with the metrics thread
+        self.lock = threading.Lock()
+        self.running = True
+        self.started_at = time.time()
+        self.heartbeat = time.time()
+        self.processed = 0
+        self.failed = 0
+        self.batches = 0
+        self.consecutive_failures = 0
+        self.last_batch_at = None
+        self.last_error = None
+        self.lags = deque(maxlen=LAG_SAMPLES)  # seconds from enqueue to searchable
+        self.class_lags = {c: deque(maxlen=LAG_SAMPLES) for c in PRIORITY_CLASSES}
+        self.processed_by_class = Counter()
+
+    def _claim(self, n):
+        with self.lock:
+            return self.queue.claim(n) or []
+
+    def next_batch(self):
+        """Claim a batch; a partial batch gets one BATCH_WINDOW to fill up."""
+        jobs = self._claim(self.max_batch)
+        if jobs and len(jobs) < self.max_batch and self.window:
+            time.sleep(self.window)
+            jobs += self._claim(self.max_batch - len(jobs))
+        return jobs
+
+    def current_model(self):
+        """Active (model, dimensions), re-read at most every MODEL_CHECK_INTERVAL."""
+        if self.model is None or time.time() - self.model_checked_at > MODEL_CHECK_INTERVAL:
+            model = self.model_fn()
+            if self.model is not None and model != self.model:
+                print(f"🔀 Active model changed: {self.model[0]} → {model[0]}")
+            self.model, self.model_checked_at = model, time.time()
+        return self.model
+
+    def process(self, jobs):
+        live = [j for j in jobs if j.get("row_data")]
+        results = [
+            {"content_id": j["content_id"], "version": j["version"], "embedding": None}
+            for j in jobs if not j.get("row_data")
+        ]
+        try:
+            model, dimensions = self.current_model()
+            texts = [build_embedding_text(j["row_data"]) for j in live]
+            vectors = self.embed_fn(texts, model=model, dimensions=dimensions) if live else []
+            results += [
+                {"content_id": j["content_id"], "version": j["version"], "embedding": format_vector(v), "model": model}
+                for j, v in zip(live, vectors)
+            ]
+            with self.lock:
+                written = self.queue.complete(results)
+            if live and written is not None and written < len(live):
+                # Superseded versions or a model the database refused: re-check before the next batch
+                self.not_written += len(live) - written
+                self.model_checked_at = 0.0
+        except Exception as e:
+            try:
+                with self.lock:
+                    self.queue.fail([j["content_id"] for j in jobs], str(e)[:500])
+            except Exception:
+                pass  # the leases expire on their own
+            self.failed += len(jobs)
+            self.consecutive_failures += 1
+            self.last_error = f"{datetime.now().isoformat()} {e}"
+            print(f"❌ Batch of {len(jobs)} failed: {e}")
+            return 0
+
+        now = datetime.now(timezone.utc)
+        for j in live:
+            lag = (now - parse_timestamp(j["enqueued_at"])).total_seconds()
+            self.lags.append(lag)
+            # Older queue functions return no class; count those as refreshes
+            cls = j.get("priority_class") or "refresh"
+            self.class_lags.setdefault(cls, deque(maxlen=LAG_SAMPLES)).append(lag)
+            self.processed_by_class[cls] += 1
+        self.processed += len(live)
+        self.batches += 1
+        self.consecutive_failures = 0
+        self.last_batch_at = time.time()
+        classes = Counter(j.get("priority_class") or "refresh" for j in live)
+        mix = " ".join(f"{c}={n}" for c, n in classes.items())
+        print(f"✅ [{self.processed}] Embedded {len(live)} rows [{mix}] (lag {self.lags[-1] if live else 0:.1f}s)")
+        return len(live)
+
+    def run(self):
+        while self.running:
+            self.heartbeat = time.time()
+            try:
+                jobs = self.next_batch()
+            except Exception as e:
+                self.consecutive_failures += 1
+                self.last_error = f"{datetime.now().isoformat()} {e}"
+                print(f"❌ Claim failed: {e}")
+                time.sleep(5)
+                continue
+            if jobs:
+                self.process(jobs)
+            else:
+                self.queue.wait(POLL_INTERVAL)
+
+    def stop(self, *_):
+        self.running = False
+
+    def healthy(self):
+        stalled = time.time() - self.heartbeat > LEASE_SECONDS
+        return not stalled and self.consecutive_failures < UNHEALTHY_FAILURES
+
+    def metrics(self):
+        with self.lock:
+            try:
+                queue = self.queue.stats()
+                by_class = self.queue.class_stats()
+            except Exception as e:
+                queue = {"error": str(e)}
+                by_class = []
+        oldest = queue.get("oldest_enqueued_at")
+        lags = list(self.lags)
+        return {
+            "healthy": self.healthy(),
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "processed": self.processed,
+            "failed": self.failed,
+            # Results the database did not write (newer version queued, or not the active model)
+            "not_written": self.not_written,
+            "model": self.model[0] if self.model else None,
+            "batches": self.batches,
+            "last_batch_at": self.last_batch_at,
+            "last_error": self.last_error,
+            "queue_depth": queue.get("depth"),
+            "queue_ready": queue.get("ready"),
+            "queue_dead": queue.get("dead"),
+            # Age of the oldest job still waiting: how far behind the worker is right now
+            "queue_lag_seconds": (
+                round((datetime.now(timezone.utc) - parse_timestamp(oldest)).total_seconds(), 1)
+                if oldest else 0.0
+            ),
+            "lag_p50_seconds": percentile(lags, 0.50),
+            "lag_p95_seconds": percentile(lags, 0.95),
+            "classes": self.class_metrics(by_class),
+        }
+
+    def class_metrics(self, by_class):
+        """Queue depth, oldest waiting job and enqueue → searchable lag per priority class."""
+        now = datetime.now(timezone.utc)
+        stats = {row["priority_class"]: row for row in by_class}
+        metrics = {}
+        for cls in dict.fromkeys([*PRIORITY_CLASSES, *stats, *self.class_lags]):
+            row = stats.get(cls, {})
+            lags = list(self.class_lags.get(cls, ()))
+            oldest = row.get("oldest_enqueued_at")
+            metrics[cls] = {
+                "queue_depth": row.get("depth", 0),
+                "queue_ready": row.get("ready", 0),
+                "queue_skills": row.get("skills", 0),
+                "queue_lag_seconds": round((now - parse_timestamp(oldest)).total_seconds(), 1) if oldest else 0.0,
+                "processed": self.processed_by_class[cls],
+                "lag_p50_seconds": percentile(lags, 0.50),
+                "lag_p95_seconds": percentile(lags, 0.95),
+            }
+        return metrics
+
+# --------------------------------------------------
+# HTTP
+# --------------------------------------------------
+def make_handler(worker):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, body):
+            data = json.dumps(body, default=str).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/health":
+                healthy = worker.healthy()
+                self._send(200 if healthy else 503, {"healthy": healthy, "last_error": worker.last_error})
+            elif self.path == "/metrics":
+                self._send(200, worker.metrics())
+            else:
+                self._send(404, {"error": "not found"})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+# --------------------------------------------------
+# Main
+# --------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Continuous embedding worker")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--window", type=float, default=BATCH_WINDOW, help="seconds to fill a partial batch")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"),
+                        help="direct Postgres connection; enables LISTEN/NOTIFY")
+    parser.add_argument("--weights", default="", help="class weights, e.g. new=8,missing=4,refresh=1")
+    parser.add_argument("--active-skill-boost", type=float, default=ACTIVE_SKILL_BOOST)
+    parser.add_argument("--active-days", type=int, default=ACTIVE_DAYS)
+    args = parser.parse_args()
+
+    weights = {}
+    for item in filter(None, args.weights.split(",")):
+        name, _, value = item.partition("=")
+        if name.strip() not in CLASS_WEIGHTS:
+            parser.error(f"unknown priority class {name!r} (expected one of {', '.join(PRIORITY_CLASSES)})")
+        weights[name.strip()] = float(value)
+    schedule = schedule_params(weights, args.active_skill_boost, args.active_days)
+    queue = PostgresQueue(args.database_url, schedule) if args.database_url else RestQueue(schedule=schedule)
+    worker = EmbeddingWorker(queue, args.max_batch, args.window)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(worker))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    print("=" * 70)
+    print("🛠️  EMBEDDING WORKER")
+    print("=" * 70)
+    mode = "LISTEN/NOTIFY" if args.database_url else f"PostgREST polling every {POLL_INTERVAL}s"
+    print(f"📡 Queue: {mode} · metrics on http://127.0.0.1:{args.port}/metrics")
+    print(f"⚖️  Weights: {schedule}")
+
+    worker.run()
+    server.shutdown()
+    print(f"\n👋 Stopped after {worker.processed} rows · {worker.metrics()}")
+    queue.close()
+
+if __name__ == "__main__":
+    main()
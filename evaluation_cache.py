@@ -0,0 +1,350 @@
+"""
+Semantic answer-evaluation cache.
+
+evaluateBatch in lib/llmClient.ts sends every ambiguous answer to the LLM,
+even though many candidates give near-identical answers to the same generated
+question. This service embeds (question, answer) pairs in batches and reuses
+a prior verdict when both the question and the answer are within a cosine
+threshold of a cached pair. New verdicts are stored with a TTL, the least
+recently used entries are evicted past MAX_ENTRIES, and hit-rate metrics are
+exposed over HTTP.
+
+Payloads use the LLMQuestion / LLMEvaluation shapes from lib/llmClient.ts:
+    POST /lookup   {"questions": [LLMQuestion]}  → {"results": [LLMEvaluation | null]}
+    POST /store    {"questions": [LLMQuestion], "evaluations": [LLMEvaluation]}
+    GET  /metrics
+
+Usage:
+    python evaluation_cache.py [--port 8765] [--path artifacts/evaluation_cache.sqlite]
+"""
+import argparse
+import json
+import os
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from embedding_cache import QueryEmbeddingCache, normalize_query
+from generate_embeddings import get_embeddings
+from retrieval import normalize_rows
+
+# --------------------------------------------------
+# Config
+# --------------------------------------------------
+CACHE_PATH = os.path.join("artifacts", "evaluation_cache.sqlite")
+QUESTION_THRESHOLD = 0.97  # the same generated question, modulo formatting
+ANSWER_THRESHOLD = 0.92    # near-identical answers only
+MIN_CONFIDENCE = 0.7       # never cache unsure or fallback verdicts
+MAX_ENTRIES = 50_000
+TTL_SECONDS = 14 * 24 * 3600
+PORT = 8765
+
+# --------------------------------------------------
+# Cache
+# --------------------------------------------------
+class EvaluationCache:
+    """Verdicts keyed by (question, answer) embeddings, searched with an in-memory matrix scan."""
+
+    def __init__(
+        self,
+        path=CACHE_PATH,
+        question_threshold=QUESTION_THRESHOLD,
+        answer_threshold=ANSWER_THRESHOLD,
+        max_entries=MAX_ENTRIES,
+        ttl_seconds=TTL_SECONDS,
+        question_cache=None,
+        embed_fn=get_embeddings,
+    ):
+        self.question_threshold = question_threshold
+        self.answer_threshold = answer_threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        # Questions repeat across candidates, so they go through the query cache
+        self.question_cache = question_cache or QueryEmbeddingCache()
+        self.embed_fn = embed_fn
+        # One lock serialises the SQLite connection and the in-memory index;
+        # embedding calls run outside it
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.unmatched = 0
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS evaluations (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                question TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                verdict TEXT NOT NULL,
+                question_vector BLOB NOT NULL,
+                answer_vector BLOB NOT NULL,
+                created_at REAL NOT NULL,
+                last_hit_at REAL NOT NULL
+            )
+        """)
+        self.db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_evaluations_last_hit_at ON evaluations(last_hit_at)"
+        )
+        self.db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_evaluations_created_at ON evaluations(created_at)"
+        )
+        self.db.commit()
+        self._expire(time.time())
+        self._load()
+
+    # ---------- index ----------
+    def _load(self):
+        """
+        Build the in-memory vector index from the store (once, at start).
+
+        Rows live in slots of preallocated matrices. Removed rows free their
+        slot (zeroed, slot_ids -1), and new rows fill free slots or grow the
+        matrices, so stores never re-read the whole table.
+        """
+        rows = self.db.execute(
+            "SELECT id, verdict, question_vector, answer_vector FROM evaluations ORDER BY id"
+        ).fetchall()
+        self.slot_ids = np.array([r[0] for r in rows], dtype=np.int64)
+        self.slots = {int(r[0]): i for i, r in enumerate(rows)}
+        self.verdicts = [json.loads(r[1]) for r in rows]
+        self.free = []
+        if rows:
+            self.questions = np.stack([np.frombuffer(r[2], dtype=np.float32) for r in rows])
+            self.answers = np.stack([np.frombuffer(r[3], dtype=np.float32) for r in rows])
+        else:
+            self.questions = self.answers = None
+
+    def _grow(self, dim, needed):
+        """Add at least `needed` free slots, doubling the capacity."""
+        old = len(self.slot_ids)
+        extra = max(needed, old, 64)
+        blank = np.zeros((extra, dim), dtype=np.float32)
+        self.questions = blank if self.questions is None else np.concatenate([self.questions, blank])
+        self.answers = blank.copy() if self.answers is None else np.concatenate([self.answers, blank])
+        self.slot_ids = np.concatenate([self.slot_ids, np.full(extra, -1, dtype=np.int64)])
+        self.verdicts.extend([None] * extra)
+        self.free.extend(range(old + extra - 1, old - 1, -1))  # pop() hands out the lowest slot
+
+    def _add(self, entries):
+        """Index new rows: [(id, verdict, question vector, answer vector)]."""
+        if len(self.free) < len(entries):
+            self._grow(len(entries[0][2]), len(entries) - len(self.free))
+        for row_id, verdict, q_vec, a_vec in entries:
+            slot = self.free.pop()
+            self.slot_ids[slot] = row_id
+            self.slots[row_id] = slot
+            self.verdicts[slot] = verdict
+            self.questions[slot] = q_vec
+            self.answers[slot] = a_vec
+
+    def _drop(self, ids):
+        """Free the slots of removed rows."""
+        for row_id in ids:
+            slot = self.slots.pop(row_id, None)
+            if slot is None:
+                continue
+            self.slot_ids[slot] = -1
+            self.verdicts[slot] = None
+            self.questions[slot] = 0
+            self.answers[slot] = 0
+            self.free.append(slot)
+
+    def _expire(self, now):
+        """Delete expired and least recently hit rows past max_entries; returns their ids."""
+        ids = [r[0] for r in self.db.execute(
+            "SELECT id FROM evaluations WHERE created_at < ? "
+            "UNION SELECT id FROM ("
+            "  SELECT id FROM evaluations WHERE created_at >= ? ORDER BY last_hit_at DESC LIMIT -1 OFFSET ?"
+            ")",
+            (now - self.ttl_seconds, now - self.ttl_seconds, self.max_entries)
+        )]
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            self.db.execute(f"DELETE FROM evaluations WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+        self.db.commit()
+        self.evictions += len(ids)
+        return ids
+
+    def _embed_pairs(self, questions):
+        q_vecs = self.question_cache.embed_many([q["question"] for q in questions])
+        a_vecs = self.embed_fn([q.get("userAnswer") or "(no answer)" for q in questions])
+        return (
+            normalize_rows(np.array(q_vecs, dtype=np.float32)),
+            normalize_rows(np.array(a_vecs, dtype=np.float32)),
+        )
+
+    # ---------- public API ----------
+    def lookup_many(self, questions):
+        """Cached verdict (with the caller's questionId) or None for each question."""
+        if not questions:
+            return []
+        # Embedding is network-bound, so it runs before taking the lock
+        q_vecs, a_vecs = self._embed_pairs(questions)
+        results = []
+        with self.lock:
+            now = time.time()
+            hit_ids = []
+            live = self.slot_ids >= 0
+            for q, q_vec, a_vec in zip(questions, q_vecs, a_vecs):
+                verdict = None
+                if self.questions is not None:
+                    q_scores = self.questions @ q_vec
+                    a_scores = self.answers @ a_vec
+                    ok = live & (q_scores >= self.question_threshold) & (a_scores >= self.answer_threshold)
+                    if ok.any():
+                        best = int(np.argmax(np.where(ok, q_scores + a_scores, -np.inf)))
+                        verdict = {**self.verdicts[best], "questionId": q.get("questionId")}
+                        hit_ids.append(int(self.slot_ids[best]))
+                results.append(verdict)
+                if verdict is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+            if hit_ids:
+                self.db.executemany(
+                    "UPDATE evaluations SET last_hit_at = ? WHERE id = ?",
+                    [(now, i) for i in hit_ids]
+                )
+                self.db.commit()
+        return results
+
+    def store_many(self, questions, evaluations):
+        """
+        Store confident verdicts; returns how many were written.
+
+        Each evaluation is paired with the question of the same questionId,
+        never by position, since the LLM may reorder or omit items. An
+        evaluation whose id matches no question (or a question id that
+        appears twice) is skipped and counted as unmatched.
+        """
+        ids = [q.get("questionId") for q in questions]
+        by_id = {i: q for i, q in zip(ids, questions) if i is not None and ids.count(i) == 1}
+        keep, seen, unmatched = [], set(), 0
+        for e in evaluations:
+            q = by_id.get(e.get("questionId"))
+            if q is None or e.get("questionId") in seen:
+                unmatched += 1
+                continue
+            seen.add(e["questionId"])
+            if e.get("confidence", 0) >= MIN_CONFIDENCE and e.get("status") != "skipped":
+                keep.append((q, e))
+        if not keep:
+            with self.lock:
+                self.unmatched += unmatched
+            return 0
+        # Embedding is network-bound, so it runs before taking the lock
+        q_vecs, a_vecs = self._embed_pairs([q for q, _ in keep])
+        with self.lock:
+            self.unmatched += unmatched
+            now = time.time()
+            added = []
+            for (q, e), q_vec, a_vec in zip(keep, q_vecs, a_vecs):
+                verdict = {k: v for k, v in e.items() if k != "questionId"}
+                cursor = self.db.execute(
+                    "INSERT INTO evaluations (question, answer, verdict, question_vector, "
+                    "answer_vector, created_at, last_hit_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        normalize_query(q["question"]),
+                        q.get("userAnswer") or "",
+                        json.dumps(verdict),
+                        q_vec.tobytes(),
+                        a_vec.tobytes(),
+                        now,
+                        now,
+                    )
+                )
+                added.append((cursor.lastrowid, verdict, q_vec, a_vec))
+            self.db.commit()
+            self.stores += len(keep)
+            self._add(added)
+            self._drop(self._expire(now))
+        return len(keep)
+
+    def evaluate(self, questions, evaluate_fn):
+        """Cached verdicts where possible; evaluate_fn(list of misses) grades the rest."""
+        results = self.lookup_many(questions)
+        misses = [q for q, r in zip(questions, results) if r is None]
+        if misses:
+            fresh = evaluate_fn(misses)
+            self.store_many(misses, fresh)
+            by_id = {e.get("questionId"): e for e in fresh}
+            results = [r if r is not None else by_id.get(q.get("questionId")) for q, r in zip(questions, results)]
+        return results
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "stores": self.stores,
+            "unmatched": self.unmatched,
+            "evictions": self.evictions,
+            "entries": len(self.slots),
+            "question_cache": self.question_cache.stats(),
+        }
+
+# --------------------------------------------------
+# HTTP service
+# --------------------------------------------------
+def make_handler(cache):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/metrics":
+                self._send(200, cache.stats())
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if self.path == "/lookup":
+                    self._send(200, {"results": cache.lookup_many(body.get("questions", []))})
+                elif self.path == "/store":
+                    stored = cache.store_many(body.get("questions", []), body.get("evaluations", []))
+                    self._send(200, {"stored": stored})
+                else:
+                    self._send(404, {"error": "not found"})
+            except Exception as e:
+                self._send(500, {"error": str(e)})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+# --------------------------------------------------
+# Main
+# --------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Semantic answer-evaluation cache service")
+    parser.add_argument("--path", default=CACHE_PATH)
+    parser.add_argument("--port", type=int, default=PORT)
+    args = parser.parse_args()
+
+    cache = EvaluationCache(args.path)
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), make_handler(cache))
+    print(f"🧠 Evaluation cache listening on http://127.0.0.1:{args.port} ({len(cache.slots)} entries)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n📊 {cache.stats()}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+In-memory facet index for filtered retrieval.
+
+Every skill_name, module_name and tags value maps to a compressed bitset over
+row ids (positions in the content matrix from retrieval.load_content_matrix).
+Filters combine with AND / OR / NOT on the bitsets, and the result is passed
+to retrieval.blocked_top_k as a mask, so a filtered query scores only the
+matching rows and its top-k is exact, unlike post-filtering a global top-k.
+
+Bitsets use whichever of two forms is smaller, as in a single Roaring
+container:
+    sparse   sorted int32 row ids      (4 bytes per member)
+    dense    bit-packed uint8 bitmap   (1 bit per row)
+A typical tag touches a few dozen rows and stays sparse; whole skills or the
+result of a NOT go dense.
+
+Usage (facet statistics and a sample filter):
+    python facet_index.py [--skill SKILL] [--module MODULE] [--tag TAG ...] [--any-tag TAG ...] [--exclude-tag TAG ...]
+"""
+import argparse
+from datetime import datetime
+
+import numpy as np
+
+from generate_embeddings import fetch_all_rows, parse_array
+
+# --------------------------------------------------
+# Config
+# --------------------------------------------------
+FACET_FIELDS = ("skill_name", "module_name", "tags")
+ARRAY_FACETS = ("tags",)
+FACET_COLUMNS = "id,skill_name,module_name,tags"
+
+# --------------------------------------------------
+# Bitset
+# --------------------------------------------------
+class Bitset:
+    """Immutable set of row ids in [0, size), stored sparse or dense."""
+
+    __slots__ = ("size", "ids", "bits", "_count")
+
+    def __init__(self, size, ids=None, bits=None):
+        self.size = size
+        self.ids = ids      # sorted unique int32, or None
+        self.bits = bits    # packbits(bitorder="little") uint8, or None
+        self._count = None
+
+    # ---------- construction ----------
+    @classmethod
+    def from_indices(cls, size, indices):
+        ids = np.unique(np.asarray(indices, dtype=np.int32))
+        return cls(size, ids=ids)._compact()
+
+    @classmethod
+    def from_mask(cls, mask):
+        mask = np.asarray(mask, dtype=bool)
+        return cls(len(mask), bits=np.packbits(mask, bitorder="little"))._compact()
+
+    @classmethod
+    def full(cls, size):
+        return ~cls(size, ids=np.empty(0, dtype=np.int32))
+
+    def _compact(self):
+        """Switch to whichever form is smaller for the current cardinality."""
+        sparse_bytes, dense_bytes = 4 * len(self), (self.size + 7) // 8
+        if self.ids is None and sparse_bytes < dense_bytes:
+            return Bitset(self.size, ids=self.indices())
+        if self.bits is None and sparse_bytes > dense_bytes:
+            return Bitset(self.size, bits=self._dense())
+        return self
+
+    # ---------- views ----------
+    def _dense(self):
+        if self.bits is not None:
+            return self.bits
+        bits = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+        np.bitwise_or.at(bits, self.ids >> 3, (1 << (self.ids & 7)).astype(np.uint8))
+        return bits
+
+    def indices(self):
+        """Sorted int32 row ids."""
+        if self.ids is not None:
+            return self.ids
+        return np.flatnonzero(self.mask()).astype(np.int32)
+
+    def mask(self):
+        """Boolean array of length size."""
+        if self.bits is not None:
+            return np.unpackbits(self.bits, count=self.size, bitorder="little").view(bool)
+        mask = np.zeros(self.size, dtype=bool)
+        mask[self.ids] = True
+        return mask
+
+    def _contains(self, ids):
+        """Membership of each id in ids (vectorised)."""
+        if self.ids is not None:
+            if not len(self.ids):
+                return np.zeros(len(ids), dtype=bool)
+            pos = np.minimum(np.searchsorted(self.ids, ids), len(self.ids) - 1)
+            return self.ids[pos] == ids
+        return ((self.bits[ids >> 3] >> (ids & 7)) & 1).astype(bool)
+
+    def __len__(self):
+        if self._count is None:
+            self._count = len(self.ids) if self.ids is not None else int(np.unpackbits(self.bits).sum())
+        return self._count
+
+    @property
+    def nbytes(self):
+        return (self.ids if self.ids is not None else self.bits).nbytes
+
+    def __repr__(self):
+        form = "sparse" if self.ids is not None else "dense"
+        return f"Bitset({len(self)}/{self.size}, {form}, {self.nbytes} B)"
+
+    # ---------- algebra ----------
+    def _check(self, other):
+        if self.size != other.size:
+            raise ValueError(f"Bitset sizes differ: {self.size} vs {other.size}")
+
+    def __and__(self, other):
+        self._check(other)
+        if self.ids is not None and other.ids is not None:
+            return Bitset(self.size, ids=np.intersect1d(self.ids, other.ids, assume_unique=True))
+        if self.ids is not None or other.ids is not None:
+            # Sparse side filtered through the other: cost ~ the smaller set
+            sparse, dense = (self, other) if self.ids is not None else (other, self)
+            return Bitset(self.size, ids=sparse.ids[dense._contains(sparse.ids)])
+        return Bitset(self.size, bits=self.bits & other.bits)._compact()
+
+    def __or__(self, other):
+        self._check(other)
+        if self.ids is not None and other.ids is not None:
+            return Bitset(self.size, ids=np.union1d(self.ids, other.ids))._compact()
+        return Bitset(self.size, bits=self._dense() | other._dense())._compact()
+
+    def __sub__(self, other):
+        """AND NOT."""
+        self._check(other)
+        if self.ids is not None:
+            return Bitset(self.size, ids=self.ids[~other._contains(self.ids)])
+        return Bitset(self.size, bits=self.bits & ~other._dense())._compact()
+
+    def __invert__(self):
+        bits = ~self._dense()
+        if self.size % 8:
+            bits[-1] &= (1 << (self.size % 8)) - 1  # clear padding bits past size
+        return Bitset(self.size, bits=bits)._compact()
+
+# --------------------------------------------------
+# Facet index
+# --------------------------------------------------
+def facet_values(row, field):
+    value = row.get(field)
+    if field in ARRAY_FACETS:
+        return value if isinstance(value, list) else parse_array(value)
+    return [value] if value else []
+
+class FacetIndex:
+    """field → value → Bitset over row positions."""
+
+    def __init__(self, rows, fields=FACET_FIELDS):
+        self.size = len(rows)
+        postings = {field: {} for field in fields}
+        for i, row in enumerate(rows):
+            for field in fields:
+                for value in facet_values(row, field):
+                    postings[field].setdefault(value, []).append(i)
+        self.facets = {
+            field: {value: Bitset.from_indices(self.size, ids) for value, ids in values.items()}
+            for field, values in postings.items()
+        }
+        self._empty = Bitset(self.size, ids=np.empty(0, dtype=np.int32))
+
+    def get(self, field, value):
+        """Rows where field has value (empty if the value is unknown)."""
+        return self.facets[field].get(value, self._empty)
+
+    def any_of(self, field, values):
+        result = self._empty
+        for value in values:
+            result = result | self.get(field, value)
+        return result
+
+    def all_of(self, field, values):
+        # Smallest first, so intersections stay cheap
+        sets = sorted((self.get(field, value) for value in values), key=len)
+        if not sets:
+            return Bitset.full(self.size)
+        result = sets[0]
+        for other in sets[1:]:
+            result = result & other
+        return result
+
+    def select(self, skill_name=None, module_name=None, tags_all=(), tags_any=(), tags_none=()):
+        """
+        Rows matching every given filter: skill AND module AND all tags_all
+        AND at least one of tags_any AND none of tags_none. None = no filter.
+        """
+        parts = []
+        if skill_name:
+            parts.append(self.get("skill_name", skill_name))
+        if module_name:
+            parts.append(self.get("module_name", module_name))
+        if tags_all:
+            parts.append(self.all_of("tags", tags_all))
+        if tags_any:
+            parts.append(self.any_of("tags", tags_any))
+        if not parts and not tags_none:
+            return None
+        parts.sort(key=len)
+        result = parts[0] if parts else Bitset.full(self.size)
+        for other in parts[1:]:
+            result = result & other
+        if tags_none:
+            result = result - self.any_of("tags", tags_none)
+        return result
+
+    def stats(self):
+        return {
+            field: {
+                "values": len(values),
+                "sparse": sum(b.ids is not None for b in values.values()),
+                "bytes": sum(b.nbytes for b in values.values()),
+            }
+            for field, values in self.facets.items()
+        }
+
+def add_filter_arguments(parser):
+    group = parser.add_argument_group("facet filters")
+    group.add_argument("--skill", help="only this skill_name")
+    group.add_argument("--module", help="only this module_name")
+    group.add_argument("--tag", action="append", default=[], help="require tag (repeatable, AND)")
+    group.add_argument("--any-tag", action="append", default=[], help="require one of these tags (OR)")
+    group.add_argument("--exclude-tag", action="append", default=[], help="drop rows with tag (NOT)")
+    return parser
+
+def select_from_args(index, args):
+    return index.select(args.skill, args.module, args.tag, args.any_tag, args.exclude_tag)
+
+def has_filters(args):
+    return bool(args.skill or args.module or args.tag or args.any_tag or args.exclude_tag)
+
+# --------------------------------------------------
+# Main
+# --------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Facet index statistics")
+    add_filter_arguments(parser)
+    args = parser.parse_args()
+
+    start = datetime.now()
+    rows = list(fetch_all_rows(FACET_COLUMNS, filters={"embedding": "not.is.null"}))
+    index = FacetIndex(rows)
+    secs = (datetime.now() - start).total_seconds()
+
+    print("=" * 70)
+    print("🏷️  FACET INDEX")
+    print("=" * 70)
+    print(f"📦 {index.size} rows indexed in {secs:.2f}s")
+    for field, s in index.stats().items():
+        print(f"   {field:<12} {s['values']:>6} values  {s['sparse']:>6} sparse  {s['bytes'] / 1024:8.1f} KB")
+
+    if has_filters(args):
+        selected = select_from_args(index, args)
+        print(f"\n🔎 Filter matches {len(selected)} rows ({selected!r})")
+
+if __name__ == "__main__":
+    main()
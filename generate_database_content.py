@@ -4,6 +4,12 @@ import pandas as pd
 import json
 from pathlib import Path
 import os
+
+from profiling import profile_from_argv, stage, staged
+
+# Started before `records` is built, so convert_to_pg_array calls are profiled too
+if __name__ == "__main__":
+    profile_from_argv("generate_database_content")
 # ============================================
 # CONFIGURATION - UPDATE THESE TWO LINES
 # ============================================
@@ -13,6 +19,7 @@ SUPABASE_KEY = "eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.eyJpc3MiOiJzdXBhYmFzZSIsInJ
 # ============================================
 # HELPER FUNCTIONS
 # ============================================
+@staged("convert_to_pg_array")
 def convert_to_pg_array(value):
     if pd.isna(value) or value == '' or value is None:
         return None
@@ -35,7 +42,11 @@ def import_to_supabase(records: list[dict]):
         "Content-Type": "application/json",
         "Prefer": "return=minimal"
     }
-    response = requests.post(url, headers=headers, json=records)
+    # Encoded separately (as requests' json= would) so profiles split encoding from the HTTP wait
+    with stage("json_encode"):
+        body = json.dumps(records, allow_nan=False).encode()
+    with stage("supabase_http"):
+        response = requests.post(url, headers=headers, data=body)
     if response.status_code in [200, 201]:
         print(f"✅ Successfully imported {len(records)} rows!")
         return True
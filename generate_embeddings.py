@@ -1,8 +1,18 @@
 import os
+import re
+import csv
+import json
 import time
+import gzip
+import codecs
+import argparse
 import requests
+import numpy as np
 from dotenv import load_dotenv
 from datetime import datetime
+from functools import lru_cache
+
+from profiling import add_profile_arguments, stage, staged, start_profiler
 
 # --------------------------------------------------
 # Load ENV
@@ -21,8 +31,20 @@ if not SUPABASE_URL or not SUPABASE_KEY or not OPENAI_API_KEY:
 # --------------------------------------------------
 TABLE = "learning_content"
 BATCH_SIZE = 5
+PAGE_SIZE = 1000
 DELAY = 1.5  # seconds
-EMBEDDING_MODEL = "text-embedding-3-small"
+# Fallback model. Writers call use_active_embedding_model(), which replaces
+# these with the 'active' row of embedding_models once that table exists
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+EMBEDDING_DIMENSIONS = int(os.getenv("EMBEDDING_DIMENSIONS", "0")) or None  # None: the model's native size
+MODELS_TABLE = "embedding_models"
+MODEL_CHECK_INTERVAL = 30  # seconds between active-model checks in long-running writers
+EMBED_BATCH_SIZE = 256  # inputs per embeddings request
+STREAM_CHUNK_SIZE = 64 * 1024  # bytes read per step when stream-decoding pages
+VECTOR_PRECISION = 6  # significant digits per float in pgvector literals
+# gzip request bodies at least this large; 0 disables. Only enable when the
+# gateway in front of PostgREST decodes Content-Encoding: gzip.
+GZIP_THRESHOLD = int(os.getenv("SUPABASE_GZIP_THRESHOLD", "0"))
 
 SUPABASE_ENDPOINT = f"{SUPABASE_URL}/rest/v1/{TABLE}"
 SUPABASE_HEADERS = {
@@ -31,6 +53,8 @@ SUPABASE_HEADERS = {
     "Content-Type": "application/json",
 }
 
+ROLES_SKILLS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "roles_skills.csv")
+
 OPENAI_URL = "https://api.openai.com/v1/embeddings"
 OPENAI_HEADERS = {
     "Authorization": f"Bearer {OPENAI_API_KEY}",
@@ -41,12 +65,41 @@ OPENAI_HEADERS = {
 # Helpers
 # --------------------------------------------------
 def parse_array(val):
+    # Postgres array literals: {a,b} or {"a, b","c \"d\""} (convert_to_pg_array quotes every item)
     if not val:
         return []
     if isinstance(val, list):
         return val
-    return [v.strip() for v in str(val).strip("{}").split(",") if v.strip()]
+    items = next(csv.reader([str(val).strip().strip("{}")], escapechar="\\", skipinitialspace=True), [])
+    return [v.strip() for v in items if v.strip()]
+
+def load_roles_skills(path=ROLES_SKILLS_PATH):
+    """
+    Parse roles_skills.csv into [{"role_name", "category", "skills"}].
 
+    The skills column is an unquoted {a,b,c} list, so the file is not valid
+    CSV. A record whose brace list wraps onto the next physical line is
+    joined back together before parsing.
+    """
+    roles = []
+    pending = ""
+    with open(path, encoding="utf-8") as f:
+        next(f)  # header
+        for line in f:
+            pending += line.rstrip("\r\n")
+            if "{" in pending and "}" not in pending:
+                continue
+            if pending.strip():
+                role_name, category, skills = pending.split(",", 2)
+                roles.append({
+                    "role_name": role_name.strip(),
+                    "category": category.strip(),
+                    "skills": parse_array(skills),
+                })
+            pending = ""
+    return roles
+
+@staged("build_embedding_text")
 def build_embedding_text(row):
     tags = ", ".join(parse_array(row.get("tags")))
     prereq = ", ".join(parse_array(row.get("prerequisites")))
@@ -65,14 +118,50 @@ Prerequisites: {prereq}
 Estimated Hours: {row.get("estimated_hours")}
 """.strip()
 
+# --------------------------------------------------
+# Active model
+# --------------------------------------------------
+def active_embedding_model(url=SUPABASE_URL, headers=SUPABASE_HEADERS):
+    """
+    (model, dimensions) every writer must embed with: the 'active' row of
+    embedding_models, or EMBEDDING_MODEL / EMBEDDING_DIMENSIONS where that
+    table does not exist yet (create_embedding_versions.sql not applied).
+    Pass url/headers to ask another project.
+    """
+    resp = requests.get(
+        f"{url}/rest/v1/{MODELS_TABLE}",
+        headers=headers,
+        params={"select": "model,dimensions", "status": "eq.active"},
+        timeout=30
+    )
+    if resp.status_code == 404:
+        return EMBEDDING_MODEL, EMBEDDING_DIMENSIONS
+    resp.raise_for_status()
+    rows = resp.json()
+    if not rows:
+        return EMBEDDING_MODEL, EMBEDDING_DIMENSIONS
+    return rows[0]["model"], rows[0]["dimensions"]
+
+def use_active_embedding_model():
+    """Point get_embedding(s) at the active model for this process; returns (model, dimensions)."""
+    global EMBEDDING_MODEL, EMBEDDING_DIMENSIONS
+    model, dimensions = active_embedding_model()
+    if model != EMBEDDING_MODEL:
+        print(f"🔀 Embedding with {model} ({dimensions} dims), the active model in {MODELS_TABLE}")
+    EMBEDDING_MODEL, EMBEDDING_DIMENSIONS = model, dimensions
+    return model, dimensions
+
 # --------------------------------------------------
 # OpenAI Embedding
 # --------------------------------------------------
+@staged("openai_embed")
 def get_embedding(text):
     payload = {
         "model": EMBEDDING_MODEL,
         "input": text
     }
+    if EMBEDDING_DIMENSIONS:
+        payload["dimensions"] = EMBEDDING_DIMENSIONS
     resp = requests.post(
         OPENAI_URL,
         headers=OPENAI_HEADERS,
@@ -82,9 +171,34 @@ def get_embedding(text):
     resp.raise_for_status()
     return resp.json()["data"][0]["embedding"]
 
+@staged("openai_embed")
+def get_embeddings(texts, batch_size=EMBED_BATCH_SIZE, model=None, dimensions=None):
+    """Embed many texts with one request per batch, preserving input order."""
+    model = model or EMBEDDING_MODEL
+    dimensions = dimensions if model != EMBEDDING_MODEL else dimensions or EMBEDDING_DIMENSIONS
+    embeddings = []
+    for i in range(0, len(texts), batch_size):
+        payload = {
+            "model": model,
+            "input": texts[i:i + batch_size]
+        }
+        if dimensions:
+            payload["dimensions"] = dimensions
+        resp = requests.post(
+            OPENAI_URL,
+            headers=OPENAI_HEADERS,
+            json=payload,
+            timeout=60
+        )
+        resp.raise_for_status()
+        data = sorted(resp.json()["data"], key=lambda d: d["index"])
+        embeddings.extend(d["embedding"] for d in data)
+    return embeddings
+
 # --------------------------------------------------
 # Supabase
 # --------------------------------------------------
+@staged("supabase_fetch")
 def fetch_rows():
     params = {
         "select": "*",
@@ -99,11 +213,183 @@ def fetch_rows():
     resp.raise_for_status()
     return resp.json()
 
+def iter_json_array(chunks):
+    """
+    Yield the elements of a top-level JSON array from an iterable of byte chunks.
+
+    Each element is yielded once the ',' or ']' after it has arrived (a number
+    cut at a chunk boundary would otherwise decode as a shorter one), so only
+    the current element and one chunk are held in memory and callers can
+    process rows while the rest of the body is still downloading.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder("utf-8")()
+    chunks = iter(chunks)
+    buffer, pos = "", 0
+    started = finished = False
+    while True:
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+            pos += 1
+        if pos < len(buffer):
+            if not started:
+                if buffer[pos] != "[":
+                    raise ValueError("Expected a JSON array")
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == "]":
+                return
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if finished:
+                    raise  # malformed, not merely incomplete
+            else:
+                while end < len(buffer) and buffer[end] in " \t\r\n":
+                    end += 1
+                # Anything else may be the rest of a number ("1." + "5"): read on
+                if end < len(buffer) and buffer[end] in ",]":
+                    yield item
+                    pos = end
+                    continue
+                if finished:
+                    raise ValueError("Expected ',' or ']' after a JSON array element")
+        elif finished:
+            raise ValueError("Truncated JSON array")
+
+        chunk = next(chunks, None)
+        if chunk is None:
+            finished = True
+            buffer = buffer[pos:] + utf8.decode(b"", final=True)
+        else:
+            buffer = buffer[pos:] + utf8.decode(chunk)
+        pos = 0
+
+def _get_stream(table, params, headers=None):
+    resp = requests.get(
+        f"{SUPABASE_URL}/rest/v1/{table}",
+        headers={**SUPABASE_HEADERS, **(headers or {})},
+        params=params,
+        stream=True
+    )
+    resp.raise_for_status()
+    return resp
+
+def fetch_all_rows(select="*", page_size=PAGE_SIZE, filters=None, table=TABLE, order="id"):
+    """Yield every row of a table, paging through PostgREST by id; pages are stream-decoded."""
+    offset = 0
+    while True:
+        params = {
+            "select": select,
+            "order": order,
+            "limit": page_size,
+            "offset": offset,
+            **(filters or {}),
+        }
+        received = 0
+        with _get_stream(table, params) as resp:
+            for row in iter_json_array(resp.iter_content(STREAM_CHUNK_SIZE)):
+                received += 1
+                yield row
+        if received < page_size:
+            break
+        offset += received
+
+def fetch_rows_with_vectors(select, filters=None, table=TABLE, page_size=PAGE_SIZE, order="id"):
+    """
+    (rows, matrix) for every row matching filters, with `embedding` moved out of each row.
+
+    The float32 matrix is allocated once, from the exact row count PostgREST
+    reports for the first page and the first vector's length, and every
+    embedding is parsed straight into its slot, so no per-row float lists are
+    built. Pass filters={"embedding": "not.is.null"} unless every row is embedded.
+    """
+    rows = []
+    matrix = None
+    total = None
+    offset = 0
+    while True:
+        params = {
+            "select": f"{select},embedding",
+            "order": order,
+            "limit": page_size,
+            "offset": offset,
+            **(filters or {}),
+        }
+        received = 0
+        with _get_stream(table, params, {"Prefer": "count=exact"} if total is None else None) as resp:
+            if total is None:
+                count = re.search(r"/(\d+)$", resp.headers.get("Content-Range", ""))
+                total = int(count.group(1)) if count else page_size
+            for row in iter_json_array(resp.iter_content(STREAM_CHUNK_SIZE)):
+                vector = parse_vector(row.pop("embedding"))
+                i = len(rows)
+                if matrix is None:
+                    matrix = np.empty((max(total, 1), len(vector)), dtype=np.float32)
+                elif i == len(matrix):
+                    # Rows were added after the count was taken
+                    matrix = np.concatenate([matrix, np.empty_like(matrix)])
+                matrix[i] = vector
+                rows.append(row)
+                received += 1
+        if received < page_size:
+            break
+        offset += received
+    if matrix is None:
+        return rows, np.zeros((0, 0), dtype=np.float32)
+    return rows, matrix[:len(rows)]
+
+def parse_vector(val):
+    # pgvector columns come back from PostgREST as "[0.1,0.2,...]" strings
+    if val is None:
+        return None
+    if isinstance(val, (list, np.ndarray)):
+        return np.asarray(val, dtype=np.float32)
+    return np.fromstring(val.strip("[]"), dtype=np.float32, sep=",")
+
+@lru_cache(maxsize=8)
+def _vector_template(dim, precision):
+    return "[" + ",".join([f"%.{precision}g"] * dim) + "]"
+
+@staged("format_vector")
+def format_vector(vector, precision=VECTOR_PRECISION):
+    """
+    pgvector text literal "[v1,v2,...]" with `precision` significant digits.
+
+    One %-format over a cached template formats the whole vector in C, which
+    is several times faster than json.dumps of the float list and about half
+    the bytes at the default precision.
+    """
+    if vector is None:
+        return None
+    values = np.asarray(vector, dtype=np.float32).ravel().tolist()
+    return _vector_template(len(values), precision) % tuple(values)
+
+@staged("json_encode")
+def encode_body(payload, gzip_threshold=GZIP_THRESHOLD):
+    """Compact JSON request body and extra headers; gzipped from gzip_threshold bytes."""
+    body = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode()
+    if gzip_threshold and len(body) >= gzip_threshold:
+        return gzip.compress(body, compresslevel=5), {"Content-Encoding": "gzip"}
+    return body, {}
+
+def send_json(method, url, payload, headers=None, **kwargs):
+    """requests.request with an encode_body() body; returns the response unchecked."""
+    body, extra = encode_body(payload)
+    with stage("supabase_http"):
+        return requests.request(
+            method,
+            url,
+            headers={**(headers or SUPABASE_HEADERS), **extra},
+            data=body,
+            **kwargs
+        )
+
 def update_embedding(row_id, embedding):
-    resp = requests.patch(
+    resp = send_json(
+        "PATCH",
         f"{SUPABASE_ENDPOINT}?id=eq.{row_id}",
-        headers=SUPABASE_HEADERS,
-        json={"embedding": embedding}
+        {"embedding": format_vector(embedding)}
     )
     resp.raise_for_status()
 
@@ -111,14 +397,25 @@ def update_embedding(row_id, embedding):
 # Main
 # --------------------------------------------------
 def main():
+    parser = argparse.ArgumentParser(description="Generate embeddings for rows without one")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    start_profiler(args, "generate_embeddings")
+
     print("=" * 70)
     print("🚀 OPENAI EMBEDDING GENERATION")
     print("=" * 70)
 
     start = datetime.now()
     processed = 0
+    use_active_embedding_model()
+    checked = time.time()
 
     while True:
+        # A cutover mid-run must not leave this loop writing the old model
+        if time.time() - checked > MODEL_CHECK_INTERVAL:
+            use_active_embedding_model()
+            checked = time.time()
         rows = fetch_rows()
         if not rows:
             print("\n🎉 All embeddings completed!")
@@ -133,11 +430,13 @@ def main():
                 processed += 1
                 print(f"✅ [{processed}] Embedded → {row['subtopic_name'][:60]}")
 
-                time.sleep(DELAY)
+                with stage("throttle_sleep"):
+                    time.sleep(DELAY)
 
             except Exception as e:
                 print(f"❌ Failed: {e}")
-                time.sleep(5)
+                with stage("throttle_sleep"):
+                    time.sleep(5)
 
     mins = (datetime.now() - start).total_seconds() / 60
     print(f"\n⏱ Total time: {mins:.1f} minutes")
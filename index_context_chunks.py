@@ -0,0 +1,214 @@
+"""
+Context-chunk indexer feeding the match_documents RPC.
+
+lib/embeddings.ts retrieves grading context through match_documents, which
+targets ~200-400 token chunks. Whole learning_content rows (description plus
+example code and output) are far larger, so this script splits every row into
+bounded chunks (description sentences, code blocks, example output), embeds
+them in batches and bulk-upserts them into context_chunks with their parent
+row's hierarchy as metadata. Unchanged chunks are skipped on re-runs and
+chunks that no longer exist are deleted.
+
+Usage:
+    python index_context_chunks.py [--max-tokens 300] [--dry-run]
+"""
+import argparse
+import hashlib
+import re
+from datetime import datetime
+
+import requests
+
+from generate_embeddings import (
+    SUPABASE_URL,
+    SUPABASE_HEADERS,
+    fetch_all_rows,
+    format_vector,
+    get_embeddings,
+    send_json,
+)
+
+# --------------------------------------------------
+# Config
+# --------------------------------------------------
+CHUNKS_TABLE = "context_chunks"
+CHUNKS_ENDPOINT = f"{SUPABASE_URL}/rest/v1/{CHUNKS_TABLE}"
+MAX_CHUNK_TOKENS = 300
+CHARS_PER_TOKEN = 4  # same estimate as estimateTokens in lib/llmClient.ts
+UPSERT_CHUNK = 200
+SOURCE_COLUMNS = (
+    "id,skill_name,module_name,topic_name,subtopic_name,"
+    "description,example_code,example_output"
+)
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+(?=[A-Z`\"'(])")
+
+# --------------------------------------------------
+# Chunking
+# --------------------------------------------------
+def estimate_tokens(text):
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+def split_oversized(piece, max_chars):
+    """Split a single piece longer than max_chars at whitespace, hard-splitting longer words."""
+    parts, current = [], ""
+    for word in re.split(r"(\s+)", piece):
+        if current and len(current) + len(word) > max_chars:
+            if current.strip():
+                parts.append(current.strip())
+            current = ""
+        if len(word) > max_chars and word.strip():
+            # A URL, base64 blob or minified line has no whitespace to break at
+            whole = len(word) - len(word) % max_chars
+            parts.extend(word[i:i + max_chars] for i in range(0, whole, max_chars))
+            word = word[whole:]
+        current += word
+    if current.strip():
+        parts.append(current.strip())
+    return parts
+
+def pack(pieces, max_chars, joiner):
+    """Greedily pack pieces into strings of at most max_chars."""
+    packed, current = [], ""
+    for piece in pieces:
+        for part in ([piece] if len(piece) <= max_chars else split_oversized(piece, max_chars)):
+            candidate = f"{current}{joiner}{part}" if current else part
+            if current and len(candidate) > max_chars:
+                packed.append(current)
+                current = part
+            else:
+                current = candidate
+    if current:
+        packed.append(current)
+    return packed
+
+def code_blocks(code, max_chars):
+    """Blank-line separated blocks; blocks that are too long fall back to single lines."""
+    pieces = []
+    for block in re.split(r"\n\s*\n", code.strip()):
+        if not block.strip():
+            continue
+        pieces.extend([block] if len(block) <= max_chars else block.split("\n"))
+    return pieces
+
+def chunk_row(row, max_tokens=MAX_CHUNK_TOKENS):
+    """Split one learning_content row into bounded, self-describing chunks."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    subtopic = row.get("subtopic_name") or ""
+    metadata = {
+        "content_id": row["id"],
+        "skill_name": row.get("skill_name"),
+        "module_name": row.get("module_name"),
+        "topic_name": row.get("topic_name"),
+        "subtopic_name": subtopic,
+    }
+
+    sections = []
+    description = (row.get("description") or "").strip()
+    if description:
+        prefix = f"{subtopic}: "
+        sentences = SENTENCE_BOUNDARY.split(description)
+        sections.append(("description", prefix, pack(sentences, max_chars - len(prefix), " ")))
+    code = (row.get("example_code") or "").strip()
+    if code:
+        prefix = f"{subtopic} - example code:\n"
+        budget = max_chars - len(prefix)
+        sections.append(("code", prefix, pack(code_blocks(code, budget), budget, "\n")))
+    output = (row.get("example_output") or "").strip()
+    if output:
+        prefix = f"{subtopic} - example output:\n"
+        sections.append(("output", prefix, pack(output.split("\n"), max_chars - len(prefix), "\n")))
+
+    chunks = []
+    for kind, prefix, pieces in sections:
+        for n, piece in enumerate(pieces):
+            content = prefix + piece
+            chunks.append({
+                "id": f"{row['id']}:{kind}:{n}",
+                "content_id": str(row["id"]),
+                "kind": kind,
+                "chunk_index": n,
+                "content": content,
+                "token_estimate": estimate_tokens(content),
+                "content_hash": hashlib.sha256(content.encode()).hexdigest(),
+                "metadata": {**metadata, "kind": kind},
+            })
+    return chunks
+
+# --------------------------------------------------
+# Storage
+# --------------------------------------------------
+def fetch_chunk_hashes():
+    """{chunk id: content_hash} for everything already indexed, in one projected scan."""
+    return {
+        row["id"]: row["content_hash"]
+        for row in fetch_all_rows(select="id,content_hash", table=CHUNKS_TABLE)
+    }
+
+def upsert_chunks(chunks):
+    headers = {
+        **SUPABASE_HEADERS,
+        "Prefer": "resolution=merge-duplicates,return=minimal",
+    }
+    resp = send_json("POST", f"{CHUNKS_ENDPOINT}?on_conflict=id", chunks, headers)
+    resp.raise_for_status()
+
+def delete_chunks(chunk_ids):
+    for i in range(0, len(chunk_ids), UPSERT_CHUNK):
+        batch = chunk_ids[i:i + UPSERT_CHUNK]
+        quoted = ",".join(f'"{c}"' for c in batch)
+        resp = requests.delete(
+            f"{CHUNKS_ENDPOINT}?id=in.({quoted})",
+            headers=SUPABASE_HEADERS
+        )
+        resp.raise_for_status()
+
+def index_chunks(chunks, existing):
+    """Embed and upsert new or changed chunks in batches; returns how many were written."""
+    pending = [c for c in chunks if existing.get(c["id"]) != c["content_hash"]]
+    for i in range(0, len(pending), UPSERT_CHUNK):
+        batch = pending[i:i + UPSERT_CHUNK]
+        vectors = get_embeddings([c["content"] for c in batch])
+        upsert_chunks([{**c, "embedding": format_vector(v)} for c, v in zip(batch, vectors)])
+        print(f"✅ Indexed {min(i + UPSERT_CHUNK, len(pending))}/{len(pending)} chunks")
+    return len(pending)
+
+# --------------------------------------------------
+# Main
+# --------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Chunk and index learning_content for match_documents")
+    parser.add_argument("--max-tokens", type=int, default=MAX_CHUNK_TOKENS)
+    parser.add_argument("--dry-run", action="store_true", help="chunk and report without writing")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("✂️  CONTEXT CHUNK INDEXING")
+    print("=" * 70)
+
+    start = datetime.now()
+    chunks = []
+    rows = 0
+    for row in fetch_all_rows(select=SOURCE_COLUMNS):
+        chunks.extend(chunk_row(row, args.max_tokens))
+        rows += 1
+
+    tokens = [c["token_estimate"] for c in chunks]
+    print(f"📥 {rows} rows → {len(chunks)} chunks")
+    if tokens:
+        print(f"📏 Tokens per chunk: avg {sum(tokens) / len(tokens):.0f}, max {max(tokens)}")
+
+    if args.dry_run:
+        return
+
+    existing = fetch_chunk_hashes()
+    written = index_chunks(chunks, existing)
+    stale = sorted(set(existing) - {c["id"] for c in chunks})
+    if stale:
+        delete_chunks(stale)
+
+    print(f"\n💾 {written} chunks embedded, {len(chunks) - written} unchanged, {len(stale)} removed")
+    secs = (datetime.now() - start).total_seconds()
+    print(f"⏱ Total time: {secs:.1f} seconds")
+
+if __name__ == "__main__":
+    main()
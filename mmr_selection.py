@@ -0,0 +1,191 @@
+"""
+Vectorized Maximal Marginal Relevance (MMR) selection of subtopics.
+
+Question generation picks topics for a skill, but nothing stops it from
+drawing near-duplicate subtopics (e.g. the two Dask/PySpark shuffle rows).
+MMR picks k subtopics that are relevant to the user's query yet dissimilar to
+each other, using the learning_content embeddings:
+
+    score(c) = λ · sim(query, c) − (1 − λ) · max sim(c, already selected)
+
+Selection runs for many users at once: the candidate similarity matrix is
+computed once per skill and every greedy step is a single vectorized update
+across all users. Per-label quotas cap how many picks each label may receive,
+and several label sets apply at once. select_diverse_subtopics caps picks
+per topic_name, and with a level it also splits picks between theory and
+practical rows by the ratios of lib/questionRatioCalculator.ts. Every row
+carries example_code, so a row counts as theory when its topic or subtopic
+name is conceptual ("What is", "vs", "Fundamentals", ...) or its description
+is at least as long as its code; otherwise it is practical.
+
+Usage:
+    python mmr_selection.py --skill "Data Preprocessing" --query "pandas cleaning" [--k 10] [--level beginner]
+"""
+import argparse
+import math
+import re
+
+import numpy as np
+
+from embedding_cache import QueryEmbeddingCache
+from generate_embeddings import use_active_embedding_model
+from retrieval import META_COLUMNS, embed_queries, load_content_matrix
+
+# --------------------------------------------------
+# Config
+# --------------------------------------------------
+MMR_LAMBDA = 0.7
+TOP_K = 10
+MAX_PER_TOPIC = 2
+MMR_COLUMNS = f"{META_COLUMNS},description,example_code"  # what content_kind reads
+THEORY_NAMES = re.compile(
+    r"\b(what is|why|when to|vs|versus|fundamentals|introduction|overview|concepts?|theory"
+    r"|understanding|advantages|curse of|principles)\b",
+    re.IGNORECASE,
+)
+
+# Same splits as getBaseTheoryPercentage in lib/questionRatioCalculator.ts
+THEORY_PERCENTAGE = {"beginner": 70, "intermediate": 60, "advanced": 40}
+
+# --------------------------------------------------
+# MMR
+# --------------------------------------------------
+def content_kind(row):
+    """
+    'theory' for conceptual rows, else 'practical'.
+
+    A row is conceptual when its topic or subtopic name matches THEORY_NAMES,
+    or when its description is at least as long as its example code.
+    """
+    if THEORY_NAMES.search(f"{row.get('topic_name') or ''} {row.get('subtopic_name') or ''}"):
+        return "theory"
+    prose = len((row.get("description") or "").strip())
+    code = len((row.get("example_code") or "").strip())
+    return "theory" if prose >= code else "practical"
+
+def theory_practical_quotas(k, level="beginner", available=None):
+    """
+    Theory/practical split of k picks per getBaseTheoryPercentage.
+
+    With available ({kind: candidate count}) a kind that cannot fill its
+    share hands the rest to the other, so k picks stay reachable.
+    """
+    theory = math.floor(k * THEORY_PERCENTAGE[level] / 100 + 0.5)  # Math.round, not banker's rounding
+    quotas = {"theory": theory, "practical": k - theory}
+    if available is not None:
+        for kind, other in (("theory", "practical"), ("practical", "theory")):
+            spare = quotas[kind] - available.get(kind, 0)
+            if spare > 0:
+                quotas[kind] -= spare
+                quotas[other] += spare
+    return quotas
+
+def mmr_select_batch(queries, candidates, k=TOP_K, mmr_lambda=MMR_LAMBDA, labels=None, quotas=None,
+                     constraints=()):
+    """
+    MMR over normalised `candidates` (m, d) for every row of `queries` (u, d).
+
+    labels (length m) and quotas ({label: max picks}) optionally cap picks
+    per label; labels missing from quotas are uncapped. constraints adds more
+    (labels, quotas) pairs, all enforced together (e.g. per topic and per
+    theory/practical). Returns an int array (u, k) of candidate indices in
+    pick order, padded with -1 when fewer than k candidates are eligible.
+    """
+    queries = np.atleast_2d(queries)
+    n_users, m = queries.shape[0], candidates.shape[0]
+    picks = np.full((n_users, k), -1, dtype=np.int64)
+    if m == 0 or k == 0:
+        return picks
+
+    relevance = queries @ candidates.T                 # (u, m)
+    pairwise = candidates @ candidates.T               # (m, m), shared by all users
+    redundancy = np.full((n_users, m), -np.inf, dtype=np.float32)
+    available = np.ones((n_users, m), dtype=bool)
+    rows = np.arange(n_users)
+
+    # One (label index per candidate, limit per label, picks per user and label) per constraint
+    caps = []
+    for group_labels, group_quotas in ([(labels, quotas)] if labels is not None else []) + list(constraints):
+        if not group_quotas:
+            continue
+        label_names = sorted(set(group_labels), key=str)
+        position = {label: i for i, label in enumerate(label_names)}
+        label_idx = np.array([position[l] for l in group_labels])
+        limits = np.array([group_quotas.get(l, k) for l in label_names])
+        caps.append((label_idx, limits, np.zeros((n_users, len(label_names)), dtype=np.int64)))
+
+    for step in range(k):
+        penalty = np.where(np.isfinite(redundancy), redundancy, 0.0)
+        scores = mmr_lambda * relevance - (1 - mmr_lambda) * penalty
+        eligible = available
+        for label_idx, limits, counts in caps:
+            eligible = eligible & (counts[:, label_idx] < limits[label_idx])
+        scores = np.where(eligible, scores, -np.inf)
+
+        best = np.argmax(scores, axis=1)
+        active = np.isfinite(scores[rows, best])
+        if not active.any():
+            break
+
+        picks[active, step] = best[active]
+        available[rows[active], best[active]] = False
+        redundancy[active] = np.maximum(redundancy[active], pairwise[best[active]])
+        for label_idx, _, counts in caps:
+            counts[rows[active], label_idx[best[active]]] += 1
+
+    return picks
+
+def select_diverse_subtopics(rows, matrix, skill_name, query_vectors, k=TOP_K,
+                             mmr_lambda=MMR_LAMBDA, max_per_topic=MAX_PER_TOPIC, level=None):
+    """
+    Pick k diverse subtopics of one skill for each query vector.
+
+    No topic_name contributes more than max_per_topic picks. With a level
+    (beginner/intermediate/advanced) the picks also follow the theory/practical
+    split of theory_practical_quotas (see content_kind); rows then need
+    description and example_code (load them with MMR_COLUMNS). Returns one list of row dicts per query.
+    """
+    members = np.array([i for i, row in enumerate(rows) if row["skill_name"] == skill_name], dtype=np.int64)
+    if not len(members):
+        return [[] for _ in range(len(np.atleast_2d(query_vectors)))]
+
+    topics = [rows[i]["topic_name"] for i in members]
+    quotas = {topic: max_per_topic for topic in set(topics)} if max_per_topic else None
+    constraints = []
+    if level:
+        if any("description" not in rows[i] or "example_code" not in rows[i] for i in members):
+            raise ValueError("❌ theory/practical quotas need description and example_code; load rows with MMR_COLUMNS")
+        kinds = [content_kind(rows[i]) for i in members]
+        available = {kind: kinds.count(kind) for kind in ("theory", "practical")}
+        constraints.append((kinds, theory_practical_quotas(k, level, available)))
+    picks = mmr_select_batch(query_vectors, matrix[members], k, mmr_lambda, topics, quotas, constraints)
+    return [[rows[members[p]] for p in user_picks if p >= 0] for user_picks in picks]
+
+# --------------------------------------------------
+# Main
+# --------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Diverse subtopic selection with MMR")
+    parser.add_argument("--skill", required=True)
+    parser.add_argument("--query", action="append", required=True, help="one per user; repeatable")
+    parser.add_argument("--k", type=int, default=TOP_K)
+    parser.add_argument("--lambda", dest="mmr_lambda", type=float, default=MMR_LAMBDA)
+    parser.add_argument("--max-per-topic", type=int, default=MAX_PER_TOPIC)
+    parser.add_argument("--level", choices=sorted(THEORY_PERCENTAGE), help="split picks theory/practical")
+    args = parser.parse_args()
+
+    # Queries must be embedded with the model of the stored vectors
+    model, dimensions = use_active_embedding_model()
+    rows, matrix = load_content_matrix(MMR_COLUMNS if args.level else META_COLUMNS)
+    queries = embed_queries(args.query, QueryEmbeddingCache(model=model, dimensions=dimensions))
+    selections = select_diverse_subtopics(
+        rows, matrix, args.skill, queries, args.k, args.mmr_lambda, args.max_per_topic, args.level
+    )
+    for query, picked in zip(args.query, selections):
+        print(f"\n🎯 {query}")
+        for row in picked:
+            kind = f" [{content_kind(row)}]" if args.level else ""
+            print(f"   • {row['topic_name']} → {row['subtopic_name']}{kind}")
+
+if __name__ == "__main__":
+    main()
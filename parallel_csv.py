@@ -0,0 +1,185 @@
+"""
+Parallel, quote-aware parsing of large curriculum CSVs.
+
+example_code / example_output are multiline quoted fields, so a CSV cannot
+be split at arbitrary newlines. The file is cut into byte ranges instead:
+
+    1. one sequential pass counts '"' bytes per block (bytes.count, memchr
+       speed); an even running count means "outside quotes"
+    2. each approximate cut point moves forward to the first newline that is
+       outside quotes, which is always a record boundary
+    3. ranges are parsed with the csv module in a process pool and returned
+       in file order
+
+Assumes RFC 4180 quoting (quotes only inside quoted fields, escaped as ""),
+which is what csv.writer produces. The unquoted `test databases/` dumps are
+not CSV in that sense; curriculum_store.py parses those separately.
+
+Usage:
+    python parallel_csv.py curriculum.csv [--workers 8] [--benchmark]
+"""
+import argparse
+import csv
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# --------------------------------------------------
+# Config
+# --------------------------------------------------
+SCAN_BLOCK = 4 * 1024 * 1024      # bytes per quote-counting block
+RANGES_PER_WORKER = 4             # more ranges than workers evens out skew
+MIN_RANGE_BYTES = 1024 * 1024     # below this, splitting costs more than it saves
+
+# --------------------------------------------------
+# Boundaries
+# --------------------------------------------------
+def read_header(path):
+    """(header fields, byte offset of the first data record)."""
+    with open(path, "rb") as f:
+        data = b""
+        while True:
+            line = f.readline()
+            if not line:
+                break
+            data += line
+            if data.count(b'"') % 2 == 0:
+                break
+    header = next(csv.reader(io.StringIO(data.decode("utf-8-sig"), newline="")))
+    return header, len(data)
+
+def quote_parity_at(path, positions):
+    """Whether each sorted position lies outside quotes (even count of '"' before it)."""
+    outside = []
+    count = 0
+    offset = 0
+    pending = list(positions)
+    with open(path, "rb") as f:
+        while pending:
+            block = f.read(SCAN_BLOCK)
+            if not block:
+                outside.extend(count % 2 == 0 for _ in pending)
+                break
+            end = offset + len(block)
+            while pending and pending[0] < end:
+                outside.append((count + block.count(b'"', 0, pending.pop(0) - offset)) % 2 == 0)
+            count += block.count(b'"')
+            offset = end
+    return outside
+
+def next_boundary(f, position, outside_quotes, limit):
+    """First offset >= position that starts a record, given the quote state at position."""
+    f.seek(position)
+    state = outside_quotes
+    offset = position
+    while offset < limit:
+        line = f.readline()
+        if not line:
+            return limit
+        # Inside quotes the newline is data; toggle once per '"' on the line
+        state ^= line.count(b'"') % 2 == 1
+        offset += len(line)
+        if state:
+            return offset
+    return limit
+
+def find_ranges(path, n_ranges, start=None):
+    """Byte ranges [(begin, end)] that each hold whole records, in file order."""
+    size = os.path.getsize(path)
+    if start is None:
+        start = read_header(path)[1]
+    n_ranges = max(1, min(n_ranges, (size - start) // MIN_RANGE_BYTES or 1))
+    cuts = [start + (size - start) * i // n_ranges for i in range(1, n_ranges)]
+    states = quote_parity_at(path, cuts)
+
+    bounds = [start]
+    with open(path, "rb") as f:
+        for cut, outside in zip(cuts, states):
+            # A cut is only safe at a newline outside quotes, so finish the current line first
+            boundary = next_boundary(f, cut, outside, size)
+            if boundary > bounds[-1]:
+                bounds.append(boundary)
+    bounds.append(size)
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+
+# --------------------------------------------------
+# Parsing
+# --------------------------------------------------
+def parse_range(path, begin, end, header, convert=None):
+    """
+    Parse one byte range into rows (lists), or convert(header, rows) if given.
+
+    Runs in a worker process; convert must be a module-level function.
+    """
+    with open(path, "rb") as f:
+        f.seek(begin)
+        text = f.read(end - begin).decode("utf-8")
+    rows = list(csv.reader(io.StringIO(text, newline="")))
+    for i, row in enumerate(rows):
+        if len(row) != len(header):
+            raise ValueError(
+                f"{path}: record {i} of byte range {begin}-{end} has {len(row)} fields, "
+                f"expected {len(header)} (unbalanced quotes?)"
+            )
+    return convert(header, rows) if convert else rows
+
+def _parse_range_args(args):
+    return parse_range(*args)
+
+def parse_file(path, workers=None, convert=None, ranges_per_worker=RANGES_PER_WORKER):
+    """
+    Yield one parsed result per byte range, in file order.
+
+    Results are rows (lists matching the header) unless convert is given.
+    Returns a generator; the header is available from read_header(path).
+    """
+    workers = workers or os.cpu_count() or 1
+    header, start = read_header(path)
+    ranges = find_ranges(path, workers * ranges_per_worker, start)
+    tasks = [(path, begin, end, header, convert) for begin, end in ranges]
+    if workers == 1 or len(tasks) == 1:
+        yield from map(_parse_range_args, tasks)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # map() keeps submission order, so records come back in file order
+        yield from pool.map(_parse_range_args, tasks)
+
+def iter_records(path, workers=None):
+    """Every record as a dict, in file order."""
+    header = read_header(path)[0]
+    for rows in parse_file(path, workers):
+        for row in rows:
+            yield dict(zip(header, row))
+
+# --------------------------------------------------
+# Main
+# --------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Parallel quote-aware CSV parsing")
+    parser.add_argument("path")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--benchmark", action="store_true", help="compare against a single-process csv parse")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("⚡ PARALLEL CSV PARSE")
+    print("=" * 70)
+    size_mb = os.path.getsize(args.path) / 1e6
+
+    start = time.perf_counter()
+    records = sum(len(rows) for rows in parse_file(args.path, args.workers))
+    secs = time.perf_counter() - start
+    print(f"✅ {records} records, {size_mb:.1f} MB in {secs:.2f}s "
+          f"({size_mb / secs:.0f} MB/s, {args.workers} workers)")
+
+    if args.benchmark:
+        start = time.perf_counter()
+        with open(args.path, encoding="utf-8", newline="") as f:
+            baseline = sum(1 for _ in csv.reader(f)) - 1
+        base_secs = time.perf_counter() - start
+        print(f"📏 single process: {baseline} records in {base_secs:.2f}s "
+              f"({size_mb / base_secs:.0f} MB/s) → {base_secs / secs:.1f}x speed-up")
+
+if __name__ == "__main__":
+    main()
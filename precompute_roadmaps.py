@@ -0,0 +1,239 @@
+"""
+Offline roadmap precomputation for every role in roles_skills.csv.
+
+For each role and experience tier this assembles a candidate roadmap straight
+from learning_content: rows come from the role → skill index, are ranked by
+vector similarity to the role, trimmed to the tier's estimated_hours budget
+and ordered by the prerequisite graph. Each roadmap is stored as a versioned,
+content-hashed artifact (and optionally in the precomputed_roadmaps table)
+that /api/roadmap/generate can serve or lightly personalise instead of
+running a fresh LLM generation.
+
+Usage:
+    python precompute_roadmaps.py [--roles "Data Scientist,ML Engineer"] [--table]
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+from collections import OrderedDict
+from datetime import datetime
+
+import requests
+
+from embedding_cache import QueryEmbeddingCache
+from generate_embeddings import SUPABASE_URL, SUPABASE_HEADERS, load_roles_skills, use_active_embedding_model
+from prerequisite_graph import build_edges, resolve_prerequisites, topological_order
+from retrieval import META_COLUMNS, content_fingerprint, embed_queries, load_content_matrix
+from role_index import build_role_index
+
+# --------------------------------------------------
+# Config
+# --------------------------------------------------
+ROADMAP_SCHEMA_VERSION = "1.0"
+OUTPUT_DIR = os.path.join("artifacts", "roadmaps")
+ROADMAPS_TABLE = "precomputed_roadmaps"
+ROADMAPS_ENDPOINT = f"{SUPABASE_URL}/rest/v1/{ROADMAPS_TABLE}"
+
+# Same levels as lib/questionRatioCalculator.ts. skip_fraction drops the
+# earliest rows of each skill's prerequisite order (assumed already known).
+TIERS = {
+    "beginner": {"budget_hours": 80, "skip_fraction": 0.0},
+    "intermediate": {"budget_hours": 60, "skip_fraction": 0.25},
+    "advanced": {"budget_hours": 40, "skip_fraction": 0.5},
+}
+
+# --------------------------------------------------
+# Helpers
+# --------------------------------------------------
+def slugify(text):
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+def role_query(role):
+    return f"{role['role_name']}: {', '.join(role['skills'])}"
+
+def content_hash(roadmap):
+    """Hash of the roadmap content; unrelated embedding changes keep the same version."""
+    content = {k: v for k, v in roadmap.items() if k != "source_fingerprint"}
+    canonical = json.dumps(content, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+# --------------------------------------------------
+# Assembly
+# --------------------------------------------------
+def assemble_roadmap(rows, candidates, relevance, position, tier):
+    """
+    Pick rows for one role/tier and group them into ordered modules.
+
+    candidates are row indices, relevance their similarity to the role and
+    position each row's place in the global prerequisite order.
+    """
+    by_skill = OrderedDict()
+    for idx in sorted(candidates, key=lambda i: position[i]):
+        by_skill.setdefault(rows[idx]["skill_name"], []).append(idx)
+
+    eligible = []
+    for skill_rows in by_skill.values():
+        skip = int(len(skill_rows) * tier["skip_fraction"])
+        eligible.extend(skill_rows[skip:])
+
+    score = dict(zip(candidates, relevance))
+    selected, total = [], 0.0
+    for idx in sorted(eligible, key=lambda i: -score[i]):
+        hours = float(rows[idx].get("estimated_hours") or 0)
+        if total + hours <= tier["budget_hours"]:
+            selected.append(idx)
+            total += hours
+
+    modules = OrderedDict()
+    for idx in sorted(selected, key=lambda i: position[i]):
+        row = rows[idx]
+        key = (row["skill_name"], row["module_name"])
+        module = modules.setdefault(key, {
+            "skill_name": row["skill_name"],
+            "module_name": row["module_name"],
+            "estimated_hours": 0.0,
+            "subtopics": [],
+        })
+        module["subtopics"].append({
+            "id": row["id"],
+            "topic_name": row["topic_name"],
+            "subtopic_name": row["subtopic_name"],
+            "estimated_hours": float(row.get("estimated_hours") or 0),
+        })
+        module["estimated_hours"] += float(row.get("estimated_hours") or 0)
+
+    for module in modules.values():
+        module["estimated_hours"] = round(module["estimated_hours"], 2)
+    return list(modules.values()), round(total, 2)
+
+def precompute_all(roles, rows, matrix, cache=None):
+    """Yield one roadmap artifact per (role, tier) that has matching content."""
+    id_to_idx = {row["id"]: i for i, row in enumerate(rows)}
+    index = build_role_index(roles, rows, cache)
+
+    resolved, _ = resolve_prerequisites(rows, matrix, cache=cache)
+    order, _ = topological_order(len(rows), build_edges(rows, resolved))
+    position = {node: pos for pos, node in enumerate(order)}
+
+    queries = embed_queries([role_query(r) for r in roles], cache)
+    source_fingerprint = content_fingerprint(rows, matrix)
+
+    for role, query in zip(roles, queries):
+        entry = index["roles"][role["role_name"]]
+        candidates = [id_to_idx[i] for i in entry["rows"]]
+        if not candidates:
+            continue
+        relevance = matrix[candidates] @ query
+
+        for tier_name, tier in TIERS.items():
+            modules, total = assemble_roadmap(rows, candidates, relevance, position, tier)
+            roadmap = {
+                "schema_version": ROADMAP_SCHEMA_VERSION,
+                "job_role": role["role_name"],
+                "level": tier_name,
+                "budget_hours": tier["budget_hours"],
+                "total_hours": total,
+                "modules": modules,
+                "unmatched_skills": entry["unmatched_skills"],
+                "source_fingerprint": source_fingerprint,
+            }
+            yield {**roadmap, "content_hash": content_hash(roadmap)}
+
+# --------------------------------------------------
+# Storage
+# --------------------------------------------------
+def write_artifact(roadmap, output_dir=OUTPUT_DIR):
+    """Write <role>-<level>-<hash>.json; returns (path, written) and skips unchanged roadmaps."""
+    os.makedirs(output_dir, exist_ok=True)
+    name = f"{slugify(roadmap['job_role'])}-{roadmap['level']}-{roadmap['content_hash'][:12]}.json"
+    path = os.path.join(output_dir, name)
+    if os.path.exists(path):
+        return path, False
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(roadmap, f, indent=2)
+    return path, True
+
+def write_manifest(entries, output_dir=OUTPUT_DIR):
+    """manifest.json: {role: {level: {"content_hash", "path"}}} pointing at the latest versions."""
+    manifest = {"generated_at": datetime.now().isoformat(), "roles": {}}
+    for roadmap, path in entries:
+        manifest["roles"].setdefault(roadmap["job_role"], {})[roadmap["level"]] = {
+            "content_hash": roadmap["content_hash"],
+            "path": os.path.basename(path),
+        }
+    with open(os.path.join(output_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+def write_roadmaps_table(roadmaps):
+    """Append new versions; rows with an existing (role, level, hash) are ignored."""
+    headers = {
+        **SUPABASE_HEADERS,
+        "Prefer": "resolution=ignore-duplicates,return=minimal",
+    }
+    payload = [
+        {
+            "job_role": r["job_role"],
+            "level": r["level"],
+            "schema_version": r["schema_version"],
+            "content_hash": r["content_hash"],
+            "total_hours": r["total_hours"],
+            "roadmap_data": r,
+        }
+        for r in roadmaps
+    ]
+    resp = requests.post(
+        f"{ROADMAPS_ENDPOINT}?on_conflict=job_role,level,content_hash",
+        headers=headers,
+        json=payload
+    )
+    resp.raise_for_status()
+
+# --------------------------------------------------
+# Main
+# --------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Precompute candidate roadmaps for every role")
+    parser.add_argument("--roles", help="comma-separated subset of role names")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--table", action="store_true", help=f"also append to {ROADMAPS_TABLE}")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("🗺  ROADMAP PRECOMPUTATION")
+    print("=" * 70)
+
+    start = datetime.now()
+    roles = load_roles_skills()
+    if args.roles:
+        wanted = {r.strip() for r in args.roles.split(",")}
+        roles = [r for r in roles if r["role_name"] in wanted]
+
+    rows, matrix = load_content_matrix(f"{META_COLUMNS},prerequisites,estimated_hours")
+    print(f"📥 Loaded {len(roles)} roles and {len(rows)} embedded rows")
+
+    # Skill queries must be embedded with the model of the stored vectors
+    model, dimensions = use_active_embedding_model()
+    cache = QueryEmbeddingCache(model=model, dimensions=dimensions)
+    entries, written = [], 0
+    for roadmap in precompute_all(roles, rows, matrix, cache):
+        path, is_new = write_artifact(roadmap, args.output_dir)
+        entries.append((roadmap, path))
+        written += is_new
+        marker = "✅" if is_new else "⏭ "
+        print(f"{marker} {roadmap['job_role']} [{roadmap['level']}] "
+              f"{len(roadmap['modules'])} modules, {roadmap['total_hours']}h")
+
+    if entries:
+        write_manifest(entries, args.output_dir)
+    if args.table and entries:
+        write_roadmaps_table([r for r, _ in entries])
+        print(f"💾 Appended to {ROADMAPS_TABLE}")
+
+    print(f"\n💾 {written} new / {len(entries)} total roadmaps → {args.output_dir}")
+    secs = (datetime.now() - start).total_seconds()
+    print(f"⏱ Total time: {secs:.1f} seconds")
+
+if __name__ == "__main__":
+    main()
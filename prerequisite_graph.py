@@ -0,0 +1,331 @@
+"""
+Prerequisite DAG index over learning_content.
+
+Every row carries a `prerequisites` array of free-text strings. This build
+step resolves those strings to content rows (exact subtopic/topic/module name
+first, then nearest embedding above RESOLVE_THRESHOLD), breaks any cycles,
+and stores per-skill topological orders plus transitive-closure bitsets in a
+compressed .npz artifact. Loading the artifact gives O(1) "does A require B"
+checks and precomputed roadmap orderings.
+
+Usage:
+    python prerequisite_graph.py [--threshold 0.55] [--output artifacts/prerequisite_graph.npz]
+"""
+import argparse
+import heapq
+import json
+import os
+from collections import defaultdict
+from datetime import datetime
+
+import numpy as np
+
+from embedding_cache import QueryEmbeddingCache, normalize_query
+from generate_embeddings import parse_array, use_active_embedding_model
+from retrieval import META_COLUMNS, blocked_top_k, embed_queries, load_content_matrix
+
+# --------------------------------------------------
+# Config
+# --------------------------------------------------
+RESOLVE_THRESHOLD = 0.55  # min cosine similarity for embedding fallback
+OUTPUT_PATH = os.path.join("artifacts", "prerequisite_graph.npz")
+
+# --------------------------------------------------
+# Resolution
+# --------------------------------------------------
+def build_name_index(rows):
+    """Exact-match lookup tables: normalised name → first row index, most specific level first."""
+    levels = ("subtopic_name", "topic_name", "module_name")
+    index = {level: {} for level in levels}
+    for i, row in enumerate(rows):
+        for level in levels:
+            if row.get(level):
+                index[level].setdefault(normalize_query(row[level]), i)
+    return [index[level] for level in levels]
+
+def resolve_prerequisites(rows, matrix, threshold=RESOLVE_THRESHOLD, cache=None):
+    """
+    Map every distinct prerequisite string to a row index.
+
+    Returns (resolved, unresolved): {prerequisite: (row index, how)} where
+    `how` is "exact" or the similarity score, plus the sorted list of strings
+    that matched nothing closely enough.
+    """
+    name_index = build_name_index(rows)
+    resolved = {}
+    fuzzy = []
+    seen = set()
+    for row in rows:
+        for prereq in parse_array(row.get("prerequisites")):
+            if prereq in seen:
+                continue
+            seen.add(prereq)
+            key = normalize_query(prereq)
+            match = next((names[key] for names in name_index if key in names), None)
+            if match is not None:
+                resolved[prereq] = (match, "exact")
+            else:
+                fuzzy.append(prereq)
+
+    unresolved = []
+    if fuzzy and matrix.shape[0]:
+        indices, scores = blocked_top_k(embed_queries(fuzzy, cache), matrix, 1)
+        for prereq, idx, score in zip(fuzzy, indices[:, 0], scores[:, 0]):
+            if score >= threshold:
+                resolved[prereq] = (int(idx), round(float(score), 4))
+            else:
+                unresolved.append(prereq)
+    else:
+        unresolved = fuzzy
+
+    return resolved, sorted(unresolved)
+
+def build_edges(rows, resolved):
+    """Edges (prerequisite row → dependent row), without self-loops or duplicates."""
+    edges = set()
+    for i, row in enumerate(rows):
+        for prereq in parse_array(row.get("prerequisites")):
+            if prereq in resolved:
+                src = resolved[prereq][0]
+                if src != i:
+                    edges.add((src, i))
+    return sorted(edges)
+
+# --------------------------------------------------
+# Ordering
+# --------------------------------------------------
+def strongly_connected(n, edges):
+    """Strongly connected components (Tarjan, iterative), as lists of nodes."""
+    successors = defaultdict(list)
+    for src, dst in edges:
+        successors[src].append(dst)
+
+    index, low, on_stack = {}, {}, set()
+    stack, components = [], []
+    for root in range(n):
+        if root in index:
+            continue
+        work = [(root, 0)]
+        while work:
+            node, i = work.pop()
+            if i == 0:
+                index[node] = low[node] = len(index)
+                stack.append(node)
+                on_stack.add(node)
+            if i < len(successors[node]):
+                work.append((node, i + 1))
+                nxt = successors[node][i]
+                if nxt not in index:
+                    work.append((nxt, 0))
+                elif nxt in on_stack:
+                    low[node] = min(low[node], index[nxt])
+                continue
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+    return components
+
+def cycle_edges(n, edges):
+    """
+    Edges to drop so the graph is acyclic, found inside cyclic components only.
+
+    Each pass drops one edge per cyclic strongly connected component: the
+    backward edge (src authored after dst, or a self-loop) with the latest src, so the
+    prerequisite declared last gives way. Components are recomputed until
+    none is cyclic; edges between components are never touched.
+    """
+    remaining = set(edges)
+    dropped = []
+    while True:
+        component_of = {}
+        for c, component in enumerate(strongly_connected(n, sorted(remaining))):
+            for node in component:
+                component_of[node] = c
+        inside = defaultdict(list)
+        for src, dst in remaining:
+            if component_of[src] == component_of[dst]:
+                inside[component_of[src]].append((src, dst))
+        if not inside:
+            return dropped
+        for component_edges in inside.values():
+            # Every cycle has at least one backward edge (a self-loop counts as one)
+            edge = max(e for e in component_edges if e[0] >= e[1])
+            remaining.discard(edge)
+            dropped.append(edge)
+
+def topological_order(n, edges):
+    """
+    Kahn's algorithm with ties broken by row index (authoring order).
+
+    Cycles are broken first (cycle_edges), so rows that merely depend on a
+    cycle keep their place after it. Returns (order, back_edges) where
+    back_edges are the dropped cycle edges.
+    """
+    back_edges = sorted(cycle_edges(n, edges))
+    dropped = set(back_edges)
+    successors = defaultdict(list)
+    indegree = [0] * n
+    for src, dst in edges:
+        if (src, dst) in dropped:
+            continue
+        successors[src].append(dst)
+        indegree[dst] += 1
+
+    ready = [i for i in range(n) if indegree[i] == 0]
+    heapq.heapify(ready)
+    order = []
+    while ready:
+        node = heapq.heappop(ready)
+        order.append(node)
+        for nxt in successors[node]:
+            indegree[nxt] -= 1
+            if indegree[nxt] == 0:
+                heapq.heappush(ready, nxt)
+    return order, back_edges
+
+def ancestor_masks(order, edges, back_edges):
+    """Transitive prerequisites of every node as Python int bitsets (cycle edges dropped)."""
+    dropped = set(back_edges)
+    predecessors = defaultdict(list)
+    for src, dst in edges:
+        if (src, dst) not in dropped:
+            predecessors[dst].append(src)
+
+    masks = [0] * len(order)
+    for node in order:
+        mask = 0
+        for pred in predecessors[node]:
+            mask |= masks[pred] | (1 << pred)
+        masks[node] = mask
+    return masks
+
+# --------------------------------------------------
+# Artifact
+# --------------------------------------------------
+def build_graph(rows, matrix, threshold=RESOLVE_THRESHOLD, cache=None):
+    """Build the serialisable graph: arrays keyed for np.savez plus a metadata dict."""
+    resolved, unresolved = resolve_prerequisites(rows, matrix, threshold, cache)
+    edges = build_edges(rows, resolved)
+    order, back_edges = topological_order(len(rows), edges)
+    masks = ancestor_masks(order, edges, back_edges)
+
+    by_skill = defaultdict(list)
+    for node in order:
+        by_skill[rows[node]["skill_name"]].append(node)
+
+    arrays = {
+        "ids": np.array([str(row["id"]) for row in rows]),
+        "edges": np.array(edges, dtype=np.int32).reshape(-1, 2),
+    }
+    skills = sorted(by_skill)
+    for s, skill in enumerate(skills):
+        nodes = by_skill[skill]
+        closure = np.zeros((len(nodes), len(nodes)), dtype=bool)
+        for a, node in enumerate(nodes):
+            mask = masks[node]
+            if mask:
+                closure[a] = [(mask >> other) & 1 for other in nodes]
+        arrays[f"order_{s}"] = np.array(nodes, dtype=np.int32)
+        arrays[f"closure_{s}"] = np.packbits(closure, axis=1)
+
+    metadata = {
+        "skills": skills,
+        "threshold": threshold,
+        "resolved": {p: [rows[i]["id"], how] for p, (i, how) in resolved.items()},
+        "unresolved": unresolved,
+        "cycle_edges": [[rows[a]["id"], rows[b]["id"]] for a, b in back_edges],
+        "generated_at": datetime.now().isoformat(),
+    }
+    return arrays, metadata
+
+def save_graph(arrays, metadata, path=OUTPUT_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    np.savez_compressed(path, metadata=np.array(json.dumps(metadata)), **arrays)
+
+class PrerequisiteGraph:
+    """Read side of the artifact; every query is a dict lookup or a bit test."""
+
+    def __init__(self, path=OUTPUT_PATH):
+        with np.load(path) as data:
+            self.metadata = json.loads(str(data["metadata"]))
+            self.ids = data["ids"].tolist()
+            self.edges = data["edges"]
+            self.skills = self.metadata["skills"]
+            self.orders = {}
+            self.closures = {}
+            for s, skill in enumerate(self.skills):
+                self.orders[skill] = data[f"order_{s}"]
+                self.closures[skill] = data[f"closure_{s}"]
+
+        self.row_of = {row_id: i for i, row_id in enumerate(self.ids)}
+        # row id → (skill, position within that skill's order)
+        self.position = {}
+        self.ordered_ids = {}
+        for skill, nodes in self.orders.items():
+            self.ordered_ids[skill] = [self.ids[n] for n in nodes]
+            for pos, node in enumerate(nodes):
+                self.position[self.ids[node]] = (skill, pos)
+
+    def order(self, skill):
+        """Content ids of a skill in prerequisite order."""
+        return self.ordered_ids.get(skill, [])
+
+    def requires(self, row_id, prereq_id):
+        """True if prereq_id is a (transitive) prerequisite of row_id within the same skill."""
+        skill, a = self.position[str(row_id)]
+        other_skill, b = self.position[str(prereq_id)]
+        if skill != other_skill:
+            return False
+        return bool(self.closures[skill][a, b >> 3] & (0x80 >> (b & 7)))
+
+    def prerequisites_of(self, row_id):
+        """All transitive prerequisites of row_id within its skill, in order."""
+        skill, a = self.position[str(row_id)]
+        bits = np.unpackbits(self.closures[skill][a])[:len(self.ordered_ids[skill])]
+        return [self.ordered_ids[skill][b] for b in np.flatnonzero(bits)]
+
+    def sort(self, row_ids):
+        """Order arbitrary content ids by skill, then prerequisite order."""
+        return sorted(row_ids, key=lambda row_id: self.position[str(row_id)])
+
+# --------------------------------------------------
+# Main
+# --------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Build the prerequisite DAG index")
+    parser.add_argument("--threshold", type=float, default=RESOLVE_THRESHOLD)
+    parser.add_argument("--output", default=OUTPUT_PATH)
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("🕸  PREREQUISITE GRAPH")
+    print("=" * 70)
+
+    start = datetime.now()
+    # Prerequisite texts must be embedded with the model of the stored vectors
+    model, dimensions = use_active_embedding_model()
+    rows, matrix = load_content_matrix(f"{META_COLUMNS},prerequisites")
+    print(f"📥 Loaded {len(rows)} embedded rows")
+
+    arrays, metadata = build_graph(rows, matrix, args.threshold, QueryEmbeddingCache(model=model, dimensions=dimensions))
+    save_graph(arrays, metadata, args.output)
+
+    print(f"🔗 Resolved prerequisites: {len(metadata['resolved'])}")
+    print(f"❓ Unresolved prerequisites: {len(metadata['unresolved'])}")
+    print(f"🔁 Cycle edges dropped: {len(metadata['cycle_edges'])}")
+    print(f"💾 Wrote {len(metadata['skills'])} skill orderings → {args.output}")
+
+    secs = (datetime.now() - start).total_seconds()
+    print(f"\n⏱ Total time: {secs:.1f} seconds")
+
+if __name__ == "__main__":
+    main()
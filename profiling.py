@@ -0,0 +1,224 @@
+"""
+Profiling mode for the ingestion scripts (--profile).
+
+One rerun of a slow import or embedding run with --profile writes:
+
+    stacks.folded   sampled call stacks in collapsed format
+                    ("stage;thread;frame;frame count"), for flamegraph.pl,
+                    speedscope or inferno
+    memory.txt      tracemalloc top allocation sites every --memory-interval
+    stages.json     wall vs CPU seconds per stage; wall far above CPU means
+                    the stage is waiting (HTTP, sleep), CPU close to wall
+                    means it is compute bound (JSON encoding, pandas)
+
+Stages are marked in the scripts with `with stage("name"):` or `@staged("name")`.
+Both are no-ops unless a profiler is running, so the hooks cost nothing in
+normal runs. The sampler is a thread polling sys._current_frames(), so it
+never interrupts blocking HTTP calls the way a SIGPROF timer would.
+
+Usage (any script that calls add_profile_arguments / start_profiler):
+    python generate_embeddings.py --profile [--profile-interval 0.005] [--memory-interval 30]
+    flamegraph.pl artifacts/profiles/generate_embeddings-*/stacks.folded > flame.svg
+"""
+import argparse
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+# --------------------------------------------------
+# Config
+# --------------------------------------------------
+PROFILE_DIR = os.path.join("artifacts", "profiles")
+SAMPLE_INTERVAL = 0.005   # seconds between stack samples (200 Hz)
+MEMORY_INTERVAL = 30.0    # seconds between tracemalloc snapshots
+MEMORY_TOP = 15           # allocation sites per snapshot
+TRACE_FRAMES = 5          # frames tracemalloc keeps per allocation
+
+_active = None
+
+# --------------------------------------------------
+# Stages
+# --------------------------------------------------
+@contextmanager
+def stage(name):
+    """Attribute the enclosed block's wall and CPU time to a stage (no-op when not profiling)."""
+    profiler = _active
+    if profiler is None:
+        yield
+        return
+    with profiler.stage(name):
+        yield
+
+def staged(name):
+    """Decorator form of stage()."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            if _active is None:
+                return fn(*args, **kwargs)
+            with _active.stage(name):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+# --------------------------------------------------
+# Profiler
+# --------------------------------------------------
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class Profiler:
+    """Stack sampler + tracemalloc snapshots + per-stage wall/CPU accounting."""
+
+    def __init__(self, name, out_dir=PROFILE_DIR, interval=SAMPLE_INTERVAL, memory_interval=MEMORY_INTERVAL):
+        self.out_dir = os.path.join(out_dir, f"{name}-{datetime.now():%Y%m%d-%H%M%S}")
+        self.interval = interval
+        self.memory_interval = memory_interval
+        self.samples = Counter()
+        self.stages = {}             # name -> {"calls", "wall", "cpu"}
+        self.current = {}            # thread id -> stack of open stage names
+        self.running = False
+        self.thread = None
+        self.snapshots = 0
+
+    @contextmanager
+    def stage(self, name):
+        stack = self.current.setdefault(threading.get_ident(), [])
+        stack.append(name)
+        # thread_time: CPU of this thread only, so the sampler's own work is excluded
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, time.thread_time() - cpu
+            stack.pop()
+            totals = self.stages.setdefault(name, {"calls": 0, "wall": 0.0, "cpu": 0.0})
+            totals["calls"] += 1
+            totals["wall"] += wall
+            totals["cpu"] += cpu
+
+    def start(self):
+        global _active
+        os.makedirs(self.out_dir, exist_ok=True)
+        tracemalloc.start(TRACE_FRAMES)
+        self.started_wall, self.started_cpu = time.perf_counter(), time.process_time()
+        self.running = True
+        self.thread = threading.Thread(target=self._sample_loop, name="profiler", daemon=True)
+        self.thread.start()
+        _active = self
+        return self
+
+    def _sample_loop(self):
+        me = threading.get_ident()
+        names = {}
+        next_snapshot = time.perf_counter() + self.memory_interval
+        while self.running:
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                frames = []
+                while frame is not None:
+                    # The stage()/staged() wrappers are noise in a flamegraph
+                    if frame.f_code.co_filename != __file__:
+                        frames.append(_frame_label(frame))
+                    frame = frame.f_back
+                if ident not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                stages = self.current.get(ident) or ["(no stage)"]
+                root = [stages[-1], names.get(ident, str(ident))]
+                self.samples[";".join(root + frames[::-1])] += 1
+            if self.memory_interval and time.perf_counter() >= next_snapshot:
+                self.snapshot()
+                next_snapshot = time.perf_counter() + self.memory_interval
+            time.sleep(self.interval)
+
+    def snapshot(self, label=None):
+        """Append the top allocation sites to memory.txt."""
+        current, peak = tracemalloc.get_traced_memory()
+        stats = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ]).statistics("lineno")
+        elapsed = time.perf_counter() - self.started_wall
+        with open(os.path.join(self.out_dir, "memory.txt"), "a", encoding="utf-8") as f:
+            f.write(f"=== {label or f't={elapsed:.1f}s'}  current={current / 1e6:.1f} MB  peak={peak / 1e6:.1f} MB\n")
+            for stat in stats[:MEMORY_TOP]:
+                frame = stat.traceback[0]
+                f.write(f"{stat.size / 1e6:10.2f} MB {stat.count:9} blocks  {frame.filename}:{frame.lineno}\n")
+            f.write("\n")
+        self.snapshots += 1
+
+    def stop(self):
+        """Stop sampling, write the three outputs and print the stage split."""
+        global _active
+        if not self.running:
+            return
+        self.running = False
+        self.thread.join()
+        _active = None
+        self.snapshot("final")
+        tracemalloc.stop()
+
+        wall, cpu = time.perf_counter() - self.started_wall, time.process_time() - self.started_cpu
+        with open(os.path.join(self.out_dir, "stacks.folded"), "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+        report = {
+            "total": {"wall": round(wall, 3), "cpu": round(cpu, 3)},
+            "stages": {
+                name: {**t, "wall": round(t["wall"], 3), "cpu": round(t["cpu"], 3), "wait": round(max(0.0, t["wall"] - t["cpu"]), 3)}
+                for name, t in sorted(self.stages.items(), key=lambda kv: -kv[1]["wall"])
+            },
+            "samples": sum(self.samples.values()),
+            "memory_snapshots": self.snapshots,
+        }
+        with open(os.path.join(self.out_dir, "stages.json"), "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        self.print_report(report)
+
+    def print_report(self, report):
+        print("\n" + "=" * 70)
+        print("🔬 PROFILE (stages are inclusive; nested stages overlap)")
+        print("=" * 70)
+        print(f"{'stage':<28} {'calls':>7} {'wall s':>9} {'cpu s':>9} {'wait s':>9}")
+        for name, t in report["stages"].items():
+            print(f"{name[:28]:<28} {t['calls']:>7} {t['wall']:>9.2f} {t['cpu']:>9.2f} {t['wait']:>9.2f}")
+        total = report["total"]
+        print(f"{'total (process)':<28} {'':>7} {total['wall']:>9.2f} {total['cpu']:>9.2f} {max(0.0, total['wall'] - total['cpu']):>9.2f}")
+        print(f"💾 {report['samples']} stack samples, {report['memory_snapshots']} memory snapshots → {self.out_dir}")
+
+# --------------------------------------------------
+# CLI wiring
+# --------------------------------------------------
+def add_profile_arguments(parser):
+    group = parser.add_argument_group("profiling")
+    group.add_argument("--profile", action="store_true", help="sample stacks, memory and per-stage time")
+    group.add_argument("--profile-interval", type=float, default=SAMPLE_INTERVAL, help="seconds between stack samples")
+    group.add_argument("--memory-interval", type=float, default=MEMORY_INTERVAL,
+                       help="seconds between tracemalloc snapshots (0: final snapshot only)")
+    group.add_argument("--profile-dir", default=PROFILE_DIR)
+    return parser
+
+def start_profiler(args, name):
+    """Start a profiler if args.profile is set; it stops and reports at exit."""
+    if not args.profile:
+        return None
+    profiler = Profiler(name, args.profile_dir, args.profile_interval, args.memory_interval).start()
+    atexit.register(profiler.stop)
+    print(f"🔬 Profiling → {profiler.out_dir}")
+    return profiler
+
+def profile_from_argv(name):
+    """For scripts without their own argparse: honour the profiling flags in sys.argv."""
+    parser = add_profile_arguments(argparse.ArgumentParser(add_help=False))
+    args, _ = parser.parse_known_args()
+    return start_profiler(args, name)
@@ -0,0 +1,280 @@
+"""
+Python retrieval layer over the learning_content embeddings.
+
+Loads every embedded row once into an L2-normalised float32 matrix so batch
+jobs can score content with plain matrix products instead of one
+match_documents RPC per query.
+
+Usage (batch retrieval, one query per line):
+    python retrieval.py queries.txt [--top-k 5] [--output results.json]
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+
+from embedding_cache import QueryEmbeddingCache
+from facet_index import FacetIndex, add_filter_arguments, has_filters, select_from_args
+from generate_embeddings import fetch_rows_with_vectors, get_embeddings, use_active_embedding_model
+
+# --------------------------------------------------
+# Config
+# --------------------------------------------------
+META_COLUMNS = "id,skill_name,module_name,topic_name,subtopic_name"
+TOP_K = 5
+BLOCK_SIZE = 1024  # rows per score tile; peak memory ~ BLOCK_SIZE² float32
+VERSIONS_TABLE = "learning_content_embeddings"
+SHADOW_LOG = os.path.join("artifacts", "shadow_reads.jsonl")
+
+# --------------------------------------------------
+# Helpers
+# --------------------------------------------------
+def normalize_rows(matrix):
+    """L2-normalise rows in place so dot products are cosine similarities."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+    return matrix
+
+def content_fingerprint(rows, matrix):
+    """Hash of row ids and vectors; changes whenever any embedding changes."""
+    digest = hashlib.sha256()
+    for row in rows:
+        digest.update(str(row["id"]).encode())
+        digest.update(b"\0")
+    digest.update(np.ascontiguousarray(matrix, dtype=np.float32).tobytes())
+    return digest.hexdigest()
+
+# --------------------------------------------------
+# Loading
+# --------------------------------------------------
+def load_content_matrix(columns=META_COLUMNS):
+    """
+    Fetch every embedded row.
+
+    Returns (rows, matrix): metadata dicts and a normalised float32 matrix
+    whose i-th row is the embedding of rows[i].
+    """
+    rows, matrix = fetch_rows_with_vectors(columns, filters={"embedding": "not.is.null"})
+    return rows, normalize_rows(matrix) if len(rows) else matrix
+
+def load_model_matrix(rows, model):
+    """
+    Vectors of a candidate model (learning_content_embeddings) aligned to rows.
+
+    Returns (matrix, covered): a normalised float32 matrix whose i-th row is
+    the candidate embedding of rows[i] (zeros where none exists yet) and a
+    boolean mask of the rows that have one.
+    """
+    found, vectors = fetch_rows_with_vectors(
+        "content_id,embedding", filters={"model": f"eq.{model}"}, table=VERSIONS_TABLE, order="content_id"
+    )
+    position = {str(row["id"]): i for i, row in enumerate(rows)}
+    matrix = np.zeros((len(rows), vectors.shape[1] if len(found) else 0), dtype=np.float32)
+    covered = np.zeros(len(rows), dtype=bool)
+    for row, vector in zip(found, vectors):
+        i = position.get(row["content_id"])
+        if i is not None:
+            matrix[i] = vector
+            covered[i] = True
+    return normalize_rows(matrix), covered
+
+# --------------------------------------------------
+# Scoring
+# --------------------------------------------------
+def mask_indices(mask):
+    """Sorted int32 row ids from a facet_index.Bitset, a boolean mask or row ids."""
+    if hasattr(mask, "indices"):
+        return mask.indices()
+    mask = np.asarray(mask)
+    return np.flatnonzero(mask).astype(np.int32) if mask.dtype == bool else mask.astype(np.int32)
+
+def blocked_top_k(queries, matrix, top_k=TOP_K, block_size=BLOCK_SIZE, exclude_self=False, mask=None):
+    """
+    Top-k rows of `matrix` for every row of `queries` by dot product.
+
+    Scores are computed in block_size x block_size tiles; each query block
+    keeps a running top-k buffer that is merged with every candidate tile, so
+    the full similarity matrix is never materialised. With exclude_self,
+    `queries` must be `matrix` itself and row i never matches itself.
+
+    mask restricts the candidates to a subset of rows (a facet_index.Bitset,
+    a boolean array or row ids). Only those rows are scored, so filtered
+    results are exact, and indices still refer to rows of `matrix`.
+
+    Returns (indices, scores), both shaped (len(queries), k) and sorted by
+    descending score.
+    """
+    candidates = None if mask is None else mask_indices(mask)
+    n_queries = queries.shape[0]
+    n = matrix.shape[0] if candidates is None else len(candidates)
+    k = min(top_k, n)
+    indices = np.empty((n_queries, k), dtype=np.int32)
+    scores = np.empty((n_queries, k), dtype=np.float32)
+    if k == 0:
+        return indices, scores
+
+    for start in range(0, n_queries, block_size):
+        stop = min(start + block_size, n_queries)
+        query = queries[start:stop]
+        best_scores = np.full((stop - start, k), -np.inf, dtype=np.float32)
+        best_idx = np.full((stop - start, k), -1, dtype=np.int32)
+
+        for c_start in range(0, n, block_size):
+            c_stop = min(c_start + block_size, n)
+            if candidates is None:
+                cols = np.arange(c_start, c_stop, dtype=np.int32)
+                tile = query @ matrix[c_start:c_stop].T
+            else:
+                cols = candidates[c_start:c_stop]
+                tile = query @ matrix[cols].T
+
+            # Exclude self-matches wherever a candidate is one of this block's queries
+            if exclude_self:
+                own = (cols >= start) & (cols < stop)
+                if own.any():
+                    tile[cols[own] - start, np.flatnonzero(own)] = -np.inf
+
+            cand_scores = np.concatenate([best_scores, tile], axis=1)
+            cand_idx = np.concatenate([best_idx, np.broadcast_to(cols, tile.shape)], axis=1)
+            keep = np.argpartition(-cand_scores, k - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(cand_scores, keep, axis=1)
+            best_idx = np.take_along_axis(cand_idx, keep, axis=1)
+
+        order = np.argsort(-best_scores, axis=1)
+        scores[start:stop] = np.take_along_axis(best_scores, order, axis=1)
+        indices[start:stop] = np.take_along_axis(best_idx, order, axis=1)
+
+    return indices, scores
+
+def embed_queries(texts, cache=None):
+    """
+    Embed query texts into a normalised float32 matrix.
+
+    With a QueryEmbeddingCache only uncached texts reach the API; otherwise
+    every text is embedded in batched requests.
+    """
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+    if cache is not None:
+        vectors = cache.embed_many(texts).astype(np.float32, copy=True)
+    else:
+        vectors = np.asarray(get_embeddings(texts), dtype=np.float32)
+    return normalize_rows(vectors)
+
+def batch_retrieve(texts, rows, matrix, top_k=TOP_K, block_size=BLOCK_SIZE, cache=None, mask=None):
+    """
+    Retrieve top-k content rows for many queries at once.
+
+    All queries are embedded in batched calls and scored against the content
+    matrix as one blocked matrix-matrix product. Returns one list per query of
+    row dicts with a `similarity` key, in the same shape match_documents returns.
+    mask (see blocked_top_k) limits the search to matching rows.
+    """
+    if not texts:
+        return []
+    indices, scores = blocked_top_k(embed_queries(texts, cache), matrix, top_k, block_size, mask=mask)
+    return [
+        [{**rows[j], "similarity": round(float(s), 6)} for j, s in zip(idx, sc)]
+        for idx, sc in zip(indices, scores)
+    ]
+
+class ShadowReader:
+    """
+    Runs every retrieval against a candidate embedding model as well, without
+    serving its results, and logs how far the two top-k lists agree
+    (overlap@k: shared rows / k) to SHADOW_LOG for embedding_migration.py.
+    """
+
+    def __init__(self, rows, model, dimensions=None, log_path=SHADOW_LOG, cache_path=None):
+        self.model = model
+        self.ids = [row["id"] for row in rows]
+        self.matrix, self.covered = load_model_matrix(rows, model)
+        self.cache = QueryEmbeddingCache(path=cache_path or ":memory:", model=model, dimensions=dimensions)
+        self.log_path = log_path
+
+    def compare(self, texts, results, top_k=TOP_K, block_size=BLOCK_SIZE, mask=None):
+        """Agreement of the served `results` with the candidate model, one float per query."""
+        if not texts or not self.covered.any():
+            return []
+        candidates = np.flatnonzero(self.covered).astype(np.int32)
+        if mask is not None:
+            candidates = np.intersect1d(candidates, mask_indices(mask), assume_unique=True)
+        indices, _ = blocked_top_k(embed_queries(texts, self.cache), self.matrix, top_k, block_size, mask=candidates)
+
+        agreement = []
+        coverage = round(float(self.covered.mean()), 4)
+        os.makedirs(os.path.dirname(self.log_path) or ".", exist_ok=True)
+        with open(self.log_path, "a", encoding="utf-8") as f:
+            for text, served, shadow in zip(texts, results, indices):
+                served_ids = {m["id"] for m in served}
+                shadow_ids = {self.ids[j] for j in shadow if j >= 0}
+                overlap = len(served_ids & shadow_ids) / max(1, len(served_ids))
+                agreement.append(overlap)
+                f.write(json.dumps({
+                    "at": datetime.now().isoformat(),
+                    "model": self.model,
+                    "query": text,
+                    "top_k": top_k,
+                    "overlap": round(overlap, 4),
+                    "coverage": coverage,
+                }) + "\n")
+        return agreement
+
+# --------------------------------------------------
+# Main
+# --------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Batch retrieval over learning_content")
+    parser.add_argument("queries", help="file with one query per line ('-' for stdin)")
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    parser.add_argument("--output", help="write JSON results here instead of stdout")
+    parser.add_argument("--no-cache", action="store_true", help="bypass the query-embedding cache")
+    parser.add_argument("--shadow-model", help="also rank with this candidate model and log agreement")
+    parser.add_argument("--shadow-dimensions", type=int)
+    add_filter_arguments(parser)
+    args = parser.parse_args()
+
+    source = sys.stdin if args.queries == "-" else open(args.queries, encoding="utf-8")
+    with source:
+        texts = [line.strip() for line in source if line.strip()]
+
+    start = datetime.now()
+    cache = None
+    # Queries must be embedded with the model the stored vectors come from
+    model, dimensions = use_active_embedding_model()
+    if not args.no_cache:
+        cache = QueryEmbeddingCache(model=model, dimensions=dimensions)
+        cache.warm()
+    mask = None
+    if has_filters(args):
+        rows, matrix = load_content_matrix(f"{META_COLUMNS},tags")
+        mask = select_from_args(FacetIndex(rows), args)
+    else:
+        rows, matrix = load_content_matrix()
+    results = batch_retrieve(texts, rows, matrix, args.top_k, cache=cache, mask=mask)
+    agreement = []
+    if args.shadow_model:
+        shadow = ShadowReader(rows, args.shadow_model, args.shadow_dimensions)
+        agreement = shadow.compare(texts, results, args.top_k, mask=mask)
+    secs = (datetime.now() - start).total_seconds()
+
+    output = [{"query": q, "matches": m} for q, m in zip(texts, results)]
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(output, f, indent=2)
+        print(f"✅ Retrieved top-{args.top_k} for {len(texts)} queries in {secs:.1f}s → {args.output}")
+        if cache is not None:
+            print(f"📊 Query cache: {cache.stats()}")
+        if agreement:
+            print(f"👥 Shadow {args.shadow_model}: mean overlap@{args.top_k} "
+                  f"{sum(agreement) / len(agreement):.2f} → {SHADOW_LOG}")
+    else:
+        json.dump(output, sys.stdout, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,604 @@
+"""
+Retrieval evaluation: quality versus latency for every search backend.
+
+Every backend searches the same L2-normalised content matrix, each in
+several configurations, so faster paths can be compared with the exact
+scan on equal terms:
+
+    exact      retrieval.blocked_top_k (the production path)
+    ivf        ANN: spherical k-means lists, scanning the nprobe closest
+    int8       scalar-quantised vectors, optionally re-scored in float32
+    reduced    first d dimensions re-normalised (text-embedding-3 vectors
+               are trained to truncate)
+    hybrid     exact vector ranking fused with BM25 by weighted reciprocal
+               rank fusion
+
+Relevance labels come from the curriculum hierarchy. Each sampled row is a
+query, searched with its own vector and its subtopic + description text,
+and never matches itself. Rows with the same topic_name are relevant
+(gain 2); rows its prerequisites resolve to are relevant (gain 1). The
+prerequisites come from the prerequisite_graph.py artifact when one exists,
+and from exact names otherwise. A hand-labelled JSONL set can be added:
+    {"query": "how do I one-hot encode in spark", "relevant": {"<content id>": 2, ...}}
+(a list of ids means gain 1 each).
+
+Per configuration the report has recall@k (relevant hits / min(relevant, k)),
+nDCG@k, overlap@k with the exact top-k, and p50/p90/p99 single-query
+latency. The exit code is 1 when a check fails. There are two kinds of check:
+    --thresholds   absolute gates per run name (fnmatch patterns), e.g.
+                   {"exact": {"min_recall@10": 0.6}, "ivf/*": {"max_p99_ms": 20}}
+    --baseline     an earlier report: quality may drop at most
+                   MAX_QUALITY_DROP, p99 may grow at most MAX_SLOWDOWN times
+
+Usage:
+    python retrieval_eval.py [--replica artifacts/curriculum.sqlite] [--queries 500] [--k 1,5,10]
+                             [--labelled queries.jsonl] [--backends exact,ivf,int8,reduced,hybrid]
+                             [--thresholds retrieval_thresholds.json] [--baseline artifacts/retrieval_baseline.json]
+    (--report must differ from --baseline; promote a good report by copying it over the baseline)
+"""
+import argparse
+import fnmatch
+import json
+import math
+import os
+import re
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+
+import numpy as np
+
+from embedding_cache import QueryEmbeddingCache, normalize_query
+from generate_embeddings import parse_array, use_active_embedding_model
+from prerequisite_graph import OUTPUT_PATH as GRAPH_PATH
+from prerequisite_graph import build_name_index
+from retrieval import blocked_top_k, content_fingerprint, embed_queries, load_content_matrix, normalize_rows
+
+# --------------------------------------------------
+# Config
+# --------------------------------------------------
+REPORT_PATH = os.path.join("artifacts", "retrieval_eval.json")
+EVAL_COLUMNS = "id,skill_name,module_name,topic_name,subtopic_name,description,tags,prerequisites"
+K_VALUES = (1, 5, 10)
+QUERIES = 500
+SEED = 7
+TOPIC_GAIN = 2
+PREREQ_GAIN = 1
+WARMUP_QUERIES = 5
+
+IVF_PROBES = (1, 2, 4, 8, 16, 32)
+KMEANS_ITERATIONS = 10
+KMEANS_SAMPLE = 20_000
+INT8_RERANK = (0, 4)          # 0 = int8 scores only; r = re-score the top r·k in float32
+INT8_BLOCK = 4096             # rows dequantised per step
+REDUCED_DIMS = (64, 128, 256, 512)
+HYBRID_WEIGHTS = (0.5, 0.7)   # weight of the vector ranking in the fusion
+HYBRID_DEPTH = 50             # candidates taken from each ranking
+RRF_K = 60
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+MAX_QUALITY_DROP = 0.02       # absolute, per recall/nDCG/overlap metric
+MAX_SLOWDOWN = 1.5            # p99 relative to the baseline…
+LATENCY_FLOOR_MS = 1.0        # …ignored below this many ms of growth (timer noise)
+
+BACKENDS = ("exact", "ivf", "int8", "reduced", "hybrid")
+_TOKEN = re.compile(r"[a-z0-9_]+")
+
+# --------------------------------------------------
+# Backends
+# --------------------------------------------------
+def top_k_of(scores, ids, k):
+    """ids of the k highest scores, best first."""
+    if len(scores) > k:
+        keep = np.argpartition(-scores, k - 1)[:k]
+        scores, ids = scores[keep], ids[keep]
+    return ids[np.argsort(-scores, kind="stable")]
+
+class ExactBackend:
+    name = "exact"
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+
+    def configs(self):
+        return [{}]
+
+    def nbytes(self, config):
+        return self.matrix.nbytes
+
+    def search(self, vector, text, k):
+        return blocked_top_k(vector[None, :], self.matrix, k)[0][0]
+
+class IVFBackend:
+    """Inverted file index: rows grouped under their nearest k-means centroid."""
+
+    name = "ivf"
+
+    def __init__(self, matrix, nlist=None, seed=SEED):
+        n = matrix.shape[0]
+        self.matrix = matrix
+        self.nlist = nlist or max(1, min(n, int(4 * math.sqrt(n))))
+        rng = np.random.default_rng(seed)
+        sample = matrix[rng.choice(n, min(n, KMEANS_SAMPLE), replace=False)]
+        centroids = sample[rng.choice(len(sample), self.nlist, replace=False)].copy()
+        for _ in range(KMEANS_ITERATIONS):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            empty = np.bincount(assign, minlength=self.nlist) == 0
+            sums[empty] = centroids[empty]  # keep a centroid that lost all its points
+            centroids = normalize_rows(sums)
+        self.centroids = centroids
+
+        assign = np.concatenate([
+            np.argmax(matrix[s:s + KMEANS_SAMPLE] @ centroids.T, axis=1) for s in range(0, n, KMEANS_SAMPLE)
+        ])
+        self.order = np.argsort(assign, kind="stable").astype(np.int32)
+        self.offsets = np.searchsorted(assign[self.order], np.arange(self.nlist + 1))
+
+    def configs(self):
+        return [{"nprobe": p} for p in IVF_PROBES if p <= self.nlist]
+
+    def nbytes(self, config):
+        return self.matrix.nbytes + self.centroids.nbytes + self.order.nbytes
+
+    def search(self, vector, text, k, nprobe):
+        probes = np.argpartition(-(self.centroids @ vector), nprobe - 1)[:nprobe]
+        ids = np.concatenate([self.order[self.offsets[c]:self.offsets[c + 1]] for c in probes])
+        return top_k_of(self.matrix[ids] @ vector, ids, k)
+
+class Int8Backend:
+    """Symmetric per-dimension int8 codes; float32 kept only for re-scoring."""
+
+    name = "int8"
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+        self.scale = np.maximum(np.abs(matrix).max(axis=0), 1e-12) / 127
+        self.codes = np.round(matrix / self.scale).astype(np.int8)
+        self.ids = np.arange(matrix.shape[0], dtype=np.int32)
+
+    def configs(self):
+        return [{"rerank": r} for r in INT8_RERANK]
+
+    def nbytes(self, config):
+        # Re-scoring reads float32 rows, but only a few per query (from disk in practice)
+        return self.codes.nbytes + self.scale.nbytes
+
+    def search(self, vector, text, k, rerank):
+        query = (vector * self.scale).astype(np.float32)
+        scores = np.concatenate([
+            self.codes[s:s + INT8_BLOCK].astype(np.float32) @ query for s in range(0, len(self.codes), INT8_BLOCK)
+        ])
+        if not rerank:
+            return top_k_of(scores, self.ids, k)
+        shortlist = top_k_of(scores, self.ids, rerank * k)
+        return top_k_of(self.matrix[shortlist] @ vector, shortlist, k)
+
+class ReducedBackend:
+    """Leading dimensions only, re-normalised."""
+
+    name = "reduced"
+
+    def __init__(self, matrix):
+        self.matrices = {
+            d: normalize_rows(matrix[:, :d].copy()) for d in REDUCED_DIMS if d < matrix.shape[1]
+        }
+
+    def configs(self):
+        return [{"dims": d} for d in self.matrices]
+
+    def nbytes(self, config):
+        return self.matrices[config["dims"]].nbytes
+
+    def search(self, vector, text, k, dims):
+        query = vector[:dims] / max(float(np.linalg.norm(vector[:dims])), 1e-12)
+        return blocked_top_k(query[None, :].astype(np.float32), self.matrices[dims], k)[0][0]
+
+def tokenize(text):
+    return _TOKEN.findall((text or "").lower())
+
+class BM25Index:
+    """Okapi BM25 with each posting's term weight precomputed."""
+
+    def __init__(self, texts, k1=BM25_K1, b=BM25_B):
+        docs = [Counter(tokenize(t)) for t in texts]
+        self.size = len(docs)
+        lengths = np.array([sum(d.values()) for d in docs], dtype=np.float32)
+        norm = k1 * (1 - b + b * lengths / max(float(lengths.mean()) if len(docs) else 0.0, 1e-9))
+        postings = defaultdict(lambda: ([], []))
+        for i, doc in enumerate(docs):
+            for term, tf in doc.items():
+                postings[term][0].append(i)
+                postings[term][1].append(tf)
+        self.postings = {}
+        for term, (ids, tfs) in postings.items():
+            ids = np.array(ids, dtype=np.int32)
+            tfs = np.array(tfs, dtype=np.float32)
+            idf = math.log(1 + (self.size - len(ids) + 0.5) / (len(ids) + 0.5))
+            self.postings[term] = (ids, (idf * tfs * (k1 + 1) / (tfs + norm[ids])).astype(np.float32))
+
+    @property
+    def nbytes(self):
+        return sum(ids.nbytes + w.nbytes for ids, w in self.postings.values())
+
+    def search(self, text, k):
+        scores = np.zeros(self.size, dtype=np.float32)
+        for term in set(tokenize(text)):
+            if term in self.postings:
+                ids, weights = self.postings[term]
+                scores[ids] += weights  # ids are unique within a posting list
+        hits = np.flatnonzero(scores).astype(np.int32)
+        return top_k_of(scores[hits], hits, k)
+
+class HybridBackend:
+    """Exact vector ranking and BM25 ranking merged by weighted RRF."""
+
+    name = "hybrid"
+
+    def __init__(self, matrix, texts):
+        self.matrix = matrix
+        self.bm25 = BM25Index(texts)
+
+    def configs(self):
+        return [{"vector_weight": w} for w in HYBRID_WEIGHTS]
+
+    def nbytes(self, config):
+        return self.matrix.nbytes + self.bm25.nbytes
+
+    def search(self, vector, text, k, vector_weight):
+        depth = max(HYBRID_DEPTH, k)
+        fused = defaultdict(float)
+        for weight, ranked in (
+            (vector_weight, blocked_top_k(vector[None, :], self.matrix, depth)[0][0]),
+            (1 - vector_weight, self.bm25.search(text, depth)),
+        ):
+            for rank, i in enumerate(ranked):
+                fused[int(i)] += weight / (RRF_K + rank + 1)
+        best = sorted(fused.items(), key=lambda item: -item[1])[:k]
+        return np.array([i for i, _ in best], dtype=np.int32)
+
+def document_text(row):
+    tags = " ".join(parse_array(row.get("tags")))
+    return " ".join(
+        str(row.get(c) or "") for c in ("skill_name", "module_name", "topic_name", "subtopic_name", "description")
+    ) + " " + tags
+
+def query_text(row):
+    return f"{row.get('subtopic_name') or ''} {row.get('description') or ''}"
+
+def build_backends(names, rows, matrix, nlist=None, seed=SEED):
+    """Backend objects by name, with their build time in seconds."""
+    factories = {
+        "exact": lambda: ExactBackend(matrix),
+        "ivf": lambda: IVFBackend(matrix, nlist, seed),
+        "int8": lambda: Int8Backend(matrix),
+        "reduced": lambda: ReducedBackend(matrix),
+        "hybrid": lambda: HybridBackend(matrix, [document_text(r) for r in rows]),
+    }
+    built = []
+    for name in names:
+        start = time.perf_counter()
+        backend = factories[name]()
+        built.append((backend, time.perf_counter() - start))
+    return built
+
+def run_name(backend, config):
+    return "/".join([backend.name] + [f"{key}={value}" for key, value in config.items()])
+
+# --------------------------------------------------
+# Labels
+# --------------------------------------------------
+def prerequisite_rows(rows, graph_path=GRAPH_PATH):
+    """
+    {row index: set of row indices its prerequisites resolve to}.
+
+    Uses the edges of the prerequisite_graph.py artifact when it exists;
+    otherwise exact subtopic/topic/module names only, so no API calls.
+    """
+    position = {str(row["id"]): i for i, row in enumerate(rows)}
+    prereqs = defaultdict(set)
+    if graph_path and os.path.exists(graph_path):
+        with np.load(graph_path) as data:
+            ids = data["ids"].tolist()
+            for src, dst in data["edges"]:
+                a, b = position.get(str(ids[src])), position.get(str(ids[dst]))
+                if a is not None and b is not None:
+                    prereqs[b].add(a)
+        return prereqs
+    name_index = build_name_index(rows)
+    for i, row in enumerate(rows):
+        for prereq in parse_array(row.get("prerequisites")):
+            key = normalize_query(prereq)
+            match = next((names[key] for names in name_index if key in names), None)
+            if match is not None and match != i:
+                prereqs[i].add(match)
+    return prereqs
+
+def hierarchy_labels(rows, graph_path=GRAPH_PATH):
+    """{row index: {relevant row index: gain}} for every row with at least one relevant row."""
+    by_topic = defaultdict(list)
+    for i, row in enumerate(rows):
+        if row.get("topic_name"):
+            by_topic[normalize_query(row["topic_name"])].append(i)
+    prereqs = prerequisite_rows(rows, graph_path)
+
+    labels = {}
+    for i, row in enumerate(rows):
+        gains = {j: PREREQ_GAIN for j in prereqs.get(i, ())}
+        for j in by_topic.get(normalize_query(row.get("topic_name") or ""), ()):
+            if j != i:
+                gains[j] = TOPIC_GAIN
+        if gains:
+            labels[i] = gains
+    return labels
+
+def load_labelled(path, rows, cache=None):
+    """Hand-labelled queries as (texts, vectors, [{row index: gain}])."""
+    position = {str(row["id"]): i for i, row in enumerate(rows)}
+    texts, labels = [], []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            relevant = item["relevant"]
+            if isinstance(relevant, list):
+                relevant = {r: 1 for r in relevant}
+            gains = {position[str(r)]: g for r, g in relevant.items() if str(r) in position}
+            if gains:
+                texts.append(item["query"])
+                labels.append(gains)
+    return texts, embed_queries(texts, cache), labels
+
+# --------------------------------------------------
+# Evaluation
+# --------------------------------------------------
+def recall_at(ranked, gains, k):
+    return len(set(ranked[:k]) & gains.keys()) / min(len(gains), k)
+
+def ndcg_at(ranked, gains, k):
+    dcg = sum((2 ** gains.get(i, 0) - 1) / math.log2(rank + 2) for rank, i in enumerate(ranked[:k]))
+    ideal = sorted(gains.values(), reverse=True)[:k]
+    idcg = sum((2 ** g - 1) / math.log2(rank + 2) for rank, g in enumerate(ideal))
+    return dcg / idcg
+
+def percentile_ms(latencies, q):
+    return round(float(np.percentile(latencies, q)) * 1000, 3) if latencies else None
+
+def run_queries(backend, config, queries, k):
+    """Ranked row indices per query (self excluded) and per-query latency in seconds."""
+    ranked, latencies = [], []
+    for vector, text, _, own in queries[:WARMUP_QUERIES]:
+        backend.search(vector, text, k + 1, **config)
+    for vector, text, _, own in queries:
+        start = time.perf_counter()
+        ids = backend.search(vector, text, k + (own is not None), **config)
+        latencies.append(time.perf_counter() - start)
+        ranked.append([int(i) for i in ids if i != own][:k])
+    return ranked, latencies
+
+def evaluate(backends, queries, k_values=K_VALUES):
+    """
+    One report entry per backend configuration.
+
+    queries: (vector, text, gains, own row index or None). The first entry of
+    backends is the reference for overlap@k (exact, when it is run).
+    """
+    k_max = max(k_values)
+    runs = []
+    reference = None
+    for backend, build_secs in backends:
+        for config in backend.configs():
+            ranked, latencies = run_queries(backend, config, queries, k_max)
+            if reference is None:
+                reference = ranked
+            metrics = {}
+            for k in k_values:
+                metrics[f"recall@{k}"] = round(float(np.mean([recall_at(r, q[2], k) for r, q in zip(ranked, queries)])), 4)
+                metrics[f"ndcg@{k}"] = round(float(np.mean([ndcg_at(r, q[2], k) for r, q in zip(ranked, queries)])), 4)
+                metrics[f"overlap@{k}"] = round(float(np.mean([
+                    len(set(r[:k]) & set(e[:k])) / max(1, len(e[:k])) for r, e in zip(ranked, reference)
+                ])), 4)
+            runs.append({
+                "name": run_name(backend, config),
+                "backend": backend.name,
+                "config": config,
+                "build_seconds": round(build_secs, 3),
+                "index_bytes": int(backend.nbytes(config)),
+                "metrics": metrics,
+                "latency_ms": {
+                    "mean": round(float(np.mean(latencies)) * 1000, 3),
+                    "p50": percentile_ms(latencies, 50),
+                    "p90": percentile_ms(latencies, 90),
+                    "p99": percentile_ms(latencies, 99),
+                },
+            })
+    return runs
+
+def latency_curves(runs, k):
+    """Per backend: its configurations as (p50, p99, recall@k) points, fastest first."""
+    curves = defaultdict(list)
+    for run in runs:
+        curves[run["backend"]].append({
+            "name": run["name"],
+            "p50_ms": run["latency_ms"]["p50"],
+            "p99_ms": run["latency_ms"]["p99"],
+            f"recall@{k}": run["metrics"][f"recall@{k}"],
+            f"overlap@{k}": run["metrics"][f"overlap@{k}"],
+        })
+    return {name: sorted(points, key=lambda p: p["p50_ms"]) for name, points in curves.items()}
+
+# --------------------------------------------------
+# Regression checks
+# --------------------------------------------------
+def check_thresholds(report, thresholds):
+    """Absolute gates: {pattern: {"min_<metric>" | "max_<p50|p90|p99>_ms": value}} → failures."""
+    failures = []
+    for section, runs in report["suites"].items():
+        for run in runs:
+            for pattern, gates in thresholds.items():
+                if not fnmatch.fnmatch(run["name"], pattern):
+                    continue
+                for gate, limit in gates.items():
+                    bound, _, metric = gate.partition("_")
+                    if bound == "max":
+                        value = run["latency_ms"].get(metric.removesuffix("_ms"))
+                        ok = value is not None and value <= limit
+                    else:
+                        value = run["metrics"].get(metric)
+                        ok = value is not None and value >= limit
+                    if not ok:
+                        failures.append(f"{section}:{run['name']} {gate} = {value} (limit {limit})")
+    return failures
+
+def check_baseline(report, baseline, max_drop=MAX_QUALITY_DROP, max_slowdown=MAX_SLOWDOWN):
+    """Relative gates against an earlier report → failures (quality only when the content is unchanged)."""
+    failures = []
+    same_content = baseline.get("fingerprint") == report["fingerprint"]
+    if not same_content:
+        print("⚠️  Content changed since the baseline; comparing latency only")
+    for section, runs in report["suites"].items():
+        before = {run["name"]: run for run in baseline.get("suites", {}).get(section, [])}
+        for run in runs:
+            old = before.get(run["name"])
+            if old is None:
+                continue
+            if same_content:
+                for metric, value in run["metrics"].items():
+                    if metric in old["metrics"] and value < old["metrics"][metric] - max_drop:
+                        failures.append(f"{section}:{run['name']} {metric} {old['metrics'][metric]} → {value}")
+            p99, old_p99 = run["latency_ms"]["p99"], old["latency_ms"]["p99"]
+            if p99 > old_p99 * max_slowdown and p99 - old_p99 > LATENCY_FLOOR_MS:
+                failures.append(f"{section}:{run['name']} p99 {old_p99} ms → {p99} ms")
+    return failures
+
+# --------------------------------------------------
+# Main
+# --------------------------------------------------
+def load_rows(replica):
+    if not replica:
+        return load_content_matrix(EVAL_COLUMNS)
+    from sync_local_replica import connect_replica, load_replica_matrix, load_replica_rows
+
+    conn = connect_replica(replica)
+    rows, matrix = load_replica_matrix(conn)
+    details = {str(r["id"]): r for r in load_replica_rows(conn)}
+    conn.close()
+    return [{**details.get(str(r["id"]), {}), **r} for r in rows], matrix
+
+def print_runs(title, runs, k):
+    print(f"\n📊 {title}")
+    print(f"   {'run':<28} {f'recall@{k}':>10} {f'ndcg@{k}':>9} {f'overlap@{k}':>11} {'p50 ms':>9} {'p99 ms':>9} {'MB':>8}")
+    for run in runs:
+        m, lat = run["metrics"], run["latency_ms"]
+        print(
+            f"   {run['name']:<28} {m[f'recall@{k}']:>10.3f} {m[f'ndcg@{k}']:>9.3f} {m[f'overlap@{k}']:>11.3f} "
+            f"{lat['p50']:>9.3f} {lat['p99']:>9.3f} {run['index_bytes'] / 1e6:>8.1f}"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall / nDCG / latency for every retrieval backend")
+    parser.add_argument("--replica", help="read content from this local SQLite replica instead of Supabase")
+    parser.add_argument("--backends", default=",".join(BACKENDS))
+    parser.add_argument("--queries", type=int, default=QUERIES, help="hierarchy queries sampled from the content")
+    parser.add_argument("--k", default=",".join(map(str, K_VALUES)))
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--nlist", type=int, help="IVF lists (default 4·√rows)")
+    parser.add_argument("--graph", default=GRAPH_PATH, help="prerequisite_graph.py artifact for prerequisite labels")
+    parser.add_argument("--labelled", help="hand-labelled JSONL queries")
+    parser.add_argument("--thresholds", help="JSON of absolute gates per run name pattern")
+    parser.add_argument("--baseline", help="earlier report to check for regressions")
+    parser.add_argument("--max-quality-drop", type=float, default=MAX_QUALITY_DROP)
+    parser.add_argument("--max-slowdown", type=float, default=MAX_SLOWDOWN)
+    parser.add_argument("--report", default=REPORT_PATH)
+    args = parser.parse_args()
+
+    names = [b.strip() for b in args.backends.split(",") if b.strip()]
+    unknown = set(names) - set(BACKENDS)
+    if unknown:
+        parser.error(f"unknown backends: {', '.join(sorted(unknown))}")
+    k_values = sorted({int(k) for k in args.k.split(",")})
+    if args.baseline:
+        if not os.path.exists(args.baseline):
+            parser.error(f"baseline {args.baseline} does not exist")
+        if os.path.realpath(args.baseline) == os.path.realpath(args.report):
+            parser.error("--report would overwrite --baseline; write the report elsewhere")
+
+    print("=" * 70)
+    print("🎯 RETRIEVAL EVALUATION")
+    print("=" * 70)
+    start = datetime.now()
+
+    rows, matrix = load_rows(args.replica)
+    if not len(rows):
+        print("❌ No embedded content to evaluate")
+        sys.exit(1)
+    print(f"📦 {len(rows)} rows × {matrix.shape[1]} dims ({'replica' if args.replica else 'Supabase'})")
+
+    labels = hierarchy_labels(rows, args.graph)
+    rng = np.random.default_rng(args.seed)
+    labelled_rows = sorted(labels)
+    sample = sorted(rng.choice(labelled_rows, min(args.queries, len(labelled_rows)), replace=False).tolist())
+    suites = {"hierarchy": [(matrix[i], query_text(rows[i]), labels[i], i) for i in sample]}
+    print(f"🏷️  {len(sample)} hierarchy queries ({len(labelled_rows)} rows have relevant neighbours)")
+
+    if args.labelled:
+        # Queries must be embedded with the model of the stored vectors
+        model, dimensions = use_active_embedding_model()
+        cache = QueryEmbeddingCache(model=model, dimensions=dimensions)
+        texts, vectors, gains = load_labelled(args.labelled, rows, cache)
+        suites["labelled"] = [(v, t, g, None) for v, t, g in zip(vectors, texts, gains)]
+        print(f"🏷️  {len(texts)} hand-labelled queries")
+
+    backends = build_backends(names, rows, matrix, args.nlist, args.seed)
+    for backend, secs in backends:
+        print(f"🔧 {backend.name:<8} built in {secs:.2f}s")
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "fingerprint": content_fingerprint(rows, matrix),
+        "rows": len(rows),
+        "dimensions": int(matrix.shape[1]),
+        "seed": args.seed,
+        "k": k_values,
+        "queries": {name: len(q) for name, q in suites.items()},
+        "suites": {},
+        "curves": {},
+    }
+    k_main = max(k_values)
+    for name, queries in suites.items():
+        if not queries:
+            continue
+        runs = evaluate(backends, queries, k_values)
+        report["suites"][name] = runs
+        report["curves"][name] = latency_curves(runs, k_main)
+        print_runs(f"{name} ({len(queries)} queries)", runs, k_main)
+
+    failures = []
+    if args.thresholds:
+        with open(args.thresholds, encoding="utf-8") as f:
+            failures += check_thresholds(report, json.load(f))
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            failures += check_baseline(report, json.load(f), args.max_quality_drop, args.max_slowdown)
+    report["failures"] = failures
+
+    os.makedirs(os.path.dirname(args.report) or ".", exist_ok=True)
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Report → {args.report}")
+
+    if failures:
+        print(f"❌ {len(failures)} regression check(s) failed:")
+        for failure in failures:
+            print(f"   {failure}")
+    else:
+        print("✅ All regression checks passed")
+    print(f"⏱ Total time: {(datetime.now() - start).total_seconds():.1f} seconds")
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
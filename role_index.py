@@ -0,0 +1,159 @@
+"""
+Role → skill → content inverted index.
+
+roles_skills.csv lists the skills of every role, and learning_content rows
+are keyed by skill_name, but the two vocabularies do not line up exactly
+("Data Preprocessing" vs "Data Handling & Preprocessing"). This build step
+matches every role skill to a content skill (exact, then token overlap, then
+embedding similarity) and writes a JSON artifact of per-role posting lists
+with precomputed estimated_hours totals, so role-level views need no table
+scan.
+
+Usage:
+    python role_index.py [--output artifacts/role_index.json]
+"""
+import argparse
+import json
+import os
+import re
+from collections import defaultdict
+from datetime import datetime
+
+import numpy as np
+
+from embedding_cache import QueryEmbeddingCache, normalize_query
+from generate_embeddings import fetch_all_rows, load_roles_skills, use_active_embedding_model
+from retrieval import embed_queries
+
+# --------------------------------------------------
+# Config
+# --------------------------------------------------
+FUZZY_THRESHOLD = 0.6   # min token Jaccard similarity
+EMBED_THRESHOLD = 0.6   # min cosine similarity for embedding fallback
+OUTPUT_PATH = os.path.join("artifacts", "role_index.json")
+STOPWORDS = {"and", "the", "of", "for", "with", "in", "to"}
+
+# --------------------------------------------------
+# Skill matching
+# --------------------------------------------------
+def skill_tokens(name):
+    return {t for t in re.findall(r"[a-z0-9+#.]+", name.lower()) if t not in STOPWORDS}
+
+def token_similarity(a, b):
+    ta, tb = skill_tokens(a), skill_tokens(b)
+    if not ta or not tb:
+        return 0.0
+    return len(ta & tb) / len(ta | tb)
+
+def match_skills(role_skills, content_skills, cache=None,
+                 fuzzy_threshold=FUZZY_THRESHOLD, embed_threshold=EMBED_THRESHOLD):
+    """
+    Best content skill for each role skill.
+
+    Returns {role skill: {"content_skill", "method", "score"}}; role skills
+    with no acceptable match are left out.
+    """
+    exact = {normalize_query(s): s for s in content_skills}
+    matches = {}
+    leftover = []
+    for skill in role_skills:
+        key = normalize_query(skill)
+        if key in exact:
+            matches[skill] = {"content_skill": exact[key], "method": "exact", "score": 1.0}
+            continue
+        scored = [(token_similarity(skill, c), c) for c in content_skills]
+        score, best = max(scored, default=(0.0, None))
+        if score >= fuzzy_threshold:
+            matches[skill] = {"content_skill": best, "method": "fuzzy", "score": round(score, 4)}
+        else:
+            leftover.append(skill)
+
+    if leftover and content_skills:
+        vectors = embed_queries(leftover + list(content_skills), cache)
+        scores = vectors[:len(leftover)] @ vectors[len(leftover):].T
+        for skill, row in zip(leftover, scores):
+            best = int(np.argmax(row))
+            if row[best] >= embed_threshold:
+                matches[skill] = {
+                    "content_skill": content_skills[best],
+                    "method": "embedding",
+                    "score": round(float(row[best]), 4),
+                }
+    return matches
+
+# --------------------------------------------------
+# Index
+# --------------------------------------------------
+def build_role_index(roles, content_rows, cache=None):
+    """Posting lists per content skill and per role, with estimated_hours totals."""
+    skill_rows = defaultdict(list)
+    hours = {}
+    for row in content_rows:
+        skill_rows[row["skill_name"]].append(row["id"])
+        hours[row["id"]] = float(row.get("estimated_hours") or 0)
+
+    content_skills = sorted(skill_rows)
+    role_skills = sorted({s for role in roles for s in role["skills"]})
+    matches = match_skills(role_skills, content_skills, cache)
+
+    skills = {
+        skill: {"rows": ids, "estimated_hours": round(sum(hours[i] for i in ids), 2)}
+        for skill, ids in skill_rows.items()
+    }
+
+    index = {}
+    for role in roles:
+        matched = {s: matches[s] for s in role["skills"] if s in matches}
+        row_ids = sorted({i for m in matched.values() for i in skill_rows[m["content_skill"]]})
+        index[role["role_name"]] = {
+            "category": role["category"],
+            "skills": matched,
+            "unmatched_skills": [s for s in role["skills"] if s not in matches],
+            "rows": row_ids,
+            "estimated_hours": round(sum(hours[i] for i in row_ids), 2),
+        }
+
+    return {
+        "generated_at": datetime.now().isoformat(),
+        "skills": skills,
+        "roles": index,
+    }
+
+def load_role_index(path=OUTPUT_PATH):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+# --------------------------------------------------
+# Main
+# --------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Build the role → skill → content index")
+    parser.add_argument("--output", default=OUTPUT_PATH)
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("🗂  ROLE → SKILL → CONTENT INDEX")
+    print("=" * 70)
+
+    start = datetime.now()
+    roles = load_roles_skills()
+    content_rows = list(fetch_all_rows(select="id,skill_name,estimated_hours"))
+    print(f"📥 Loaded {len(roles)} roles and {len(content_rows)} content rows")
+
+    # Role and skill names must be embedded with the model of the stored vectors
+    model, dimensions = use_active_embedding_model()
+    index = build_role_index(roles, content_rows, QueryEmbeddingCache(model=model, dimensions=dimensions))
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(index, f, separators=(",", ":"))
+
+    covered = sum(1 for r in index["roles"].values() if r["rows"])
+    print(f"✅ {covered}/{len(roles)} roles have matching content")
+    print(f"💾 Wrote index → {args.output}")
+
+    secs = (datetime.now() - start).total_seconds()
+    print(f"\n⏱ Total time: {secs:.1f} seconds")
+
+if __name__ == "__main__":
+    main()
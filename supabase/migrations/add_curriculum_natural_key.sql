@@ -0,0 +1,29 @@
+-- Natural key + content hash on the curriculum tables so sync_curriculum.py
+-- can upsert changed rows instead of re-inserting every batch
+
+-- Remove duplicates left by repeated imports (keep one copy per natural key)
+DELETE FROM learning_content a
+  USING learning_content b
+  WHERE a.skill_name = b.skill_name
+    AND a.module_name = b.module_name
+    AND a.topic_name = b.topic_name
+    AND a.subtopic_name = b.subtopic_name
+    AND a.ctid < b.ctid;
+
+DELETE FROM python_curriculum a
+  USING python_curriculum b
+  WHERE a.skill_name = b.skill_name
+    AND a.module_name = b.module_name
+    AND a.topic_name = b.topic_name
+    AND a.subtopic_name = b.subtopic_name
+    AND a.ctid < b.ctid;
+
+-- SHA-256 of the content columns, written by sync_curriculum.py
+ALTER TABLE learning_content ADD COLUMN IF NOT EXISTS content_hash TEXT;
+ALTER TABLE python_curriculum ADD COLUMN IF NOT EXISTS content_hash TEXT;
+
+-- Conflict target for on_conflict=skill_name,module_name,topic_name,subtopic_name
+CREATE UNIQUE INDEX IF NOT EXISTS uq_learning_content_natural_key
+  ON learning_content(skill_name, module_name, topic_name, subtopic_name);
+CREATE UNIQUE INDEX IF NOT EXISTS uq_python_curriculum_natural_key
+  ON python_curriculum(skill_name, module_name, topic_name, subtopic_name);
@@ -0,0 +1,28 @@
+-- Track row changes on the curriculum tables so clients can sync deltas
+-- (sync_local_replica.py pulls rows with updated_at past its high-water mark)
+ALTER TABLE learning_content
+  ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW();
+ALTER TABLE python_curriculum
+  ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW();
+
+CREATE INDEX IF NOT EXISTS idx_learning_content_updated_at ON learning_content(updated_at);
+CREATE INDEX IF NOT EXISTS idx_python_curriculum_updated_at ON python_curriculum(updated_at);
+
+-- Bump updated_at on every UPDATE
+CREATE OR REPLACE FUNCTION set_updated_at()
+RETURNS TRIGGER AS $$
+BEGIN
+  NEW.updated_at = NOW();
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_learning_content_updated_at ON learning_content;
+CREATE TRIGGER trg_learning_content_updated_at
+  BEFORE UPDATE ON learning_content
+  FOR EACH ROW EXECUTE FUNCTION set_updated_at();
+
+DROP TRIGGER IF EXISTS trg_python_curriculum_updated_at ON python_curriculum;
+CREATE TRIGGER trg_python_curriculum_updated_at
+  BEFORE UPDATE ON python_curriculum
+  FOR EACH ROW EXECUTE FUNCTION set_updated_at();
@@ -0,0 +1,262 @@
+-- Priority scheduling for embedding_queue (after create_embedding_queue.sql).
+-- claim_embedding_jobs used to hand out the oldest jobs first, so a bulk
+-- re-embed of one skill could hold back a freshly imported module for hours.
+--
+-- The trigger records why each job was queued, and its class follows from that:
+--   insert   row inserted without a vector        -> new
+--   missing  row updated and left without a vector -> missing (not searchable)
+--   update   embedded text changed, vector kept     -> refresh (searchable, stale)
+-- Jobs queued by other statements (backfills, cutovers) get missing or update
+-- from the row's vector when they are inserted. A job queued again keeps the
+-- most urgent reason. Its weight is the class weight, doubled
+-- (active_skill_boost) when the row's skill has learners active in
+-- learning_path_steps recently.
+--
+-- Weighted fair queuing across skill_name: each skill keeps a persisted finish
+-- time, and the queue a virtual time (the start of the last claimed job). A
+-- claim repeatedly takes the head job of the skill whose next finish,
+-- finish + 1 / weight, is lowest, and advances that skill's finish. Inside a
+-- skill the head is the oldest job of its heaviest class. Each pick probes
+-- only the heads of the queued skills, never the whole ready set. A 10 000-row
+-- refresh of one skill advances 1 unit per job while a new module in another
+-- skill advances 1/8 unit per job and is interleaved straight away. A skill
+-- joins, or after a claim finds it with nothing ready rejoins, at the virtual
+-- time, so it gets no credit for time it was idle.
+ALTER TABLE embedding_queue
+  ADD COLUMN IF NOT EXISTS reason TEXT CHECK (reason IN ('insert', 'missing', 'update')),
+  ADD COLUMN IF NOT EXISTS skill_name TEXT;
+
+-- Jobs queued before this migration
+UPDATE embedding_queue q
+SET reason = CASE WHEN lc.embedding IS NULL THEN 'missing' ELSE 'update' END,
+    skill_name = COALESCE(lc.skill_name, '')
+FROM learning_content lc
+WHERE lc.id::text = q.content_id AND q.reason IS NULL;
+UPDATE embedding_queue SET reason = 'missing', skill_name = '' WHERE reason IS NULL;
+
+ALTER TABLE embedding_queue
+  ALTER COLUMN reason SET NOT NULL,
+  ALTER COLUMN skill_name SET NOT NULL;
+
+-- Head job of a skill and class: the oldest one
+CREATE INDEX IF NOT EXISTS idx_embedding_queue_skill_head
+  ON embedding_queue(skill_name, reason, enqueued_at);
+-- The queue and its functions look content rows up by id::text
+CREATE INDEX IF NOT EXISTS idx_learning_content_id_text
+  ON learning_content((id::text));
+
+-- Virtual time of the queue (one row) and finish time of each queued skill
+CREATE TABLE IF NOT EXISTS embedding_queue_clock (
+  singleton BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (singleton),
+  virtual_time FLOAT NOT NULL DEFAULT 0
+);
+INSERT INTO embedding_queue_clock DEFAULT VALUES ON CONFLICT DO NOTHING;
+
+CREATE TABLE IF NOT EXISTS embedding_queue_skill_finish (
+  skill_name TEXT PRIMARY KEY,
+  finish FLOAT NOT NULL DEFAULT 0
+);
+INSERT INTO embedding_queue_skill_finish (skill_name)
+SELECT DISTINCT skill_name FROM embedding_queue
+ON CONFLICT DO NOTHING;
+
+-- Service role only (RLS on, no policies)
+ALTER TABLE embedding_queue_clock ENABLE ROW LEVEL SECURITY;
+ALTER TABLE embedding_queue_skill_finish ENABLE ROW LEVEL SECURITY;
+
+ALTER TABLE embedding_queue DROP COLUMN IF EXISTS is_new;
+
+-- Queue a row with the reason it needs a (new) vector
+CREATE OR REPLACE FUNCTION enqueue_embedding()
+RETURNS TRIGGER AS $$
+DECLARE
+  why TEXT;
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    IF NEW.embedding IS NULL THEN
+      why := 'insert';
+    END IF;
+  ELSIF NEW.embedding IS NULL THEN
+    why := 'missing';
+  ELSIF NEW.embedding IS NOT DISTINCT FROM OLD.embedding
+    AND (NEW.skill_name, NEW.module_name, NEW.topic_name, NEW.subtopic_name, NEW.description,
+         NEW.tags, NEW.prerequisites, NEW.estimated_hours)
+      IS DISTINCT FROM
+        (OLD.skill_name, OLD.module_name, OLD.topic_name, OLD.subtopic_name, OLD.description,
+         OLD.tags, OLD.prerequisites, OLD.estimated_hours) THEN
+    -- The embedded text changed but the old vector is still served
+    why := 'update';
+  END IF;
+
+  IF why IS NOT NULL THEN
+    INSERT INTO embedding_queue (content_id, reason, skill_name)
+    VALUES (NEW.id::text, why, COALESCE(NEW.skill_name, ''))
+    ON CONFLICT (content_id) DO UPDATE
+      SET version = embedding_queue.version + 1,
+          attempts = 0,
+          locked_until = NULL,
+          last_error = NULL,
+          skill_name = EXCLUDED.skill_name,
+          reason = CASE
+            WHEN 'insert' IN (embedding_queue.reason, EXCLUDED.reason) THEN 'insert'
+            WHEN 'missing' IN (embedding_queue.reason, EXCLUDED.reason) THEN 'missing'
+            ELSE 'update'
+          END;
+    PERFORM pg_notify('embedding_queue', NEW.id::text);
+  END IF;
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Fill reason and skill for jobs queued without them, and register the skill
+CREATE OR REPLACE FUNCTION embedding_queue_fill()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF NEW.reason IS NULL OR NEW.skill_name IS NULL THEN
+    SELECT
+      COALESCE(NEW.reason, CASE WHEN lc.embedding IS NULL THEN 'missing' ELSE 'update' END),
+      COALESCE(NEW.skill_name, lc.skill_name)
+    INTO NEW.reason, NEW.skill_name
+    FROM learning_content lc
+    WHERE lc.id::text = NEW.content_id;
+    NEW.reason := COALESCE(NEW.reason, 'missing');
+    NEW.skill_name := COALESCE(NEW.skill_name, '');
+  END IF;
+  INSERT INTO embedding_queue_skill_finish (skill_name, finish)
+  SELECT NEW.skill_name, c.virtual_time FROM embedding_queue_clock c
+  ON CONFLICT DO NOTHING;
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_embedding_queue_fill ON embedding_queue;
+CREATE TRIGGER trg_embedding_queue_fill
+  BEFORE INSERT OR UPDATE OF skill_name ON embedding_queue
+  FOR EACH ROW EXECUTE FUNCTION embedding_queue_fill();
+
+-- Same contract as before plus priority_class and skill_name; the extra
+-- arguments default to the weights above. Dropped first so PostgREST never
+-- sees two overloads. Claims run one at a time (the clock row is locked), so
+-- they need no SKIP LOCKED; jobs are returned in claim order.
+DROP FUNCTION IF EXISTS embedding_queue_ready(INTEGER, FLOAT, FLOAT, FLOAT, FLOAT, INTEGER);
+DROP FUNCTION IF EXISTS claim_embedding_jobs(INTEGER, INTEGER, INTEGER);
+CREATE OR REPLACE FUNCTION claim_embedding_jobs(
+  batch_size INTEGER DEFAULT 64,
+  lease_seconds INTEGER DEFAULT 120,
+  max_attempts INTEGER DEFAULT 5,
+  weight_new FLOAT DEFAULT 8,
+  weight_missing FLOAT DEFAULT 4,
+  weight_refresh FLOAT DEFAULT 1,
+  active_skill_boost FLOAT DEFAULT 2,
+  active_days INTEGER DEFAULT 14
+)
+RETURNS TABLE (
+  content_id TEXT,
+  version INTEGER,
+  enqueued_at TIMESTAMP WITH TIME ZONE,
+  priority_class TEXT,
+  skill_name TEXT,
+  row_data JSONB
+)
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  vtime FLOAT;
+  active_skills TEXT[];
+  pick RECORD;
+  picked TEXT[] := '{}';
+BEGIN
+  SELECT c.virtual_time INTO vtime FROM embedding_queue_clock c FOR UPDATE;
+  vtime := COALESCE(vtime, 0);
+
+  SELECT COALESCE(array_agg(DISTINCT lower(s.skill)), '{}') INTO active_skills
+  FROM learning_path_steps s
+  WHERE s.skill <> '' AND s.updated_at > NOW() - make_interval(days => active_days);
+
+  FOR i IN 1..batch_size LOOP
+    SELECT f.skill_name, h.content_id, f.finish AS start, h.weight
+    INTO pick
+    FROM embedding_queue_skill_finish f
+    CROSS JOIN LATERAL (
+      SELECT j.content_id, c.weight
+        * CASE WHEN lower(f.skill_name) = ANY(active_skills) THEN active_skill_boost ELSE 1 END AS weight
+      FROM (VALUES ('insert', weight_new), ('missing', weight_missing), ('update', weight_refresh)) AS c(reason, weight)
+      CROSS JOIN LATERAL (
+        SELECT q.content_id, q.enqueued_at
+        FROM embedding_queue q
+        WHERE q.skill_name = f.skill_name AND q.reason = c.reason
+          AND (q.locked_until IS NULL OR q.locked_until < NOW())
+          AND q.attempts < max_attempts
+        ORDER BY q.enqueued_at
+        LIMIT 1
+      ) j
+      ORDER BY c.weight DESC, j.enqueued_at
+      LIMIT 1
+    ) h
+    ORDER BY f.finish + 1.0 / h.weight, f.skill_name
+    LIMIT 1;
+    EXIT WHEN NOT FOUND;
+
+    UPDATE embedding_queue q
+    SET locked_until = NOW() + make_interval(secs => lease_seconds),
+        attempts = q.attempts + 1
+    WHERE q.content_id = pick.content_id;
+
+    UPDATE embedding_queue_skill_finish f
+    SET finish = pick.start + 1.0 / pick.weight
+    WHERE f.skill_name = pick.skill_name;
+    vtime := GREATEST(vtime, pick.start);
+    picked := picked || pick.content_id;
+  END LOOP;
+
+  UPDATE embedding_queue_clock c SET virtual_time = vtime;
+
+  -- Idle skills rejoin at the virtual time; drop those with nothing queued
+  DELETE FROM embedding_queue_skill_finish f
+  WHERE f.finish <= vtime
+    AND NOT EXISTS (SELECT 1 FROM embedding_queue q WHERE q.skill_name = f.skill_name);
+  UPDATE embedding_queue_skill_finish f
+  SET finish = vtime
+  WHERE f.finish < vtime
+    AND NOT EXISTS (
+      SELECT 1 FROM embedding_queue q
+      WHERE q.skill_name = f.skill_name
+        AND (q.locked_until IS NULL OR q.locked_until < NOW())
+        AND q.attempts < max_attempts
+    );
+
+  RETURN QUERY
+  SELECT
+    q.content_id,
+    q.version,
+    q.enqueued_at,
+    CASE q.reason WHEN 'insert' THEN 'new' WHEN 'missing' THEN 'missing' ELSE 'refresh' END,
+    q.skill_name,
+    to_jsonb(lc) - 'embedding'
+  FROM unnest(picked) WITH ORDINALITY AS p(content_id, n)
+  JOIN embedding_queue q ON q.content_id = p.content_id
+  LEFT JOIN learning_content lc ON lc.id::text = q.content_id
+  ORDER BY p.n;
+END;
+$$;
+
+-- Queue depth and lag per priority class for the worker's /metrics endpoint
+CREATE OR REPLACE FUNCTION embedding_queue_class_stats(max_attempts INTEGER DEFAULT 5)
+RETURNS TABLE (priority_class TEXT, depth BIGINT, ready BIGINT, skills BIGINT, oldest_enqueued_at TIMESTAMP WITH TIME ZONE)
+LANGUAGE sql STABLE
+AS $$
+  SELECT
+    CASE q.reason WHEN 'insert' THEN 'new' WHEN 'missing' THEN 'missing' ELSE 'refresh' END AS priority_class,
+    COUNT(*),
+    COUNT(*) FILTER (WHERE q.locked_until IS NULL OR q.locked_until < NOW()),
+    COUNT(DISTINCT q.skill_name),
+    MIN(q.enqueued_at)
+  FROM embedding_queue q
+  WHERE q.attempts < max_attempts
+  GROUP BY 1;
+$$;
+
+REVOKE EXECUTE ON FUNCTION claim_embedding_jobs(INTEGER, INTEGER, INTEGER, FLOAT, FLOAT, FLOAT, FLOAT, INTEGER) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION embedding_queue_class_stats(INTEGER) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION claim_embedding_jobs(INTEGER, INTEGER, INTEGER, FLOAT, FLOAT, FLOAT, FLOAT, INTEGER) TO service_role;
+GRANT EXECUTE ON FUNCTION embedding_queue_class_stats(INTEGER) TO service_role;
@@ -0,0 +1,50 @@
+-- Bounded-size context chunks of learning_content for grading retrieval
+-- Written by index_context_chunks.py; queried through match_documents (lib/embeddings.ts)
+CREATE EXTENSION IF NOT EXISTS vector;
+
+CREATE TABLE IF NOT EXISTS context_chunks (
+  -- "<content_id>:<kind>:<chunk_index>"
+  id TEXT PRIMARY KEY,
+  content_id TEXT NOT NULL,
+  kind TEXT NOT NULL CHECK (kind IN ('description', 'code', 'output')),
+  chunk_index INTEGER NOT NULL,
+  content TEXT NOT NULL,
+  token_estimate INTEGER,
+  content_hash TEXT NOT NULL,
+  -- Parent row hierarchy (skill_name, module_name, topic_name, subtopic_name, kind)
+  metadata JSONB NOT NULL DEFAULT '{}',
+  embedding vector(1536),
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_context_chunks_content_id ON context_chunks(content_id);
+CREATE INDEX IF NOT EXISTS idx_context_chunks_embedding
+  ON context_chunks USING hnsw (embedding vector_cosine_ops);
+
+-- Top-K chunks by cosine similarity, optionally filtered by metadata containment
+CREATE OR REPLACE FUNCTION match_documents(
+  query_embedding vector(1536),
+  match_count INTEGER DEFAULT 3,
+  filter JSONB DEFAULT '{}'
+)
+RETURNS TABLE (id TEXT, content TEXT, metadata JSONB, similarity FLOAT)
+LANGUAGE sql STABLE
+AS $$
+  SELECT
+    c.id,
+    c.content,
+    c.metadata,
+    1 - (c.embedding <=> query_embedding) AS similarity
+  FROM context_chunks c
+  WHERE c.embedding IS NOT NULL
+    AND c.metadata @> filter
+  ORDER BY c.embedding <=> query_embedding
+  LIMIT match_count;
+$$;
+
+-- Enable Row Level Security
+ALTER TABLE context_chunks ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Anyone can read context chunks"
+  ON context_chunks FOR SELECT
+  USING (true);
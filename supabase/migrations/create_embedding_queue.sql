@@ -0,0 +1,140 @@
+-- Work queue for embedding_worker.py: every learning_content row that is
+-- inserted or updated without an embedding is queued and announced with
+-- NOTIFY embedding_queue, so the worker never scans learning_content itself
+CREATE TABLE IF NOT EXISTS embedding_queue (
+  content_id TEXT PRIMARY KEY,
+  -- Bumped whenever the row changes again; stale results are discarded
+  version INTEGER NOT NULL DEFAULT 1,
+  enqueued_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  attempts INTEGER NOT NULL DEFAULT 0,
+  locked_until TIMESTAMP WITH TIME ZONE,
+  last_error TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_embedding_queue_ready
+  ON embedding_queue(locked_until, enqueued_at);
+
+-- Service role only (RLS on, no policies)
+ALTER TABLE embedding_queue ENABLE ROW LEVEL SECURITY;
+
+-- Enqueue on INSERT/UPDATE whenever the embedding is missing
+CREATE OR REPLACE FUNCTION enqueue_embedding()
+RETURNS TRIGGER AS $$
+BEGIN
+  IF NEW.embedding IS NULL THEN
+    INSERT INTO embedding_queue (content_id)
+    VALUES (NEW.id::text)
+    ON CONFLICT (content_id) DO UPDATE
+      SET version = embedding_queue.version + 1,
+          attempts = 0,
+          locked_until = NULL,
+          last_error = NULL;
+    PERFORM pg_notify('embedding_queue', NEW.id::text);
+  END IF;
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_learning_content_enqueue_embedding ON learning_content;
+CREATE TRIGGER trg_learning_content_enqueue_embedding
+  AFTER INSERT OR UPDATE ON learning_content
+  FOR EACH ROW EXECUTE FUNCTION enqueue_embedding();
+
+-- Backfill rows that are already missing an embedding
+INSERT INTO embedding_queue (content_id)
+SELECT id::text FROM learning_content WHERE embedding IS NULL
+ON CONFLICT (content_id) DO NOTHING;
+
+-- Lease up to batch_size ready jobs (oldest first) and return their rows.
+-- row_data is NULL when the content row has been deleted since it was queued.
+CREATE OR REPLACE FUNCTION claim_embedding_jobs(
+  batch_size INTEGER DEFAULT 64,
+  lease_seconds INTEGER DEFAULT 120,
+  max_attempts INTEGER DEFAULT 5
+)
+RETURNS TABLE (content_id TEXT, version INTEGER, enqueued_at TIMESTAMP WITH TIME ZONE, row_data JSONB)
+LANGUAGE sql
+AS $$
+  WITH picked AS (
+    SELECT q.content_id
+    FROM embedding_queue q
+    WHERE (q.locked_until IS NULL OR q.locked_until < NOW())
+      AND q.attempts < max_attempts
+    ORDER BY q.enqueued_at
+    LIMIT batch_size
+    FOR UPDATE SKIP LOCKED
+  ),
+  claimed AS (
+    UPDATE embedding_queue q
+    SET locked_until = NOW() + make_interval(secs => lease_seconds),
+        attempts = q.attempts + 1
+    FROM picked
+    WHERE q.content_id = picked.content_id
+    RETURNING q.content_id, q.version, q.enqueued_at
+  )
+  SELECT c.content_id, c.version, c.enqueued_at, to_jsonb(lc) - 'embedding'
+  FROM claimed c
+  LEFT JOIN learning_content lc ON lc.id::text = c.content_id;
+$$;
+
+-- Write embeddings for jobs whose version is unchanged and drop them from the
+-- queue. results: [{"content_id", "version", "embedding": "[...]" | null}]
+CREATE OR REPLACE FUNCTION complete_embedding_jobs(results JSONB)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  written INTEGER;
+BEGIN
+  WITH r AS (
+    SELECT x.content_id, x.version, x.embedding
+    FROM jsonb_to_recordset(results) AS x(content_id TEXT, version INTEGER, embedding TEXT)
+  ),
+  done AS (
+    DELETE FROM embedding_queue q
+    USING r
+    WHERE q.content_id = r.content_id AND q.version = r.version
+    RETURNING r.content_id, r.embedding
+  )
+  UPDATE learning_content lc
+  SET embedding = done.embedding::vector
+  FROM done
+  WHERE lc.id::text = done.content_id AND done.embedding IS NOT NULL;
+  GET DIAGNOSTICS written = ROW_COUNT;
+  RETURN written;
+END;
+$$;
+
+-- Release failed jobs with a linear backoff
+CREATE OR REPLACE FUNCTION fail_embedding_jobs(content_ids TEXT[], error_message TEXT)
+RETURNS VOID
+LANGUAGE sql
+AS $$
+  UPDATE embedding_queue
+  SET last_error = error_message,
+      locked_until = NOW() + make_interval(secs => 30 * attempts)
+  WHERE content_id = ANY(content_ids);
+$$;
+
+-- Queue depth and lag for the worker's /metrics endpoint
+CREATE OR REPLACE FUNCTION embedding_queue_stats(max_attempts INTEGER DEFAULT 5)
+RETURNS TABLE (depth BIGINT, ready BIGINT, dead BIGINT, oldest_enqueued_at TIMESTAMP WITH TIME ZONE)
+LANGUAGE sql STABLE
+AS $$
+  SELECT
+    COUNT(*),
+    COUNT(*) FILTER (WHERE (locked_until IS NULL OR locked_until < NOW()) AND attempts < max_attempts),
+    COUNT(*) FILTER (WHERE attempts >= max_attempts),
+    MIN(enqueued_at) FILTER (WHERE attempts < max_attempts)
+  FROM embedding_queue;
+$$;
+
+-- Queue functions are for the worker (service role) only
+REVOKE EXECUTE ON FUNCTION claim_embedding_jobs(INTEGER, INTEGER, INTEGER) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION complete_embedding_jobs(JSONB) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION fail_embedding_jobs(TEXT[], TEXT) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION embedding_queue_stats(INTEGER) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION claim_embedding_jobs(INTEGER, INTEGER, INTEGER) TO service_role;
+GRANT EXECUTE ON FUNCTION complete_embedding_jobs(JSONB) TO service_role;
+GRANT EXECUTE ON FUNCTION fail_embedding_jobs(TEXT[], TEXT) TO service_role;
+GRANT EXECUTE ON FUNCTION embedding_queue_stats(INTEGER) TO service_role;
@@ -0,0 +1,206 @@
+-- Versioned embeddings for zero-downtime model migrations (embedding_migration.py).
+-- learning_content.embedding always holds the active model's vectors, so every
+-- reader keeps working; a candidate model is backfilled into
+-- learning_content_embeddings and swapped in by cutover_embedding_model().
+-- Requires create_embedding_queue.sql (rows left without a vector are re-queued)
+-- and add_curriculum_updated_at.sql (the cutover compares learning_content.updated_at).
+CREATE EXTENSION IF NOT EXISTS vector;
+
+CREATE TABLE IF NOT EXISTS embedding_models (
+  model TEXT PRIMARY KEY,
+  dimensions INTEGER NOT NULL,
+  status TEXT NOT NULL DEFAULT 'shadow' CHECK (status IN ('active', 'shadow', 'retired')),
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  activated_at TIMESTAMP WITH TIME ZONE
+);
+
+-- At most one active model
+CREATE UNIQUE INDEX IF NOT EXISTS idx_embedding_models_active
+  ON embedding_models(status) WHERE status = 'active';
+
+INSERT INTO embedding_models (model, dimensions, status, activated_at)
+VALUES ('text-embedding-3-small', 1536, 'active', NOW())
+ON CONFLICT (model) DO NOTHING;
+
+CREATE TABLE IF NOT EXISTS learning_content_embeddings (
+  content_id TEXT NOT NULL,
+  model TEXT NOT NULL REFERENCES embedding_models(model) ON DELETE CASCADE,
+  -- Untyped so models of any dimension share the table
+  embedding vector NOT NULL,
+  -- sha256 of build_embedding_text(row); NULL when unknown (vectors kept at cutover)
+  text_hash TEXT,
+  embedded_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+  PRIMARY KEY (model, content_id)
+);
+
+-- Service role only (RLS on, no policies)
+ALTER TABLE embedding_models ENABLE ROW LEVEL SECURITY;
+ALTER TABLE learning_content_embeddings ENABLE ROW LEVEL SECURITY;
+
+-- How many learning_content rows have a vector for target_model
+CREATE OR REPLACE FUNCTION embedding_model_coverage(target_model TEXT)
+RETURNS TABLE (total BIGINT, covered BIGINT)
+LANGUAGE sql STABLE
+AS $$
+  SELECT COUNT(*), COUNT(e.content_id)
+  FROM learning_content lc
+  LEFT JOIN learning_content_embeddings e
+    ON e.model = target_model AND e.content_id = lc.id::text;
+$$;
+
+-- Swap target_model's vectors into learning_content.embedding in one
+-- transaction. Readers see either every old vector or every new one.
+-- Limitation: a dimension change also retypes the column. ALTER COLUMN TYPE
+-- holds an ACCESS EXCLUSIVE lock on learning_content through the table
+-- rewrite and the rebuild of every index on it. Every search and write waits
+-- until commit, so search stalls for that long. Only a same-dimension
+-- cutover keeps search fully available; schedule a retyping one for a
+-- maintenance window (embedding_migration.py asks for --allow-retype).
+CREATE OR REPLACE FUNCTION cutover_embedding_model(target_model TEXT, min_coverage FLOAT DEFAULT 1.0)
+RETURNS JSONB
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  current_model TEXT;
+  target_dims INTEGER;
+  column_dims INTEGER;
+  n_total BIGINT;
+  n_covered BIGINT;
+  swapped BIGINT;
+BEGIN
+  -- One cutover at a time
+  LOCK TABLE embedding_models IN EXCLUSIVE MODE;
+
+  SELECT model INTO current_model FROM embedding_models WHERE status = 'active';
+  SELECT dimensions INTO target_dims FROM embedding_models WHERE model = target_model;
+  IF target_dims IS NULL THEN
+    RAISE EXCEPTION 'Unknown embedding model %', target_model;
+  END IF;
+  IF current_model = target_model THEN
+    RAISE EXCEPTION 'Embedding model % is already active', target_model;
+  END IF;
+
+  SELECT c.total, c.covered INTO n_total, n_covered FROM embedding_model_coverage(target_model) c;
+  IF n_total > 0 AND n_covered::FLOAT / n_total < min_coverage THEN
+    RAISE EXCEPTION 'Coverage %/% is below %', n_covered, n_total, min_coverage;
+  END IF;
+
+  -- Keep the outgoing vectors so the cutover can be reversed the same way
+  IF current_model IS NOT NULL THEN
+    INSERT INTO learning_content_embeddings (content_id, model, embedding, embedded_at)
+    SELECT id::text, current_model, embedding, NOW()
+    FROM learning_content
+    WHERE embedding IS NOT NULL
+    ON CONFLICT (model, content_id) DO UPDATE
+      SET embedding = EXCLUDED.embedding,
+          text_hash = NULL,
+          embedded_at = EXCLUDED.embedded_at;
+  END IF;
+
+  -- Rows edited after their candidate vector was made: swap now, re-embed after
+  INSERT INTO embedding_queue (content_id)
+  SELECT e.content_id
+  FROM learning_content_embeddings e
+  JOIN learning_content lc ON lc.id::text = e.content_id
+  WHERE e.model = target_model AND lc.updated_at > e.embedded_at
+  ON CONFLICT (content_id) DO UPDATE
+    SET version = embedding_queue.version + 1,
+        attempts = 0,
+        locked_until = NULL;
+
+  SELECT atttypmod INTO column_dims
+  FROM pg_attribute
+  WHERE attrelid = 'learning_content'::regclass AND attname = 'embedding';
+  IF column_dims <> target_dims THEN
+    EXECUTE format('ALTER TABLE learning_content ALTER COLUMN embedding TYPE vector(%s) USING NULL', target_dims);
+  END IF;
+
+  UPDATE learning_content lc
+  SET embedding = e.embedding
+  FROM learning_content_embeddings e
+  WHERE e.model = target_model AND e.content_id = lc.id::text;
+  GET DIAGNOSTICS swapped = ROW_COUNT;
+
+  -- Never mix models: uncovered rows lose their old vector (the trigger queues
+  -- them); complete_embedding_jobs below only accepts the new model's vectors
+  UPDATE learning_content lc
+  SET embedding = NULL
+  WHERE lc.embedding IS NOT NULL
+    AND NOT EXISTS (
+      SELECT 1 FROM learning_content_embeddings e
+      WHERE e.model = target_model AND e.content_id = lc.id::text
+    );
+
+  -- A retype bypasses the trigger, so queue whatever is still empty
+  INSERT INTO embedding_queue (content_id)
+  SELECT id::text FROM learning_content WHERE embedding IS NULL
+  ON CONFLICT (content_id) DO NOTHING;
+
+  UPDATE embedding_models SET status = 'retired' WHERE status = 'active';
+  UPDATE embedding_models SET status = 'active', activated_at = NOW() WHERE model = target_model;
+
+  RETURN jsonb_build_object(
+    'previous', current_model,
+    'active', target_model,
+    'dimensions', target_dims,
+    'swapped', swapped,
+    'total', n_total,
+    'retyped', column_dims <> target_dims
+  );
+END;
+$$;
+
+-- Replaces the create_embedding_queue.sql version. A vector is written only
+-- when its result carries "model" equal to the active model. The FOR SHARE
+-- read waits for a running cutover (LOCK ... EXCLUSIVE) to commit, so no
+-- result can slip in under the old model. Refused jobs are released with their
+-- attempt refunded. The worker re-reads embedding_models and redoes them, so
+-- a worker still on the old model after a cutover never mixes models.
+-- Results with "embedding": null (deleted rows) just drop the job.
+CREATE OR REPLACE FUNCTION complete_embedding_jobs(results JSONB)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  active_model TEXT;
+  written INTEGER;
+BEGIN
+  SELECT model INTO active_model FROM embedding_models WHERE status = 'active' FOR SHARE;
+
+  WITH r AS (
+    SELECT x.content_id, x.version, x.embedding, x.model
+    FROM jsonb_to_recordset(results) AS x(content_id TEXT, version INTEGER, embedding TEXT, model TEXT)
+  ),
+  refused AS (
+    UPDATE embedding_queue q
+    SET locked_until = NULL,
+        attempts = GREATEST(q.attempts - 1, 0),
+        last_error = format('vector from %s refused, active model is %s', COALESCE(r.model, 'an untagged writer'), active_model)
+    FROM r
+    WHERE q.content_id = r.content_id AND q.version = r.version
+      AND r.embedding IS NOT NULL
+      AND active_model IS NOT NULL
+      AND r.model IS DISTINCT FROM active_model
+    RETURNING q.content_id
+  ),
+  done AS (
+    DELETE FROM embedding_queue q
+    USING r
+    WHERE q.content_id = r.content_id AND q.version = r.version
+      AND (r.embedding IS NULL OR active_model IS NULL OR r.model = active_model)
+    RETURNING r.content_id, r.embedding
+  )
+  UPDATE learning_content lc
+  SET embedding = done.embedding::vector
+  FROM done
+  WHERE lc.id::text = done.content_id AND done.embedding IS NOT NULL;
+  GET DIAGNOSTICS written = ROW_COUNT;
+  RETURN written;
+END;
+$$;
+
+-- Migration functions are for the service role only
+REVOKE EXECUTE ON FUNCTION embedding_model_coverage(TEXT) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION cutover_embedding_model(TEXT, FLOAT) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION embedding_model_coverage(TEXT) TO service_role;
+GRANT EXECUTE ON FUNCTION cutover_embedding_model(TEXT, FLOAT) TO service_role;
@@ -0,0 +1,20 @@
+-- Precomputed related-subtopic neighbours for learning_content
+-- Written by build_neighbours.py; one row per content id so lookups are a primary-key read
+CREATE TABLE IF NOT EXISTS learning_content_neighbours (
+  content_id TEXT PRIMARY KEY,
+  -- [{"id": <learning_content.id>, "score": <cosine similarity>}, ...] sorted by score
+  neighbours JSONB NOT NULL,
+  -- Hash of the embeddings the neighbours were computed from
+  fingerprint TEXT NOT NULL,
+  updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_learning_content_neighbours_fingerprint
+  ON learning_content_neighbours(fingerprint);
+
+-- Enable Row Level Security
+ALTER TABLE learning_content_neighbours ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Anyone can read learning content neighbours"
+  ON learning_content_neighbours FOR SELECT
+  USING (true);
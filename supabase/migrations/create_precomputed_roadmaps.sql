@@ -0,0 +1,26 @@
+-- Precomputed candidate roadmaps per job role and level
+-- Written by precompute_roadmaps.py; append-only, one row per content version
+CREATE TABLE IF NOT EXISTS precomputed_roadmaps (
+  id UUID DEFAULT gen_random_uuid() PRIMARY KEY,
+  job_role TEXT NOT NULL,
+  level TEXT NOT NULL CHECK (level IN ('beginner', 'intermediate', 'advanced')),
+  schema_version TEXT NOT NULL DEFAULT '1.0',
+  -- SHA-256 of the roadmap content; identical roadmaps are stored once
+  content_hash TEXT NOT NULL,
+  total_hours NUMERIC,
+  roadmap_data JSONB NOT NULL,
+  created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+
+  UNIQUE(job_role, level, content_hash)
+);
+
+-- Latest version lookup for a role and level
+CREATE INDEX IF NOT EXISTS idx_precomputed_roadmaps_role_level
+  ON precomputed_roadmaps(job_role, level, created_at DESC);
+
+-- Enable Row Level Security
+ALTER TABLE precomputed_roadmaps ENABLE ROW LEVEL SECURITY;
+
+CREATE POLICY "Anyone can read precomputed roadmaps"
+  ON precomputed_roadmaps FOR SELECT
+  USING (true);
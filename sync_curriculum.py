@@ -0,0 +1,299 @@
+"""
+Diff-based, idempotent sync of curriculum content to Supabase.
+
+Re-running a generate_database_content.py batch inserts every row again,
+so fixing one typo means a full re-import and manual duplicate cleanup. This
+tool hashes every source row locally, fetches only (natural key, content_hash)
+for the remote rows in one projected scan, and sends the minimal change:
+
+    insert   key missing remotely
+    update   key present, content_hash differs (embedding reset to NULL)
+    delete   with --delete only: a key this same source synced before and no
+             longer contains (never keys other sources or batches own)
+
+Inserts and updates go out together as bulk upserts on the natural key;
+remote rows that predate content_hash are hashed once from their content so
+an unchanged row only gets its hash backfilled, not re-embedded.
+
+With --embed the changed rows are embedded locally (batched, through a
+persistent cache keyed on the embedding text) and upserted together with
+their vectors, so new content is searchable in one pass instead of waiting
+for generate_embeddings.py to find, re-download and PATCH every NULL row.
+
+Every sync records the natural keys it pushed per source in
+artifacts/sync_manifest.json; that record is what --delete is scoped to, so a
+file holding part of a module cannot remove the module's other rows.
+
+Requires supabase/migrations/add_curriculum_natural_key.sql.
+
+Usage:
+    python sync_curriculum.py [SOURCE ...] [--table learning_content] [--embed] [--dry-run] [--delete]
+    (with no SOURCE the curriculum store in artifacts/curriculum is synced)
+"""
+import argparse
+import json
+import os
+from datetime import datetime
+
+import requests
+
+from curriculum_store import (
+    NATURAL_KEY,
+    STORE_PATH,
+    content_hash,
+    load_source,
+    natural_key,
+    normalize_record,
+    read_store,
+    require_pyarrow,
+    to_pg_array,
+    to_table,
+)
+from embedding_cache import QueryEmbeddingCache
+from generate_embeddings import (
+    SUPABASE_HEADERS,
+    SUPABASE_URL,
+    TABLE,
+    build_embedding_text,
+    fetch_all_rows,
+    format_vector,
+    send_json,
+    use_active_embedding_model,
+)
+from sync_local_replica import ARRAY_COLUMNS, TEXT_COLUMNS
+
+# --------------------------------------------------
+# Config
+# --------------------------------------------------
+UPSERT_CHUNK = 500
+DELETE_CHUNK = 200
+EMBEDDED_TABLES = ("learning_content",)  # tables whose embedding must be reset on update
+ON_CONFLICT = ",".join(NATURAL_KEY)
+CONTENT_CACHE_PATH = os.path.join("artifacts", "content_embeddings.sqlite")
+MANIFEST_PATH = os.path.join("artifacts", "sync_manifest.json")
+
+# --------------------------------------------------
+# Diff
+# --------------------------------------------------
+def local_rows(table):
+    """{natural_key: (row, content_hash)} for a store table."""
+    return {natural_key(row): (row, content_hash(row)) for row in table.to_pylist()}
+
+def remote_index(table, keys):
+    """
+    {natural_key: [(id, stored_hash, content_hash)]} for remote rows whose key is in keys.
+
+    Only the key columns and content_hash are selected. Rows without a stored
+    hash (imported before the migration) are hashed from their full content
+    in a second pass filtered to content_hash=is.null.
+    """
+    index = {}
+    select = ",".join(("id",) + NATURAL_KEY + ("content_hash",))
+    for row in fetch_all_rows(select=select, table=table):
+        key = natural_key(row)
+        if key in keys:
+            index.setdefault(key, []).append((row["id"], row.get("content_hash")))
+
+    backfill = {}
+    if any(h is None for entries in index.values() for _, h in entries):
+        select = ",".join(("id",) + TEXT_COLUMNS + ARRAY_COLUMNS + ("estimated_hours",))
+        for row in fetch_all_rows(select=select, table=table, filters={"content_hash": "is.null"}):
+            backfill[row["id"]] = content_hash(normalize_record(row))
+    return {
+        key: [(i, h, h if h is not None else backfill.get(i)) for i, h in entries]
+        for key, entries in index.items()
+    }
+
+def diff_rows(local, remote, deletable=frozenset()):
+    """
+    Minimal change set between local {key: (row, hash)} and remote_index().
+
+    Returns (inserts, updates, rehash, delete_ids). rehash holds unchanged
+    rows whose content_hash only needs to be written. Remote keys missing
+    locally are deleted only if they are in deletable.
+    """
+    inserts, updates, rehash, delete_ids = [], [], [], []
+    for key, (row, digest) in local.items():
+        entries = remote.get(key)
+        if not entries:
+            inserts.append((row, digest))
+            continue
+        # Extra copies of one key (from old re-imports) are removed
+        delete_ids.extend(i for i, _, _ in entries[1:])
+        _, stored, current = entries[0]
+        if current != digest:
+            updates.append((row, digest))
+        elif stored is None:
+            rehash.append({**dict(zip(NATURAL_KEY, key)), "content_hash": digest})
+    for key, entries in remote.items():
+        if key not in local and key in deletable:
+            delete_ids.extend(i for i, _, _ in entries)
+    return inserts, updates, rehash, delete_ids
+
+# --------------------------------------------------
+# Writes
+# --------------------------------------------------
+def embed_rows(rows, cache):
+    """Embedding for each row's build_embedding_text, in order; repeats hit the cache."""
+    if not rows:
+        return []
+    return [format_vector(vector) for vector in cache.embed_many([build_embedding_text(row) for row in rows])]
+
+def to_payload(row, digest, embedded, embedding=None):
+    """Importer row; on embedded tables the vector (or NULL, to force re-embedding) is included."""
+    payload = {**row, "content_hash": digest}
+    for c in ARRAY_COLUMNS:
+        payload[c] = to_pg_array(row[c])
+    if embedded:
+        payload["embedding"] = embedding
+    return payload
+
+def upsert_rows(table, payloads):
+    """Bulk upsert on the natural key; PostgREST needs the same keys in every object."""
+    headers = {**SUPABASE_HEADERS, "Prefer": "resolution=merge-duplicates,return=minimal"}
+    for i in range(0, len(payloads), UPSERT_CHUNK):
+        resp = send_json(
+            "POST",
+            f"{SUPABASE_URL}/rest/v1/{table}?on_conflict={ON_CONFLICT}",
+            payloads[i:i + UPSERT_CHUNK],
+            headers
+        )
+        resp.raise_for_status()
+
+def delete_rows(table, ids):
+    for i in range(0, len(ids), DELETE_CHUNK):
+        chunk = ",".join(str(row_id) for row_id in ids[i:i + DELETE_CHUNK])
+        resp = requests.delete(
+            f"{SUPABASE_URL}/rest/v1/{table}?id=in.({chunk})",
+            headers=SUPABASE_HEADERS
+        )
+        resp.raise_for_status()
+
+def load_manifest(path=MANIFEST_PATH):
+    """{source label: set of natural keys it synced last time}."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return {label: {tuple(key) for key in keys} for label, keys in json.load(f).items()}
+
+def save_manifest(manifest, path=MANIFEST_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({label: sorted(keys, key=json.dumps) for label, keys in manifest.items()}, f, indent=1)
+
+def source_label(table, sources=(), store=STORE_PATH, skill=None, module=None):
+    """Manifest entry for one sync invocation: target table plus what was read."""
+    if sources:
+        return f"{table}:" + "|".join(sorted(os.path.normpath(s) for s in sources))
+    return f"{table}:store:{os.path.normpath(store)}:{skill or '*'}:{module or '*'}"
+
+def sync(store_table, table=TABLE, deletable=frozenset(), dry_run=False, cache=None):
+    """
+    Diff a store table against `table` and apply the change set. Returns counts.
+
+    deletable holds the natural keys the caller allows to be deleted when
+    they are gone from the store table (the keys this source synced before);
+    nothing else is ever deleted except extra copies of a local key.
+
+    With a cache (a QueryEmbeddingCache) the inserted and updated rows are
+    embedded before the upsert and carry their vectors.
+    """
+    local = local_rows(store_table)
+    remote = remote_index(table, set(local) | set(deletable))
+    inserts, updates, rehash, delete_ids = diff_rows(local, remote, deletable)
+
+    counts = {
+        "local": len(local),
+        "remote": sum(len(v) for v in remote.values()),
+        "inserts": len(inserts),
+        "updates": len(updates),
+        "deletes": len(delete_ids),
+        "hash_backfill": len(rehash),
+    }
+    if dry_run:
+        return counts
+
+    changed = inserts + updates
+    embedded = table in EMBEDDED_TABLES
+    if embedded and cache is not None:
+        embeddings = embed_rows([row for row, _ in changed], cache)
+        counts["embedded"] = len(embeddings)
+    else:
+        embeddings = [None] * len(changed)
+    # Inserts and updates share one upsert stream; both carry the same keys
+    upsert_rows(table, [
+        to_payload(row, digest, embedded, embedding)
+        for (row, digest), embedding in zip(changed, embeddings)
+    ])
+    upsert_rows(table, rehash)
+    delete_rows(table, delete_ids)
+    counts["keys"] = set(local)
+    return counts
+
+# --------------------------------------------------
+# Main
+# --------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Diff-based idempotent curriculum sync")
+    parser.add_argument("sources", nargs="*", help="source files (default: the curriculum store)")
+    parser.add_argument("--store", default=STORE_PATH)
+    parser.add_argument("--skill")
+    parser.add_argument("--module")
+    parser.add_argument("--table", default=TABLE)
+    parser.add_argument("--embed", action="store_true", help="embed changed rows and upsert them with their vectors")
+    parser.add_argument("--cache-path", default=CONTENT_CACHE_PATH)
+    parser.add_argument(
+        "--delete", action="store_true",
+        help="the sources are complete: delete keys they synced before and no longer contain"
+    )
+    parser.add_argument("--manifest", default=MANIFEST_PATH)
+    parser.add_argument("--dry-run", action="store_true", help="print the change set only")
+    args = parser.parse_args()
+
+    require_pyarrow()
+    print("=" * 70)
+    print("🔁 CURRICULUM SYNC")
+    print("=" * 70)
+
+    start = datetime.now()
+    if args.sources:
+        records = []
+        for source in args.sources:
+            records.extend(load_source(source)[0])
+        store_table = to_table(records)
+    else:
+        store_table = read_store(args.store, skill_name=args.skill, module_name=args.module)
+
+    manifest = load_manifest(args.manifest)
+    label = source_label(args.table, args.sources, args.store, args.skill, args.module)
+    if args.delete and label not in manifest:
+        print(f"ℹ️  No earlier sync of {label} in {args.manifest}; nothing can be deleted this run")
+    deletable = manifest.get(label, set()) if args.delete else frozenset()
+
+    cache = None
+    if args.embed:
+        # Vectors (and their cache entries) must come from the model search is serving
+        model, dimensions = use_active_embedding_model()
+        cache = QueryEmbeddingCache(args.cache_path, ttl_seconds=None, model=model, dimensions=dimensions)
+    counts = sync(store_table, args.table, deletable=deletable, dry_run=args.dry_run, cache=cache)
+    if not args.dry_run:
+        # Deleted keys drop out; keys kept without --delete stay deletable later
+        kept = manifest.get(label, set()) - set(deletable)
+        manifest[label] = counts["keys"] | kept
+        save_manifest(manifest, args.manifest)
+    print(f"📊 {counts['local']} local rows vs {counts['remote']} remote rows in scope")
+    print(f"   ➕ {counts['inserts']} inserts  ✏️  {counts['updates']} updates  🗑️  {counts['deletes']} deletes")
+    if counts["hash_backfill"]:
+        print(f"   #️⃣  {counts['hash_backfill']} unchanged rows get their content_hash backfilled")
+    if args.dry_run:
+        print("🧪 Dry run, nothing written")
+    elif counts.get("embedded"):
+        print(f"🧠 {counts['embedded']} rows upserted with their embeddings ({cache.stats()['hit_rate']:.0%} cache hits)")
+    elif counts["updates"] and args.table in EMBEDDED_TABLES:
+        print("🧠 Updated rows have embedding = NULL; run generate_embeddings.py to re-embed them")
+
+    secs = (datetime.now() - start).total_seconds()
+    print(f"⏱ Total time: {secs:.1f} seconds")
+
+if __name__ == "__main__":
+    main()
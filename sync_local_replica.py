@@ -0,0 +1,218 @@
+"""
+Local SQLite read-replica of the curriculum tables with delta sync.
+
+Analysis and batch jobs read learning_content (and python_curriculum) over
+PostgREST even though the data rarely changes. This tool mirrors both tables
+into a local SQLite file: the first run is a bulk load, later runs pull only
+rows whose updated_at is past the stored high-water mark minus a safety
+window (updated_at is the writing transaction's start time, so a row can
+commit after a sync with a timestamp older than that sync), and --reconcile
+removes rows that were deleted upstream. The hierarchy columns are indexed so
+local queries run at disk speed (DuckDB can also ATTACH the file directly).
+
+Requires the updated_at columns from supabase/migrations/add_curriculum_updated_at.sql.
+
+Usage:
+    python sync_local_replica.py [--path artifacts/curriculum.sqlite] [--reconcile] [--full] [--overlap 600]
+"""
+import argparse
+import json
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from generate_embeddings import fetch_all_rows, parse_array, parse_vector
+from retrieval import normalize_rows
+
+# --------------------------------------------------
+# Config
+# --------------------------------------------------
+REPLICA_PATH = os.path.join("artifacts", "curriculum.sqlite")
+SYNC_TABLES = ("learning_content", "python_curriculum")
+WRITE_BATCH = 1000
+# Re-pull window below the high-water mark. Must exceed the longest write
+# transaction on the curriculum tables; re-pulled rows are upserted idempotently.
+SYNC_OVERLAP_SECONDS = 600
+TEXT_COLUMNS = (
+    "skill_name", "module_name", "topic_name", "subtopic_name",
+    "description", "example_code", "example_output",
+)
+ARRAY_COLUMNS = ("youtube_links", "tags", "prerequisites")
+
+# --------------------------------------------------
+# Schema
+# --------------------------------------------------
+def connect_replica(path=REPLICA_PATH):
+    """Open (and if needed create) the replica; rows come back as sqlite3.Row."""
+    if path != ":memory:":
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS sync_state (
+            table_name TEXT PRIMARY KEY,
+            high_water_mark TEXT,
+            last_sync TEXT,
+            row_count INTEGER
+        )
+    """)
+    for table in SYNC_TABLES:
+        columns = ",\n".join(f"{c} TEXT" for c in TEXT_COLUMNS + ARRAY_COLUMNS)
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                id TEXT PRIMARY KEY,
+                {columns},
+                estimated_hours REAL,
+                embedding BLOB,
+                updated_at TEXT
+            )
+        """)
+        conn.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_{table}_hierarchy "
+            f"ON {table}(skill_name, module_name, topic_name, subtopic_name)"
+        )
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_topic ON {table}(topic_name)")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_updated_at ON {table}(updated_at)")
+    conn.commit()
+    return conn
+
+# --------------------------------------------------
+# Conversion
+# --------------------------------------------------
+def to_local_row(row):
+    """PostgREST row → replica tuple (arrays as JSON text, vector as float32 blob)."""
+    vector = parse_vector(row.get("embedding"))
+    return (
+        str(row["id"]),
+        *(row.get(c) for c in TEXT_COLUMNS),
+        *(json.dumps(parse_array(row.get(c))) for c in ARRAY_COLUMNS),
+        row.get("estimated_hours"),
+        np.asarray(vector, dtype=np.float32).tobytes() if vector is not None else None,
+        row.get("updated_at"),
+    )
+
+def upsert_local(conn, table, rows):
+    placeholders = ",".join("?" * (len(TEXT_COLUMNS) + len(ARRAY_COLUMNS) + 4))
+    conn.executemany(f"INSERT OR REPLACE INTO {table} VALUES ({placeholders})", rows)
+
+# --------------------------------------------------
+# Sync
+# --------------------------------------------------
+def sync_since(high_water_mark, overlap_seconds=SYNC_OVERLAP_SECONDS):
+    """
+    Lower bound (inclusive) of the next delta pull.
+
+    updated_at is NOW() of the writing transaction, i.e. its start, not its
+    commit. A transaction that started before the last sync and committed
+    after it carries a timestamp at or below the high-water mark, so the pull
+    reaches overlap_seconds further back and keeps rows equal to the mark.
+    """
+    mark = datetime.fromisoformat(high_water_mark.replace("Z", "+00:00"))
+    return (mark - timedelta(seconds=overlap_seconds)).isoformat()
+
+def sync_table(conn, table, full=False, overlap_seconds=SYNC_OVERLAP_SECONDS):
+    """Bulk load on first run (or with full), otherwise pull rows from the high-water mark minus the overlap."""
+    state = conn.execute(
+        "SELECT high_water_mark FROM sync_state WHERE table_name = ?", (table,)
+    ).fetchone()
+    high_water_mark = None if full or state is None else state["high_water_mark"]
+    filters = {"updated_at": f"gte.{sync_since(high_water_mark, overlap_seconds)}"} if high_water_mark else None
+
+    pulled = 0
+    batch = []
+    newest = high_water_mark
+    for row in fetch_all_rows(filters=filters, table=table):
+        batch.append(to_local_row(row))
+        if row.get("updated_at") and (newest is None or row["updated_at"] > newest):
+            newest = row["updated_at"]
+        if len(batch) >= WRITE_BATCH:
+            upsert_local(conn, table, batch)
+            pulled += len(batch)
+            batch = []
+    if batch:
+        upsert_local(conn, table, batch)
+        pulled += len(batch)
+
+    count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    conn.execute(
+        "INSERT OR REPLACE INTO sync_state (table_name, high_water_mark, last_sync, row_count) "
+        "VALUES (?, ?, ?, ?)",
+        (table, newest, datetime.now().isoformat(), count)
+    )
+    conn.commit()
+    return pulled, high_water_mark is None
+
+def reconcile_deletes(conn, table):
+    """Drop local rows whose id no longer exists upstream (one projected id scan)."""
+    remote = {str(row["id"]) for row in fetch_all_rows(select="id", table=table)}
+    local = {r["id"] for r in conn.execute(f"SELECT id FROM {table}")}
+    stale = list(local - remote)
+    conn.executemany(f"DELETE FROM {table} WHERE id = ?", [(i,) for i in stale])
+    conn.commit()
+    return len(stale)
+
+# --------------------------------------------------
+# Readers
+# --------------------------------------------------
+def load_replica_rows(conn, table="learning_content", where="", params=()):
+    """Rows as dicts with array columns decoded, e.g. where="skill_name = ?"."""
+    sql = f"SELECT * FROM {table}" + (f" WHERE {where}" if where else "") + " ORDER BY id"
+    rows = []
+    for r in conn.execute(sql, params):
+        row = dict(r)
+        row.pop("embedding")
+        for c in ARRAY_COLUMNS:
+            row[c] = json.loads(row[c]) if row[c] else []
+        rows.append(row)
+    return rows
+
+def load_replica_matrix(conn, table="learning_content"):
+    """Same contract as retrieval.load_content_matrix, read from the replica."""
+    rows, vectors = [], []
+    for r in conn.execute(
+        f"SELECT id, skill_name, module_name, topic_name, subtopic_name, embedding "
+        f"FROM {table} WHERE embedding IS NOT NULL ORDER BY id"
+    ):
+        row = dict(r)
+        vectors.append(np.frombuffer(row.pop("embedding"), dtype=np.float32))
+        rows.append(row)
+    if not vectors:
+        return rows, np.zeros((0, 0), dtype=np.float32)
+    return rows, normalize_rows(np.stack(vectors))
+
+# --------------------------------------------------
+# Main
+# --------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Mirror curriculum tables into a local SQLite replica")
+    parser.add_argument("--path", default=REPLICA_PATH)
+    parser.add_argument("--tables", default=",".join(SYNC_TABLES))
+    parser.add_argument("--full", action="store_true", help="ignore the high-water mark and reload")
+    parser.add_argument("--reconcile", action="store_true", help="also remove rows deleted upstream")
+    parser.add_argument("--overlap", type=int, default=SYNC_OVERLAP_SECONDS,
+                        help="seconds below the high-water mark to re-pull (late-committing writes)")
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print("🪞 LOCAL CURRICULUM REPLICA")
+    print("=" * 70)
+
+    start = datetime.now()
+    conn = connect_replica(args.path)
+    for table in args.tables.split(","):
+        pulled, bulk = sync_table(conn, table, args.full, args.overlap)
+        print(f"✅ {table}: {pulled} rows {'bulk loaded' if bulk else f'pulled since last sync (incl. {args.overlap}s overlap)'}")
+        if args.reconcile:
+            removed = reconcile_deletes(conn, table)
+            print(f"🧹 {table}: {removed} deleted rows removed")
+    conn.close()
+
+    secs = (datetime.now() - start).total_seconds()
+    print(f"\n💾 Replica → {args.path}")
+    print(f"⏱ Total time: {secs:.1f} seconds")
+
+if __name__ == "__main__":
+    main()
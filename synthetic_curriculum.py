@@ -0,0 +1,341 @@
+"""
+Synthetic curriculum rows for scale tests.
+
+The real content is a few hundred rows, too little to benchmark imports,
+embedding or search at production scale. This learns a profile from real
+rows and streams any number of look-alike rows from it:
+
+    hierarchy     fan-out of modules per skill, topics per module,
+                  subtopics per topic; name lengths and name vocabulary
+    text          length and null rate of description / example_code /
+                  example_output; descriptions are drawn from the corpus
+                  word frequencies, code and output from real lines
+    arrays        cardinality of tags / prerequisites / youtube_links and
+                  the frequency of each tag and prerequisite
+    hours         the empirical estimated_hours values
+
+Natural keys are unique (a name collision inside its parent gets a numeric
+suffix) and the same --seed always produces the same rows. Output streams
+in CSV (array columns as Postgres literals, RFC 4180 quoting, so
+parallel_csv.py can split it), JSONL or Parquet, so memory stays flat at
+any --rows. The rows look real but the example code does not run.
+
+Usage:
+    python synthetic_curriculum.py --rows 1000000 --output artifacts/synthetic.csv [--seed 7] [SOURCE ...]
+    python synthetic_curriculum.py --rows 5000000 --output artifacts/synthetic.parquet --save-profile artifacts/profile.json
+    python synthetic_curriculum.py --profile artifacts/profile.json --rows 100000 --output artifacts/synthetic.jsonl
+    (with no SOURCE the profile is learned from the curriculum store)
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import string
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+
+from curriculum_store import (
+    STORE_PATH,
+    curriculum_schema,
+    dedupe_table,
+    load_table,
+    read_store,
+    require_pyarrow,
+    to_pg_array,
+)
+from sync_local_replica import ARRAY_COLUMNS, TEXT_COLUMNS
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# --------------------------------------------------
+# Config
+# --------------------------------------------------
+SEED = 7
+ROWS = 100_000
+MAX_SAMPLES = 10_000        # per learned distribution, so profiles stay small
+LENGTH_JITTER = 0.15        # ± relative noise on sampled text lengths
+PARQUET_BATCH = 50_000
+NAME_LEVELS = ("skill_name", "module_name", "topic_name", "subtopic_name")
+BODY_COLUMNS = ("description", "example_code", "example_output")
+VALUE_ARRAYS = ("tags", "prerequisites")
+YOUTUBE_ID_CHARS = np.array(list(string.ascii_letters + string.digits + "-_"))
+
+_WORD = re.compile(r"\S+")
+
+# --------------------------------------------------
+# Learning
+# --------------------------------------------------
+def _sample(values, rng, limit=MAX_SAMPLES):
+    values = list(values)
+    if len(values) <= limit:
+        return values
+    return [values[i] for i in rng.choice(len(values), limit, replace=False)]
+
+def _frequencies(counter, limit=MAX_SAMPLES):
+    common = counter.most_common(limit)
+    return {"values": [v for v, _ in common], "counts": [n for _, n in common]}
+
+def learn_profile(rows, seed=SEED):
+    """Distributions of a list of store rows, as a JSON-serialisable dict."""
+    rng = np.random.default_rng(seed)
+
+    # Fan-out: distinct children per distinct parent, per level
+    fanout = {}
+    for depth, level in enumerate(NAME_LEVELS[1:], start=1):
+        paths = {tuple(r[c] for c in NAME_LEVELS[:depth + 1]) for r in rows}
+        fanout[level] = sorted(Counter(p[:depth] for p in paths).values())
+
+    names = {}
+    for level in NAME_LEVELS:
+        distinct = {r[level] for r in rows if r[level]}
+        words = Counter(w for name in distinct for w in name.split())
+        names[level] = {
+            "word_counts": [len(name.split()) for name in distinct],
+            **_frequencies(words),
+        }
+
+    text = {}
+    for column in BODY_COLUMNS:
+        values = [r[column] for r in rows]
+        present = [v for v in values if v]
+        text[column] = {
+            "null_rate": 1 - len(present) / max(1, len(values)),
+            "lengths": _sample((len(v) for v in present), rng),
+        }
+
+    description_words = Counter(w for r in rows if r["description"] for w in _WORD.findall(r["description"]))
+    lines = {
+        column: _sample((line for r in rows if r[column] for line in r[column].split("\n")), rng)
+        for column in ("example_code", "example_output")
+    }
+
+    arrays = {}
+    for column in ARRAY_COLUMNS:
+        items = [r[column] or [] for r in rows]
+        arrays[column] = {
+            "cardinality": _sample((len(v) for v in items), rng),
+            **(_frequencies(Counter(v for values in items for v in values)) if column in VALUE_ARRAYS else {}),
+        }
+
+    return {
+        "source_rows": len(rows),
+        "seed": seed,
+        "fanout": fanout,
+        "names": names,
+        "text": text,
+        "description_words": _frequencies(description_words),
+        "lines": lines,
+        "arrays": arrays,
+        "hours": _sample((r["estimated_hours"] for r in rows if r["estimated_hours"] is not None), rng),
+    }
+
+# --------------------------------------------------
+# Generation
+# --------------------------------------------------
+class CurriculumSynthesizer:
+    """Streams rows drawn from a learned profile; same seed → same rows."""
+
+    def __init__(self, profile, seed=SEED):
+        self.profile = profile
+        self.rng = np.random.default_rng(seed)
+        self.vocab = {}
+        for key, freq in [(f"name:{lvl}", profile["names"][lvl]) for lvl in NAME_LEVELS] + [
+            ("description", profile["description_words"]),
+            *[(f"array:{c}", profile["arrays"][c]) for c in VALUE_ARRAYS],
+        ]:
+            # Cumulative weights once, so each draw is a binary search
+            cdf = np.cumsum(np.asarray(freq["counts"] or [1], dtype=np.float64))
+            self.vocab[key] = (np.asarray(freq["values"] or ["lorem"], dtype=object), cdf / cdf[-1])
+        values, cdf = self.vocab["description"]
+        # Average word plus its space, to size each description's word draw
+        self.word_length = max(2.0, float(np.dot([len(v) for v in values], np.diff(cdf, prepend=0))) + 1)
+        self.lines = {}
+        for column, pool in profile["lines"].items():
+            pool = np.asarray(pool or [""], dtype=object)
+            sizes = np.fromiter((len(line) + 1 for line in pool), dtype=np.int64, count=len(pool))
+            self.lines[column] = (pool, sizes, float(sizes.mean()))
+
+    def _choice(self, values):
+        return values[self.rng.integers(len(values))]
+
+    def _words(self, key, n):
+        values, cdf = self.vocab[key]
+        return values[np.minimum(np.searchsorted(cdf, self.rng.random(n), side="right"), len(values) - 1)]
+
+    def _name(self, level, taken):
+        n = max(1, int(self._choice(self.profile["names"][level]["word_counts"] or [3])))
+        name = " ".join(self._words(f"name:{level}", n))
+        base, k = name, 2
+        while name in taken:
+            name, k = f"{base} {k}", k + 1
+        taken.add(name)
+        return name
+
+    def _length(self, column):
+        spec = self.profile["text"][column]
+        if not spec["lengths"] or self.rng.random() < spec["null_rate"]:
+            return 0
+        return max(1, int(self._choice(spec["lengths"]) * (1 + self.rng.uniform(-LENGTH_JITTER, LENGTH_JITTER))))
+
+    def _description(self):
+        length = self._length("description")
+        if not length:
+            return None
+        # Overshoot the word count, then trim back to length at a word boundary
+        text = " ".join(self._words("description", int(length / self.word_length) + 8))
+        return text[:length].rsplit(" ", 1)[0] if len(text) > length else text
+
+    def _lines(self, column):
+        length = self._length(column)
+        if not length:
+            return None
+        pool, sizes, mean = self.lines[column]
+        # Draw enough lines in one go, keep the prefix that reaches length
+        picks = self.rng.integers(len(pool), size=int(length / mean) + 8)
+        while sizes[picks].sum() < length:
+            picks = np.concatenate([picks, self.rng.integers(len(pool), size=len(picks))])
+        n = int(np.searchsorted(np.cumsum(sizes[picks]), length)) + 1
+        return "\n".join(pool[picks[:n]])
+
+    def _array(self, column):
+        spec = self.profile["arrays"][column]
+        n = int(self._choice(spec["cardinality"] or [0]))
+        if n == 0:
+            return []
+        if column == "youtube_links":
+            return [
+                "https://www.youtube.com/watch?v=" + "".join(YOUTUBE_ID_CHARS[self.rng.integers(len(YOUTUBE_ID_CHARS), size=11)])
+                for _ in range(n)
+            ]
+        # Weighted draw with replacement, duplicates dropped: close to the
+        # learned cardinality and far cheaper than choice(replace=False, p=...)
+        return [str(v) for v in dict.fromkeys(self._words(f"array:{column}", n))]
+
+    def _fanout(self, level):
+        return max(1, int(self._choice(self.profile["fanout"][level] or [1])))
+
+    def rows(self, n):
+        """Yield n rows, skill by skill, in hierarchy order."""
+        produced = 0
+        skills = set()
+        hours = self.profile["hours"] or [1.0]
+        while produced < n:
+            skill = self._name("skill_name", skills)
+            modules = set()
+            for _ in range(self._fanout("module_name")):
+                module = self._name("module_name", modules)
+                topics = set()
+                for _ in range(self._fanout("topic_name")):
+                    topic = self._name("topic_name", topics)
+                    subtopics = set()
+                    for _ in range(self._fanout("subtopic_name")):
+                        yield {
+                            "skill_name": skill,
+                            "module_name": module,
+                            "topic_name": topic,
+                            "subtopic_name": self._name("subtopic_name", subtopics),
+                            "description": self._description(),
+                            "example_code": self._lines("example_code"),
+                            "example_output": self._lines("example_output"),
+                            **{c: self._array(c) for c in ARRAY_COLUMNS},
+                            "estimated_hours": float(self._choice(hours)),
+                        }
+                        produced += 1
+                        if produced >= n:
+                            return
+
+# --------------------------------------------------
+# Writers
+# --------------------------------------------------
+COLUMNS = TEXT_COLUMNS + ARRAY_COLUMNS + ("estimated_hours",)
+
+def write_csv(rows, path):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for row in rows:
+            writer.writerow([
+                to_pg_array(row[c]) if c in ARRAY_COLUMNS else row[c]
+                for c in COLUMNS
+            ])
+
+def write_jsonl(rows, path):
+    with open(path, "w", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+def write_parquet(rows, path, batch=PARQUET_BATCH):
+    require_pyarrow()
+    schema = curriculum_schema()
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) == batch:
+                writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+                chunk = []
+        if chunk:
+            writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+
+WRITERS = {"csv": write_csv, "jsonl": write_jsonl, "parquet": write_parquet}
+
+# --------------------------------------------------
+# Main
+# --------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Stream synthetic curriculum rows learned from real content")
+    parser.add_argument("sources", nargs="*", help="source files to learn from (default: the curriculum store)")
+    parser.add_argument("--store", default=STORE_PATH)
+    parser.add_argument("--profile", help="load a saved profile instead of learning one")
+    parser.add_argument("--save-profile", help="write the learned profile here")
+    parser.add_argument("--rows", type=int, default=ROWS)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--output", required=True, help=".csv, .jsonl or .parquet")
+    parser.add_argument("--format", choices=sorted(WRITERS), help="default: from the output extension")
+    args = parser.parse_args()
+
+    fmt = args.format or os.path.splitext(args.output)[1].lstrip(".")
+    if fmt not in WRITERS:
+        parser.error(f"unknown output format {fmt!r}; use --format")
+
+    print("=" * 70)
+    print("🧬 SYNTHETIC CURRICULUM")
+    print("=" * 70)
+    start = datetime.now()
+
+    if args.profile:
+        with open(args.profile, encoding="utf-8") as f:
+            profile = json.load(f)
+        print(f"📐 Profile loaded from {args.profile} ({profile['source_rows']} source rows)")
+    else:
+        require_pyarrow()
+        if args.sources:
+            table = dedupe_table(pa.concat_tables([load_table(s)[0] for s in args.sources]))
+        else:
+            table = read_store(args.store)
+        profile = learn_profile(table.to_pylist(), args.seed)
+        print(f"📐 Profile learned from {profile['source_rows']} rows")
+        if args.save_profile:
+            os.makedirs(os.path.dirname(args.save_profile) or ".", exist_ok=True)
+            with open(args.save_profile, "w", encoding="utf-8") as f:
+                json.dump(profile, f)
+            print(f"💾 Profile → {args.save_profile}")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    synthesizer = CurriculumSynthesizer(profile, args.seed)
+    WRITERS[fmt](synthesizer.rows(args.rows), args.output)
+
+    secs = (datetime.now() - start).total_seconds()
+    size_mb = os.path.getsize(args.output) / 1e6
+    print(f"✅ {args.rows:,} rows ({size_mb:.1f} MB {fmt}) → {args.output}")
+    print(f"⏱ Total time: {secs:.1f} seconds ({args.rows / max(secs, 1e-9):,.0f} rows/s)")
+
+if __name__ == "__main__":
+    main()
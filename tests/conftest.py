@@ -0,0 +1,18 @@
+"""
+Shared setup for the Python tests.
+
+The scripts live at the repo root and read their credentials at import time,
+so the root goes on sys.path and placeholder values are set for any that are
+missing. No test calls Supabase or OpenAI.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+for name, value in (
+    ("SUPABASE_URL", "http://localhost:54321"),
+    ("SUPABASE_SERVICE_ROLE_KEY", "test"),
+    ("OPENAI_API_KEY", "test"),
+):
+    os.environ.setdefault(name, value)
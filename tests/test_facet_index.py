@@ -0,0 +1,108 @@
+"""Bitset algebra and FacetIndex filters in facet_index.py, checked against Python sets."""
+import random
+
+import numpy as np
+import pytest
+
+from facet_index import Bitset, FacetIndex
+
+
+def forms(size, members):
+    """The same set as a sparse, a dense and a compacted Bitset."""
+    ids = np.array(sorted(members), dtype=np.int32)
+    mask = np.zeros(size, dtype=bool)
+    mask[ids] = True
+    return [
+        Bitset(size, ids=ids),
+        Bitset(size, bits=np.packbits(mask, bitorder="little")),
+        Bitset.from_indices(size, list(members)),
+    ]
+
+
+def as_set(bitset):
+    members = set(bitset.indices().tolist())
+    assert len(bitset) == len(members)
+    assert set(np.flatnonzero(bitset.mask()).tolist()) == members
+    assert all(0 <= i < bitset.size for i in members)
+    return members
+
+
+def random_members(rng, size):
+    density = rng.choice([0.0, 0.02, 0.2, 0.6, 1.0])
+    return {i for i in range(size) if rng.random() < density}
+
+
+@pytest.mark.parametrize("seed", range(150))
+def test_algebra_matches_sets(seed):
+    rng = random.Random(seed)
+    size = rng.choice([1, 7, 8, 9, 63, 64, 65, rng.randint(1, 500)])
+    a, b = random_members(rng, size), random_members(rng, size)
+    universe = set(range(size))
+    for x in forms(size, a):
+        assert as_set(x) == a
+        assert as_set(~x) == universe - a
+        assert as_set(~~x) == a
+        for y in forms(size, b):
+            assert as_set(x & y) == a & b
+            assert as_set(x | y) == a | b
+            assert as_set(x - y) == a - b
+            assert as_set(~x & y) == b - a
+            assert as_set(~x | ~y) == universe - (a & b)
+
+
+@pytest.mark.parametrize("size", [1, 5, 8, 13, 64, 100])
+def test_invert_clears_padding_bits(size):
+    full = Bitset.full(size)
+    assert len(full) == size
+    assert as_set(full) == set(range(size))
+    assert len(~full) == 0
+    assert len(full - Bitset.from_indices(size, [0])) == size - 1
+
+
+def test_from_mask_round_trips():
+    mask = np.array([True, False, True] * 11)
+    assert np.array_equal(Bitset.from_mask(mask).mask(), mask)
+
+
+def test_sizes_must_match():
+    with pytest.raises(ValueError):
+        Bitset.full(8) & Bitset.full(9)
+
+
+def test_compaction_picks_the_smaller_form():
+    assert Bitset.from_indices(10_000, [1, 2, 3]).ids is not None
+    assert Bitset.from_indices(10_000, range(0, 10_000, 2)).bits is not None
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_select_matches_brute_force(seed):
+    rng = random.Random(seed)
+    tags = ["pandas", "spark", "sql", "ml", "etl"]
+    rows = [
+        {
+            "skill_name": rng.choice(["A", "B", "C"]),
+            "module_name": rng.choice(["m1", "m2"]),
+            "tags": rng.sample(tags, rng.randint(0, 3)),
+        }
+        for _ in range(rng.randint(1, 120))
+    ]
+    index = FacetIndex(rows)
+    skill = rng.choice([None, "A", "B", "missing"])
+    module = rng.choice([None, "m1"])
+    tags_all = rng.sample(tags, rng.randint(0, 2))
+    tags_any = rng.sample(tags, rng.randint(0, 2))
+    tags_none = rng.sample(tags, rng.randint(0, 2))
+
+    result = index.select(skill, module, tags_all, tags_any, tags_none)
+    expected = {
+        i for i, r in enumerate(rows)
+        if (not skill or r["skill_name"] == skill)
+        and (not module or r["module_name"] == module)
+        and all(t in r["tags"] for t in tags_all)
+        and (not tags_any or any(t in r["tags"] for t in tags_any))
+        and not any(t in r["tags"] for t in tags_none)
+    }
+    if not (skill or module or tags_all or tags_any or tags_none):
+        assert result is None
+    else:
+        assert as_set(result) == expected
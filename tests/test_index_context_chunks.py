@@ -0,0 +1,38 @@
+import pytest
+
+from index_context_chunks import chunk_row, pack, split_oversized
+
+
+@pytest.mark.parametrize("piece", [
+    "x" * 95,
+    "short " + "y" * 40 + " tail",
+    "https://example.com/" + "a" * 60 + " then words " + "b" * 21,
+    "word " * 30,
+    " " * 25 + "z" * 25,
+])
+def test_split_oversized_respects_limit(piece):
+    parts = split_oversized(piece, 20)
+    assert all(0 < len(p) <= 20 for p in parts)
+    assert "".join("".join(parts).split()) == "".join(piece.split())
+
+
+def test_whitespace_free_token_is_cut_at_limit():
+    assert split_oversized("a" * 45, 20) == ["a" * 20, "a" * 20, "a" * 5]
+
+
+def test_pack_keeps_every_chunk_bounded():
+    pieces = ["small", "q" * 70, "also small", "mid " * 8]
+    assert all(len(chunk) <= 20 for chunk in pack(pieces, 20, " "))
+
+
+def test_chunk_row_bounds_minified_code():
+    row = {
+        "id": "r1",
+        "subtopic_name": "Blobs",
+        "description": "Encoded data.",
+        "example_code": "data = '" + "A" * 5000 + "'",
+        "example_output": "",
+    }
+    chunks = chunk_row(row, max_tokens=50)
+    assert len([c for c in chunks if c["kind"] == "code"]) > 1
+    assert all(c["token_estimate"] <= 50 for c in chunks)
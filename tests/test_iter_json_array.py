@@ -0,0 +1,81 @@
+"""Incremental JSON array decoding (iter_json_array) in generate_embeddings.py."""
+import json
+import random
+
+import pytest
+
+from generate_embeddings import iter_json_array
+
+SAMPLE = [
+    {"id": 1, "skill_name": "Données", "embedding": "[0.1,-0.25]", "tags": ["a", "b"]},
+    12345,
+    -1.5e-7,
+    "naïve ☃ text",
+    None,
+    True,
+    False,
+    [1, [2, {}]],
+    {},
+]
+
+
+def split_at(data, cuts):
+    cuts = sorted(cuts)
+    return [data[a:b] for a, b in zip([0, *cuts], [*cuts, len(data)])]
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_every_single_split_point(indent):
+    data = json.dumps(SAMPLE, indent=indent, ensure_ascii=False).encode()
+    for cut in range(len(data) + 1):
+        assert list(iter_json_array(split_at(data, [cut]))) == SAMPLE, cut
+
+
+def test_one_byte_chunks():
+    data = json.dumps(SAMPLE, ensure_ascii=False).encode()
+    assert list(iter_json_array(data[i:i + 1] for i in range(len(data)))) == SAMPLE
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_random_chunking(seed):
+    rng = random.Random(seed)
+    items = [
+        rng.choice([rng.randint(-10**9, 10**9), rng.random() * 10 ** rng.randint(-8, 8), "é x", None, {"k": [1.25]}])
+        for _ in range(rng.randint(0, 15))
+    ]
+    data = json.dumps(items, indent=rng.choice([None, 1]), ensure_ascii=rng.random() < 0.5).encode()
+    chunks = split_at(data, rng.sample(range(len(data) + 1), min(len(data) + 1, rng.randint(0, 20))))
+    assert list(iter_json_array(chunks)) == items
+
+
+@pytest.mark.parametrize("chunks, expected", [
+    ([b"[12", b"34, 5]"], [1234, 5]),
+    ([b"[1.", b"5e", b"3]"], [1500.0]),
+    ([b"[tr", b"ue, nu", b"ll]"], [True, None]),
+    ([b"[", b"]"], []),
+    ([b" [ ] "], []),
+])
+def test_scalars_split_across_chunks(chunks, expected):
+    assert list(iter_json_array(chunks)) == expected
+
+
+def test_elements_are_yielded_before_the_body_ends():
+    def chunks():
+        yield b'[{"id": 1}, {"id"'
+        raise AssertionError("read past the first complete element")
+
+    stream = iter_json_array(chunks())
+    assert next(stream) == {"id": 1}
+
+
+@pytest.mark.parametrize("chunks", [
+    [b"[1 2]"],
+    [b"[1, 2"],
+    [b"[1,"],
+    [b'[{"id": 1}'],
+    [b"{}"],
+    [b""],
+])
+def test_malformed_or_truncated_arrays_raise(chunks):
+    with pytest.raises(ValueError):
+        list(iter_json_array(chunks))
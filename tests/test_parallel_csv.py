@@ -0,0 +1,87 @@
+"""Quote-aware byte-range splitting in parallel_csv.py against a serial csv parse."""
+import csv
+import io
+import random
+
+import pytest
+
+import parallel_csv
+from parallel_csv import find_ranges, iter_records, parse_file, read_header
+
+HEADER = ["skill_name", "example_code", "example_output\n(multiline header)", "estimated_hours"]
+
+
+def random_field(rng):
+    parts = ["x = 1", "é☃", ",", '"', '""', "\n", "\r\n", "print(\"a, b\")", " ", "line\nnext"]
+    return "".join(rng.choice(parts) for _ in range(rng.randint(0, 8)))
+
+
+def write_csv(path, rng, n_rows, lineterminator="\r\n"):
+    rows = [[random_field(rng) for _ in HEADER] for _ in range(n_rows)]
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f, lineterminator=lineterminator)
+        writer.writerow(HEADER)
+        writer.writerows(rows)
+    return rows
+
+
+@pytest.fixture
+def small_ranges(monkeypatch):
+    # Split even tiny files, and count quotes across many scan blocks
+    monkeypatch.setattr(parallel_csv, "MIN_RANGE_BYTES", 1)
+    monkeypatch.setattr(parallel_csv, "SCAN_BLOCK", 37)
+
+
+def serial_rows(path):
+    with open(path, encoding="utf-8", newline="") as f:
+        return list(csv.reader(f))[1:]
+
+
+def test_header_with_a_quoted_newline(tmp_path):
+    path = tmp_path / "c.csv"
+    write_csv(path, random.Random(0), 3)
+    header, start = read_header(path)
+    assert header == HEADER
+    with open(path, "rb") as f:
+        assert next(csv.reader(io.StringIO(f.read()[start:].decode(), newline=""))) == serial_rows(path)[0]
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_ranges_cut_only_at_record_boundaries(tmp_path, small_ranges, seed):
+    rng = random.Random(seed)
+    path = tmp_path / "c.csv"
+    rows = write_csv(path, rng, rng.randint(1, 60), rng.choice(["\r\n", "\n"]))
+
+    ranges = find_ranges(path, rng.randint(2, 16))
+    start = read_header(path)[1]
+    assert ranges[0][0] == start
+    assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+    with open(path, "rb") as f:
+        data = f.read()
+    assert ranges[-1][1] == len(data)
+    parsed = [row for a, b in ranges for row in csv.reader(io.StringIO(data[a:b].decode(), newline=""))]
+    assert parsed == rows
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_serial_and_split_parses_agree(tmp_path, small_ranges, seed):
+    rng = random.Random(seed)
+    path = tmp_path / "c.csv"
+    write_csv(path, rng, rng.randint(1, 80))
+    split = [row for rows in parse_file(path, workers=1, ranges_per_worker=8) for row in rows]
+    assert split == serial_rows(path)
+
+
+def test_process_pool_keeps_file_order(tmp_path, small_ranges):
+    path = tmp_path / "c.csv"
+    rows = write_csv(path, random.Random(7), 400)
+    assert len(find_ranges(path, 8)) > 1
+    assert [row for chunk in parse_file(path, workers=2) for row in chunk] == rows
+    assert [list(r.values()) for r in iter_records(path, workers=2)] == rows
+
+
+def test_unbalanced_quotes_are_reported(tmp_path):
+    path = tmp_path / "bad.csv"
+    path.write_text('a,b,c\n1,"open\n2,3\n', encoding="utf-8")
+    with pytest.raises(ValueError, match="unbalanced quotes"):
+        list(parse_file(path, workers=1))
@@ -0,0 +1,79 @@
+"""SCC detection, cycle breaking and topological ordering in prerequisite_graph.py."""
+import random
+
+import pytest
+
+from prerequisite_graph import cycle_edges, strongly_connected, topological_order
+
+
+def reachable(n, edges):
+    successors = {i: set() for i in range(n)}
+    for src, dst in edges:
+        successors[src].add(dst)
+    reach = []
+    for start in range(n):
+        seen, todo = {start}, [start]
+        while todo:
+            for nxt in successors[todo.pop()]:
+                if nxt not in seen:
+                    seen.add(nxt)
+                    todo.append(nxt)
+        reach.append(seen)
+    return reach
+
+
+def random_graph(rng, n, density):
+    return sorted({(rng.randrange(n), rng.randrange(n)) for _ in range(int(n * density))})
+
+
+def test_downstream_of_a_cycle_keeps_its_place():
+    # 2 <-> 3 is a cycle, 1 depends on it and 0 comes before it
+    order, back_edges = topological_order(4, [(0, 2), (2, 3), (3, 2), (3, 1)])
+    assert back_edges == [(3, 2)]
+    assert order == [0, 2, 3, 1]
+
+
+def test_acyclic_graph_breaks_nothing_and_ties_follow_row_order():
+    order, back_edges = topological_order(5, [(3, 1), (4, 0)])
+    assert back_edges == []
+    assert order == [2, 3, 1, 4, 0]
+
+
+def test_self_loop_is_dropped():
+    order, back_edges = topological_order(2, [(1, 1), (0, 1)])
+    assert back_edges == [(1, 1)]
+    assert order == [0, 1]
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_components_match_mutual_reachability(seed):
+    rng = random.Random(seed)
+    n = rng.randint(1, 25)
+    edges = random_graph(rng, n, rng.uniform(0, 3))
+    reach = reachable(n, edges)
+
+    components = strongly_connected(n, edges)
+    assert sorted(node for c in components for node in c) == list(range(n))
+    component_of = {node: i for i, c in enumerate(components) for node in c}
+    for a in range(n):
+        for b in range(n):
+            same = a in reach[b] and b in reach[a]
+            assert (component_of[a] == component_of[b]) == same
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_order_respects_every_kept_edge(seed):
+    rng = random.Random(seed)
+    n = rng.randint(1, 25)
+    edges = random_graph(rng, n, rng.uniform(0, 3))
+
+    order, back_edges = topological_order(n, edges)
+    assert sorted(order) == list(range(n))
+    kept = set(edges) - set(back_edges)
+    position = {node: i for i, node in enumerate(order)}
+    assert all(position[src] < position[dst] for src, dst in kept)
+
+    # Only edges inside a cycle are ever dropped
+    component_of = {node: i for i, c in enumerate(strongly_connected(n, edges)) for node in c}
+    assert all(component_of[src] == component_of[dst] for src, dst in back_edges)
+    assert set(back_edges) == set(cycle_edges(n, edges))
@@ -0,0 +1,75 @@
+"""Change-set computation (diff_rows) in sync_curriculum.py."""
+from sync_curriculum import diff_rows, load_manifest, save_manifest
+
+
+def key(subtopic, topic="Topic"):
+    return ("Skill", "Module", topic, subtopic)
+
+
+def local_entry(subtopic, digest, topic="Topic"):
+    return key(subtopic, topic), ({"subtopic_name": subtopic}, digest)
+
+
+def test_insert_update_and_unchanged():
+    local = dict([local_entry("new", "h1"), local_entry("edited", "h2"), local_entry("same", "h3")])
+    remote = {
+        key("edited"): [(10, "old", "old")],
+        key("same"): [(11, "h3", "h3")],
+    }
+    inserts, updates, rehash, delete_ids = diff_rows(local, remote)
+    assert [row["subtopic_name"] for row, _ in inserts] == ["new"]
+    assert [(row["subtopic_name"], digest) for row, digest in updates] == [("edited", "h2")]
+    assert rehash == []
+    assert delete_ids == []
+
+
+def test_rows_without_a_stored_hash_are_only_rehashed():
+    local = dict([local_entry("same", "h3")])
+    remote = {key("same"): [(11, None, "h3")]}
+    inserts, updates, rehash, delete_ids = diff_rows(local, remote)
+    assert (inserts, updates, delete_ids) == ([], [], [])
+    assert rehash == [{
+        "skill_name": "Skill", "module_name": "Module", "topic_name": "Topic",
+        "subtopic_name": "same", "content_hash": "h3",
+    }]
+
+
+def test_duplicate_remote_copies_are_removed():
+    local = dict([local_entry("dup", "h")])
+    remote = {key("dup"): [(1, "h", "h"), (2, "h", "h"), (3, None, "x")]}
+    inserts, updates, rehash, delete_ids = diff_rows(local, remote)
+    assert (inserts, updates, rehash) == ([], [], [])
+    assert delete_ids == [2, 3]
+
+
+def test_missing_keys_survive_without_deletable():
+    local = dict([local_entry("kept", "h")])
+    remote = {key("kept"): [(1, "h", "h")], key("gone"): [(2, "h", "h")]}
+    assert diff_rows(local, remote)[3] == []
+
+
+def test_only_deletable_keys_are_deleted():
+    # The source synced "gone" and "also gone" before; "other source" came from elsewhere
+    local = dict([local_entry("kept", "h")])
+    remote = {
+        key("kept"): [(1, "h", "h")],
+        key("gone"): [(2, "h", "h"), (3, "h", "h")],
+        key("also gone", topic="Other"): [(4, "h", "h")],
+        key("other source"): [(5, "h", "h")],
+    }
+    deletable = {key("gone"), key("also gone", topic="Other"), key("kept")}
+    assert sorted(diff_rows(local, remote, deletable)[3]) == [2, 3, 4]
+
+
+def test_deletable_keys_still_present_locally_are_kept():
+    local = dict([local_entry("kept", "h")])
+    remote = {key("kept"): [(1, "h", "h")]}
+    assert diff_rows(local, remote, deletable={key("kept")})[3] == []
+
+
+def test_manifest_round_trip_keeps_keys_usable_as_deletable(tmp_path):
+    path = tmp_path / "manifest.json"
+    save_manifest({"learning_content:a.csv": {key("gone"), key("kept")}}, str(path))
+    deletable = load_manifest(str(path))["learning_content:a.csv"]
+    remote = {key("gone"): [(7, "h", "h")]}
+    assert diff_rows({}, remote, deletable)[3] == [7]
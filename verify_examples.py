@@ -0,0 +1,310 @@
+"""
+Verify that every row's example_code still prints its example_output.
+
+Each example runs in its own subprocess (isolated interpreter, scratch
+working directory, new session) across a worker pool, with a wall-clock
+timeout and an address-space limit. Examples that import modules missing
+from this environment are skipped instead of failing.
+
+Run results are cached by sha256(example_code + interpreter environment),
+so a re-run only executes examples whose code changed or whose environment
+(Python version, installed packages) moved; a changed example_output is
+re-compared without re-running anything. Output is compared after
+whitespace normalisation, with numbers matched to NUMERIC_RTOL.
+
+Usage:
+    python verify_examples.py [SOURCE ...] [--skill SKILL] [--module MODULE] [--workers 8] [--timeout 60]
+    (with no SOURCE the curriculum store in artifacts/curriculum is checked)
+"""
+import argparse
+import ast
+import difflib
+import hashlib
+import importlib.metadata
+import importlib.util
+import json
+import math
+import os
+import re
+import signal
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from curriculum_store import STORE_PATH, load_table, natural_key, read_store, require_pyarrow
+
+# --------------------------------------------------
+# Config
+# --------------------------------------------------
+CACHE_PATH = os.path.join("artifacts", "example_results.sqlite")
+REPORT_PATH = os.path.join("artifacts", "example_report.json")
+TIMEOUT_SECONDS = 60
+MEMORY_LIMIT_MB = 2048
+WORKERS = os.cpu_count() or 1
+NUMERIC_RTOL = 1e-3
+OUTPUT_LIMIT = 64 * 1024  # bytes of stdout/stderr kept per run
+
+# Sets the limits inside the child, then runs the example as __main__
+BOOTSTRAP = """
+import resource, runpy, sys
+limit = int(sys.argv[2]) * 1024 * 1024
+if limit > 0:
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+sys.argv = sys.argv[1:2]
+runpy.run_path(sys.argv[0], run_name="__main__")
+"""
+
+# --------------------------------------------------
+# Environment & dependencies
+# --------------------------------------------------
+def environment_fingerprint():
+    """Hash of the interpreter version and every installed distribution's version."""
+    packages = sorted(
+        f"{d.metadata['Name']}=={d.version}".lower()
+        for d in importlib.metadata.distributions()
+        if d.metadata["Name"]
+    )
+    payload = json.dumps([sys.version, sys.platform, packages])
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+def imported_modules(code):
+    """Top-level module names an example imports (None if it does not parse)."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return None
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.add(node.module.split(".")[0])
+    return names
+
+def missing_modules(code, available):
+    """Imports that cannot be resolved here; `available` memoises find_spec lookups."""
+    names = imported_modules(code) or set()
+    missing = []
+    for name in sorted(names - set(sys.stdlib_module_names)):
+        if name not in available:
+            available[name] = importlib.util.find_spec(name) is not None
+        if not available[name]:
+            missing.append(name)
+    return missing
+
+# --------------------------------------------------
+# Execution
+# --------------------------------------------------
+def run_example(code, timeout=TIMEOUT_SECONDS, memory_mb=MEMORY_LIMIT_MB):
+    """Run code in a fresh interpreter; returns {status, stdout, stderr, returncode, runtime}."""
+    with tempfile.TemporaryDirectory(prefix="example-") as workdir:
+        script = os.path.join(workdir, "example.py")
+        with open(script, "w", encoding="utf-8") as f:
+            f.write(code)
+        env = {
+            "PATH": os.environ.get("PATH", ""),
+            "HOME": workdir,
+            "PYTHONHASHSEED": "0",
+            "MPLBACKEND": "Agg",
+            "OMP_NUM_THREADS": "1",
+        }
+        start = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, "-I", "-c", BOOTSTRAP, script, str(memory_mb)],
+            cwd=workdir,
+            env=env,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            start_new_session=True,  # own process group, so timeouts kill any children too
+        )
+        try:
+            stdout, stderr = proc.communicate(timeout=timeout)
+            status = "ran" if proc.returncode == 0 else "error"
+        except subprocess.TimeoutExpired:
+            os.killpg(proc.pid, signal.SIGKILL)
+            stdout, stderr = proc.communicate()
+            status = "timeout"
+        runtime = time.perf_counter() - start
+
+    return {
+        "status": status,
+        "stdout": stdout[:OUTPUT_LIMIT].decode("utf-8", "replace"),
+        "stderr": stderr[-OUTPUT_LIMIT:].decode("utf-8", "replace"),
+        "returncode": proc.returncode,
+        "runtime": round(runtime, 3),
+        "timeout": timeout,
+    }
+
+# --------------------------------------------------
+# Comparison
+# --------------------------------------------------
+_NUMBER = re.compile(r"[-+]?(?:\d+\.\d*|\.\d+|\d+)(?:[eE][-+]?\d+)?")
+
+def normalize_output(text):
+    lines = [line.rstrip() for line in (text or "").strip().splitlines()]
+    return "\n".join(line for line in lines if line)
+
+def outputs_match(actual, expected, rtol=NUMERIC_RTOL):
+    """Equal after normalisation, with numbers compared to a relative tolerance."""
+    actual, expected = normalize_output(actual), normalize_output(expected)
+    if actual == expected:
+        return True
+    # Same text skeleton, numbers within tolerance
+    if _NUMBER.sub("#", actual).split() != _NUMBER.sub("#", expected).split():
+        return False
+    pairs = zip(_NUMBER.findall(actual), _NUMBER.findall(expected))
+    return all(math.isclose(float(a), float(b), rel_tol=rtol, abs_tol=rtol) for a, b in pairs)
+
+# --------------------------------------------------
+# Cache
+# --------------------------------------------------
+class ResultCache:
+    """Run results keyed by sha256(code + environment fingerprint)."""
+
+    def __init__(self, path=CACHE_PATH):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS example_runs (
+                key TEXT PRIMARY KEY,
+                result TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        """)
+        self.db.commit()
+
+    def get(self, key):
+        row = self.db.execute("SELECT result FROM example_runs WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key, result):
+        self.db.execute(
+            "INSERT OR REPLACE INTO example_runs (key, result, created_at) VALUES (?, ?, ?)",
+            (key, json.dumps(result), time.time())
+        )
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+# --------------------------------------------------
+# Verification
+# --------------------------------------------------
+def verify_rows(rows, cache=None, workers=WORKERS, timeout=TIMEOUT_SECONDS, memory_mb=MEMORY_LIMIT_MB):
+    """
+    Check every row with example_code. Returns one result dict per row.
+
+    status: pass | mismatch | error | timeout | skipped (missing modules or
+    no code). cached tells whether the run came from the cache.
+    """
+    env = environment_fingerprint()
+    available = {}
+    results = [None] * len(rows)
+    to_run = {}  # cache key -> row indices (identical code runs once)
+
+    for i, row in enumerate(rows):
+        code = row.get("example_code")
+        base = {"key": " / ".join(str(k) for k in natural_key(row))}
+        if not code:
+            results[i] = {**base, "status": "skipped", "reason": "no example_code"}
+            continue
+        missing = missing_modules(code, available)
+        if missing:
+            results[i] = {**base, "status": "skipped", "reason": f"missing modules: {', '.join(missing)}"}
+            continue
+        key = hashlib.sha256(f"{env}\0{code}".encode()).hexdigest()
+        cached = cache.get(key) if cache else None
+        # A timeout only stands until a longer limit is asked for
+        if cached and not (cached["status"] == "timeout" and cached["timeout"] < timeout):
+            results[i] = {**base, **cached, "cached": True}
+        else:
+            to_run.setdefault(key, []).append(i)
+
+    def execute(key):
+        return key, run_example(rows[to_run[key][0]]["example_code"], timeout, memory_mb)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for key, run in pool.map(execute, list(to_run)):
+            if cache:
+                cache.put(key, run)
+            for i in to_run[key]:
+                results[i] = {"key": " / ".join(str(k) for k in natural_key(rows[i])), **run, "cached": False}
+
+    for row, result in zip(rows, results):
+        if result["status"] != "ran":
+            continue
+        if outputs_match(result["stdout"], row.get("example_output")):
+            result["status"] = "pass"
+        else:
+            result["status"] = "mismatch"
+            diff = difflib.unified_diff(
+                normalize_output(row.get("example_output")).splitlines(),
+                normalize_output(result["stdout"]).splitlines(),
+                "expected", "actual", lineterm="", n=1,
+            )
+            result["diff"] = "\n".join(list(diff)[:40])
+    return results
+
+# --------------------------------------------------
+# Main
+# --------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description="Run example_code and compare with example_output")
+    parser.add_argument("sources", nargs="*", help="source files (default: the curriculum store)")
+    parser.add_argument("--store", default=STORE_PATH)
+    parser.add_argument("--skill")
+    parser.add_argument("--module")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--timeout", type=float, default=TIMEOUT_SECONDS)
+    parser.add_argument("--memory-mb", type=int, default=MEMORY_LIMIT_MB, help="0 disables the limit")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--report", default=REPORT_PATH)
+    args = parser.parse_args()
+
+    require_pyarrow()
+    print("=" * 70)
+    print("🧪 EXAMPLE VERIFICATION")
+    print("=" * 70)
+
+    start = datetime.now()
+    if args.sources:
+        rows = [row for source in args.sources for row in load_table(source)[0].to_pylist()]
+    else:
+        rows = read_store(args.store, skill_name=args.skill, module_name=args.module).to_pylist()
+
+    cache = None if args.no_cache else ResultCache()
+    results = verify_rows(rows, cache, args.workers, args.timeout, args.memory_mb)
+
+    for result in results:
+        icon = {"pass": "✅", "mismatch": "❌", "error": "💥", "timeout": "⏰", "skipped": "⏭️ "}[result["status"]]
+        runtime = f"{result['runtime']:.2f}s{' (cached)' if result.get('cached') else ''}" if "runtime" in result else ""
+        print(f"{icon} {result['key'][:90]} {runtime}")
+        if result["status"] == "mismatch":
+            print("   " + result["diff"].replace("\n", "\n   "))
+        elif result["status"] == "error":
+            print("   " + result["stderr"].strip().splitlines()[-1] if result["stderr"].strip() else "   (no stderr)")
+        elif result["status"] == "skipped":
+            print(f"   {result['reason']}")
+
+    counts = {}
+    for result in results:
+        counts[result["status"]] = counts.get(result["status"], 0) + 1
+    os.makedirs(os.path.dirname(args.report) or ".", exist_ok=True)
+    with open(args.report, "w", encoding="utf-8") as f:
+        json.dump({"generated_at": datetime.now().isoformat(), "counts": counts, "results": results}, f, indent=2)
+
+    secs = (datetime.now() - start).total_seconds()
+    print(f"\n📊 {counts}")
+    print(f"💾 Report → {args.report}")
+    print(f"⏱ Total time: {secs:.1f} seconds")
+    if cache:
+        cache.close()
+    sys.exit(1 if counts.get("mismatch") or counts.get("error") or counts.get("timeout") else 0)
+
+if __name__ == "__main__":
+    main()